@@ -1,7 +1,10 @@
 # src/assets.py
+import os
+import json
 import pygame
 import math
 from settings import *
+from cache import LRUCache
 
 class AssetFactory:
     """
@@ -11,139 +14,214 @@ class AssetFactory:
     #缓存池
     _trail_cache = None
     _coin_cache = None
-    _bubble_cache = None 
-    _font_cache = {}    # 缓存字体对象
-    _tile_cache = {}    # 缓存绘制好的方块 Surface
-    _bullet_cache = {}  # 缓存子弹 Surface
+    # 有界 LRU 缓存：(条目上限, 字节上限)，见 settings.ASSET_CACHE_LIMITS
+    _bubble_cache = LRUCache('bubble', *ASSET_CACHE_LIMITS['bubble'])   # 缓存气泡 Surface
+    _font_cache = LRUCache('font', *ASSET_CACHE_LIMITS['font'])         # 缓存字体对象
+    _tile_cache = LRUCache('tile', *ASSET_CACHE_LIMITS['tile'])         # 缓存绘制好的方块 Surface
+    _bullet_cache = LRUCache('bullet', *ASSET_CACHE_LIMITS['bullet'])   # 缓存子弹 Surface
+    _atlas = None       # 纹理图集 (TextureAtlas)，未加载时为 None
+    _font_paths = None  # 字体文件解析结果 (见 _resolve_font)，首次使用时从磁盘缓存读取
 
     @classmethod
     def get_trail_assets(cls):
         """获取线条图案（带缓存）"""
         if cls._trail_cache is None:
-            # === 如果缓存为空，则执行原来的生成逻辑 ===
-            """生成不同长度、不同位置的线条图案"""
-            line_h = 3
-            center_y = TILE_SIZE // 2
-            
-            # 定义线条长度
-            main_len = 20
-            up_len = 14
-            down_len = 16
-            
-            # --- 绘制基础图 ---
-            surf_main = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
-            pygame.draw.rect(surf_main, COLOR_LINES, (0, center_y - 2, main_len, line_h))
-            
-            surf_up = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
-            pygame.draw.rect(surf_up, COLOR_LINES, (0, center_y - 11, up_len, line_h))
-
-            surf_down = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
-            pygame.draw.rect(surf_down, COLOR_LINES, (0, center_y + 7, down_len, line_h))
-
-            # --- 生成旋转字典 ---
-            def create_rotations(surf):
-                return {
-                    (1, 0):  surf,
-                    (-1, 0): pygame.transform.flip(surf, True, False),
-                    (0, -1): pygame.transform.rotate(surf, 90),
-                    (0, 1):  pygame.transform.rotate(surf, -90),
+            # === 如果缓存为空，优先从图集中取，否则执行原来的生成逻辑 ===
+            if cls._atlas is not None:
+                final_assets = {
+                    direction: [cls._atlas.get(('trail', direction, i)) for i in range(3)]
+                    for direction in TRAIL_DIRECTIONS
+                }
+            else:
+                final_assets = {
+                    direction: [cls._prepare(surf) for surf in layers]
+                    for direction, layers in cls._render_trail_assets().items()
                 }
-
-            dict_main = create_rotations(surf_main)
-            dict_up = create_rotations(surf_up)
-            dict_down = create_rotations(surf_down)
-            
-            final_assets = {}
-            for direction in dict_main.keys():
-                final_assets[direction] = [
-                    dict_main[direction], 
-                    dict_up[direction], 
-                    dict_down[direction]
-                ]
-
             cls._trail_cache = final_assets
         return cls._trail_cache
+
+    @staticmethod
+    def _render_trail_assets():
+        """生成不同长度、不同位置的线条图案"""
+        line_h = 3
+        center_y = TILE_SIZE // 2
+        
+        # 定义线条长度
+        main_len = 20
+        up_len = 14
+        down_len = 16
+        
+        # --- 绘制基础图 ---
+        surf_main = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
+        pygame.draw.rect(surf_main, COLOR_LINES, (0, center_y - 2, main_len, line_h))
+        
+        surf_up = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
+        pygame.draw.rect(surf_up, COLOR_LINES, (0, center_y - 11, up_len, line_h))
+
+        surf_down = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
+        pygame.draw.rect(surf_down, COLOR_LINES, (0, center_y + 7, down_len, line_h))
+
+        # --- 生成旋转字典 ---
+        def create_rotations(surf):
+            return {
+                (1, 0):  surf,
+                (-1, 0): pygame.transform.flip(surf, True, False),
+                (0, -1): pygame.transform.rotate(surf, 90),
+                (0, 1):  pygame.transform.rotate(surf, -90),
+            }
+
+        dict_main = create_rotations(surf_main)
+        dict_up = create_rotations(surf_up)
+        dict_down = create_rotations(surf_down)
+        
+        final_assets = {}
+        for direction in dict_main.keys():
+            final_assets[direction] = [
+                dict_main[direction], 
+                dict_up[direction], 
+                dict_down[direction]
+            ]
+        return final_assets
     
     @classmethod
     def get_coin_assets(cls):
         """获取金币动画帧（带缓存）"""
         if cls._coin_cache is None:
-            # === 如果缓存为空，则执行生成逻辑 ===
-            """生成像素金币动画帧"""
-            frames = []
-            pixel_size = 2      
-            grid_h = 9          
-            center_offset = (TILE_SIZE - grid_h * pixel_size) // 2
-            
-            c_gold = COLOR_COIN
-            c_edge = COLOR_COIN_EDGE
-            widths = [9, 7, 5, 3, 1]
-            
-            for w in widths:
-                surf = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
-                offset_x = (9 - w) // 2
-                mid_x = w // 2 
-                
-                for ly in range(grid_h):
-                    for lx in range(w):
-                        dist = abs(lx - mid_x)
-                        core_radius = 1 if w >= 7 else 0
-                        is_core_area = (dist <= core_radius)
-                        is_gap_area = (dist == core_radius + 1)
-                        
-                        should_draw = False
-                        if ly == 0 or ly == 8:
-                            if w == 1 or (0 < lx < w - 1): should_draw = True
-                        elif ly == 1 or ly == 7:
-                            should_draw = True
-                        elif ly == 2 or ly == 6:
-                            if w <= 3 or not is_core_area: should_draw = True
-                        elif 3 <= ly <= 5:
-                            if w <= 3 or (not is_gap_area): should_draw = True
-
-                        if should_draw:
-                            color = c_gold
-                            is_edge = (lx == w - 1)
-                            if (ly == 0 or ly == 8) and w > 1 and lx == w - 2: is_edge = True
-                            if is_edge or ly == 8: color = c_edge
-                            
-                            dx = center_offset + (offset_x + lx) * pixel_size
-                            dy = center_offset + ly * pixel_size
-                            pygame.draw.rect(surf, color, (dx, dy, pixel_size, pixel_size))
-
-                frames.append(surf)
+            # === 如果缓存为空，优先从图集中取，否则执行生成逻辑 ===
+            if cls._atlas is not None:
+                frames = [cls._atlas.get(('coin', i)) for i in range(COIN_FRAME_COUNT)]
+            else:
+                frames = [cls._prepare(surf) for surf in cls._render_coin_frames()]
+            # 正反播放：转过去再转回来
             cls._coin_cache = frames + frames[-2:0:-1]
             
         return cls._coin_cache
+
+    @staticmethod
+    def _render_coin_frames():
+        """生成像素金币动画帧 (只包含不重复的半圈)"""
+        frames = []
+        pixel_size = 2      
+        grid_h = 9          
+        center_offset = (TILE_SIZE - grid_h * pixel_size) // 2
+        
+        c_gold = COLOR_COIN
+        c_edge = COLOR_COIN_EDGE
+        widths = [9, 7, 5, 3, 1]
+        
+        for w in widths:
+            surf = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
+            offset_x = (9 - w) // 2
+            mid_x = w // 2 
+            
+            for ly in range(grid_h):
+                for lx in range(w):
+                    dist = abs(lx - mid_x)
+                    core_radius = 1 if w >= 7 else 0
+                    is_core_area = (dist <= core_radius)
+                    is_gap_area = (dist == core_radius + 1)
+                    
+                    should_draw = False
+                    if ly == 0 or ly == 8:
+                        if w == 1 or (0 < lx < w - 1): should_draw = True
+                    elif ly == 1 or ly == 7:
+                        should_draw = True
+                    elif ly == 2 or ly == 6:
+                        if w <= 3 or not is_core_area: should_draw = True
+                    elif 3 <= ly <= 5:
+                        if w <= 3 or (not is_gap_area): should_draw = True
+
+                    if should_draw:
+                        color = c_gold
+                        is_edge = (lx == w - 1)
+                        if (ly == 0 or ly == 8) and w > 1 and lx == w - 2: is_edge = True
+                        if is_edge or ly == 8: color = c_edge
+                        
+                        dx = center_offset + (offset_x + lx) * pixel_size
+                        dy = center_offset + ly * pixel_size
+                        pygame.draw.rect(surf, color, (dx, dy, pixel_size, pixel_size))
+
+            frames.append(surf)
+        return frames
     
     @classmethod
     def get_bubble_asset(cls, diameter, color):
         """获取气泡资源（享元模式)"""
-        if cls._bubble_cache is None:
-            cls._bubble_cache = {}
-        
-        key = (diameter, color)
-        if key not in cls._bubble_cache:
-            surf = pygame.Surface((diameter, diameter), pygame.SRCALPHA)
-            radius = diameter // 2
-            pygame.draw.circle(surf, color, (radius, radius), radius)
-            cls._bubble_cache[key] = surf
-            
-        return cls._bubble_cache[key]
+        return cls._bubble_cache.get_or_create((diameter, color), cls._load_bubble, diameter, color)
+
+    @classmethod
+    def _load_bubble(cls, diameter, color):
+        surf = cls._from_atlas(('bubble', diameter, color))
+        if surf is None:
+            surf = cls._prepare(cls._render_bubble(diameter, color))
+        return surf
+
+    @staticmethod
+    def _render_bubble(diameter, color):
+        surf = pygame.Surface((diameter, diameter), pygame.SRCALPHA)
+        radius = diameter // 2
+        pygame.draw.circle(surf, color, (radius, radius), radius)
+        return surf
 
     @classmethod
     def get_font(cls, size, bold=False):
-        key = (size, bold)
-        if key not in cls._font_cache:
-            try:
-                # 尝试加载系统字体
-                font = pygame.font.SysFont(['simhei', 'microsoftyahei', 'pingfangsc'], size, bold=bold)
-            except:
-                # 失败则使用默认字体
-                font = pygame.font.Font(None, size)
-            cls._font_cache[key] = font
-            
-        return cls._font_cache[key]
+        return cls._font_cache.get_or_create((size, bold), cls._load_font, size, bold)
+
+    @classmethod
+    def _load_font(cls, size, bold):
+        path, fake_bold = cls._resolve_font(bold)
+        try:
+            # 尝试加载系统字体 (路径已解析并缓存，不再扫描系统字体)
+            font = pygame.font.Font(path, size)
+            if fake_bold:
+                font.set_bold(True)
+        except (OSError, pygame.error):
+            # 失败则使用默认字体
+            font = pygame.font.Font(None, size)
+        return font
+
+    @classmethod
+    def _resolve_font(cls, bold):
+        """
+        返回 (字体文件路径, 是否需要模拟粗体)。没有可用字体时路径为 None (pygame 默认字体)。
+        扫描系统字体 (match_font) 很慢，结果存到 FONT_CACHE_PATH，之后启动直接读取。
+        """
+        if cls._font_paths is None:
+            cls._font_paths = cls._load_font_paths()
+        style = 'bold' if bold else 'regular'
+        if style not in cls._font_paths:
+            path = pygame.font.match_font(FONT_NAMES, bold=bold)
+            # 没有独立的粗体文件时 (包括退回默认字体)，和 SysFont 一样模拟粗体
+            fake_bold = bold and (path is None or path == pygame.font.match_font(FONT_NAMES))
+            cls._font_paths[style] = [path, fake_bold]
+            cls._save_font_paths()
+        path, fake_bold = cls._font_paths[style]
+        return path, fake_bold
+
+    @classmethod
+    def _load_font_paths(cls):
+        try:
+            with open(FONT_CACHE_PATH, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("names") != FONT_NAMES:
+                return {}
+            # 字体文件被删除/移动过的条目重新解析
+            return {
+                style: entry for style, entry in data["paths"].items()
+                if entry[0] is None or os.path.exists(entry[0])
+            }
+        except (OSError, ValueError, KeyError, TypeError, IndexError):
+            return {}
+
+    @classmethod
+    def _save_font_paths(cls):
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(FONT_CACHE_PATH, 'w', encoding='utf-8') as f:
+                json.dump({"names": FONT_NAMES, "paths": cls._font_paths}, f, ensure_ascii=False)
+        except OSError:
+            # 存不下只是下次还要再扫描一次
+            pass
 
     @classmethod
     def create_tile(cls, text, color, bg_color=None, border_style='solid', angle=0):
@@ -155,57 +233,140 @@ class AssetFactory:
         :param angle: 旋转角度
         """
         key = (text, color, bg_color, border_style, angle)
-        if key not in cls._tile_cache:
-            image = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
-            
-            if bg_color:
-                image.fill(bg_color)
+        return cls._tile_cache.get_or_create(key, cls._load_tile, key)
 
-            if border_style != 'none':
-                AssetFactory._draw_border(image, color, style=border_style)
+    @classmethod
+    def _load_tile(cls, key):
+        image = cls._from_atlas(('tile',) + key)
+        if image is None:
+            image = cls._prepare(cls._render_tile(*key))
+        return image
 
-            font_size = int(TILE_SIZE * 0.8)
-            font = AssetFactory.get_font(font_size, bold=True)
-            text_surf = font.render(text, True, color)
-            
-            if angle != 0:
-                text_surf = pygame.transform.rotate(text_surf, angle)
-                
-            text_rect = text_surf.get_rect(center=(TILE_SIZE // 2, TILE_SIZE // 2))
-            image.blit(text_surf, text_rect)
+    @classmethod
+    def _render_tile(cls, text, color, bg_color, border_style, angle):
+        image = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
+        
+        if bg_color:
+            image.fill(bg_color)
+
+        if border_style != 'none':
+            AssetFactory._draw_border(image, color, style=border_style)
 
-            cls._tile_cache[key] = image
+        font_size = int(TILE_SIZE * 0.8)
+        font = cls.get_font(font_size, bold=True)
+        text_surf = font.render(text, True, color)
         
-        return cls._tile_cache[key]
+        if angle != 0:
+            text_surf = pygame.transform.rotate(text_surf, angle)
+            
+        text_rect = text_surf.get_rect(center=(TILE_SIZE // 2, TILE_SIZE // 2))
+        image.blit(text_surf, text_rect)
+        return image
 
     @classmethod
     def create_spike_bullet(cls, direction, color):
         """生成飞出的刺"""
-        dir_key = (direction.x, direction.y)
-        key = (dir_key, color)
+        dir_key = (int(direction[0]), int(direction[1]))
+        return cls._bullet_cache.get_or_create((dir_key, color), cls._load_spike_bullet, dir_key, color)
 
-        if key not in cls._bullet_cache:
-            surf = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
-            arrow_len, shaft_len = 8, 20
-            start_x = (TILE_SIZE - (arrow_len + shaft_len)) // 2
-            
-            # 画三根刺
-            for cy in [5, 15, 25]:
-                # 杆
-                pygame.draw.rect(surf, color, (start_x, cy - 1, shaft_len, 2))
-                # 尖
-                pts = [(start_x + 28, cy), (start_x + 20, cy - 3), (start_x + 20, cy + 3)]
-                pygame.draw.polygon(surf, color, pts)
-                
-            # 根据方向旋转
-            if direction.x == -1: surf = pygame.transform.flip(surf, True, False)
-            elif direction.y == -1: surf = pygame.transform.rotate(surf, 90)
-            elif direction.y == 1: surf = pygame.transform.rotate(surf, -90)
+    @classmethod
+    def _load_spike_bullet(cls, dir_key, color):
+        surf = cls._from_atlas(('bullet', dir_key, color))
+        if surf is None:
+            surf = cls._prepare(cls._render_spike_bullet(dir_key, color))
+        return surf
 
-            cls._bullet_cache[key] = surf
+    @staticmethod
+    def _render_spike_bullet(dir_key, color):
+        surf = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
+        arrow_len, shaft_len = 8, 20
+        start_x = (TILE_SIZE - (arrow_len + shaft_len)) // 2
+        
+        # 画三根刺
+        for cy in [5, 15, 25]:
+            # 杆
+            pygame.draw.rect(surf, color, (start_x, cy - 1, shaft_len, 2))
+            # 尖
+            pts = [(start_x + 28, cy), (start_x + 20, cy - 3), (start_x + 20, cy + 3)]
+            pygame.draw.polygon(surf, color, pts)
             
-        return cls._bullet_cache[key]
-    
+        # 根据方向旋转
+        dx, dy = dir_key
+        if dx == -1: surf = pygame.transform.flip(surf, True, False)
+        elif dy == -1: surf = pygame.transform.rotate(surf, 90)
+        elif dy == 1: surf = pygame.transform.rotate(surf, -90)
+        return surf
+
+    # =========================================================================
+    #  图集与显示格式
+    # =========================================================================
+    @classmethod
+    def use_atlas(cls, atlas):
+        """
+        [图集] 挂载预渲染好的纹理图集。
+        之后的资源请求优先从图集中切子图，已有的缓存会被清空以免新旧混用。
+        """
+        cls._atlas = atlas
+        cls.clear_caches(keep_fonts=True)
+
+    # =========================================================================
+    #  缓存管理
+    # =========================================================================
+    @classmethod
+    def _caches(cls):
+        return [cls._tile_cache, cls._bubble_cache, cls._bullet_cache, cls._font_cache]
+
+    @classmethod
+    def cache_stats(cls):
+        """各缓存的条目数、字节数、命中/未命中/淘汰次数"""
+        return {cache.name: cache.stats() for cache in cls._caches()}
+
+    @classmethod
+    def clear_caches(cls, keep_fonts=False):
+        """清空缓存 (已经在用的 Surface 由精灵自己持有，不受影响)"""
+        cls._trail_cache = None
+        cls._coin_cache = None
+        for cache in cls._caches():
+            if keep_fonts and cache is cls._font_cache:
+                continue
+            cache.clear()
+
+    @classmethod
+    def preload_level(cls, level_map):
+        """
+        [预热] 根据地图里出现的字符，在开始游玩前把这一关要用的资源都放进缓存。
+        :param level_map: 地图行列表 (如 LEVELS[i])
+        """
+        chars = set().union(*level_map)
+        if 'W' in chars: cls.create_tile("墙", COLOR_WALL, border_style='solid')
+        if 'D' in chars: cls.create_tile("门", COLOR_DOOR, border_style='solid')
+        if 'C' in chars: cls.get_coin_assets()
+        if 'O' in chars or 'G' in chars:
+            cls.create_tile("茧", COLOR_GHOST, border_style='solid')
+            cls.create_tile("鬼", COLOR_GHOST, border_style='none')
+        if '^' in chars:
+            cls.create_tile("刺", COLOR_CYAN, bg_color=COLOR_TRAP, border_style='dashed')
+            for direction in TRAIL_DIRECTIONS:
+                cls.create_spike_bullet(direction, COLOR_SPIKE)
+        if 'P' in chars:
+            cls.create_tile("我", COLOR_PLAYER_TEXT, border_style='none')
+            cls.get_trail_assets()
+            for diameter in range(BUBBLE_SIZE_RANGE[0], BUBBLE_SIZE_RANGE[1] + 1):
+                cls.get_bubble_asset(diameter, BUBBLE_COLOR)
+
+    @classmethod
+    def _from_atlas(cls, key):
+        if cls._atlas is None:
+            return None
+        return cls._atlas.get(key)
+
+    @staticmethod
+    def _prepare(surf):
+        """转换为显示格式，避免每次 blit 都做像素格式转换 (需要先创建窗口)"""
+        if pygame.display.get_surface() is None:
+            return surf
+        return surf.convert_alpha()
+
     @staticmethod
     def _draw_border(surface, color, style='solid'):
         """
@@ -0,0 +1,131 @@
+# src/atlas.py
+import os
+import json
+import pygame
+from settings import *
+from assets import AssetFactory
+
+# 图集中需要预先渲染的方块 (与 sprites.py、entities.py 中的调用参数一一对应)
+# 格式：(text, color, bg_color, border_style, angle)
+ATLAS_TILES = [
+    ("墙", COLOR_WALL, None, 'solid', 0),
+    ("门", COLOR_DOOR, None, 'solid', 0),
+    ("茧", COLOR_GHOST, None, 'solid', 0),
+    ("刺", COLOR_CYAN, COLOR_TRAP, 'dashed', 0),
+    ("我", COLOR_PLAYER_TEXT, None, 'none', 0),
+    ("鬼", COLOR_GHOST, None, 'none', 0),
+]
+
+class TextureAtlas:
+    """
+    [纹理图集]
+    把所有程序化绘制的资源 (方块、金币帧、拖尾、刺、气泡) 拼进一张大图并存盘。
+    启动时只读一次文件、只做一次 convert_alpha()，之后 AssetFactory 直接切子图使用。
+    """
+    def __init__(self, surface, index):
+        self.surface = surface
+        # Key=repr(资源键), Value=子图 Surface (与大图共享像素)
+        self.regions = {
+            key: surface.subsurface(pygame.Rect(rect))
+            for key, rect in index.items()
+        }
+
+    def get(self, key):
+        return self.regions.get(repr(key))
+
+    # =========================================================================
+    #  构建与加载
+    # =========================================================================
+    @staticmethod
+    def manifest():
+        """列出图集中的全部资源：[(资源键, 渲染函数), ...]"""
+        entries = []
+        for tile in ATLAS_TILES:
+            entries.append((('tile',) + tile, lambda t=tile: AssetFactory._render_tile(*t)))
+
+        # 金币帧和拖尾是整组生成的，只在真正渲染时生成一次
+        batch = {}
+        def from_batch(name, render):
+            if name not in batch:
+                batch[name] = render()
+            return batch[name]
+
+        for i in range(COIN_FRAME_COUNT):
+            entries.append((('coin', i),
+                            lambda i=i: from_batch('coin', AssetFactory._render_coin_frames)[i]))
+
+        for direction in TRAIL_DIRECTIONS:
+            for i in range(3):
+                entries.append((('trail', direction, i),
+                                lambda d=direction, i=i: from_batch('trail', AssetFactory._render_trail_assets)[d][i]))
+
+        for direction in TRAIL_DIRECTIONS:
+            entries.append((('bullet', direction, COLOR_SPIKE),
+                            lambda d=direction: AssetFactory._render_spike_bullet(d, COLOR_SPIKE)))
+
+        for diameter in range(BUBBLE_SIZE_RANGE[0], BUBBLE_SIZE_RANGE[1] + 1):
+            entries.append((('bubble', diameter, BUBBLE_COLOR),
+                            lambda d=diameter: AssetFactory._render_bubble(d, BUBBLE_COLOR)))
+        return entries
+
+    @classmethod
+    def build(cls):
+        """渲染全部资源并按 TILE_SIZE 网格拼成一张大图，返回 (大图, 索引)"""
+        entries = cls.manifest()
+        rows = (len(entries) + ATLAS_COLUMNS - 1) // ATLAS_COLUMNS
+        sheet = pygame.Surface((ATLAS_COLUMNS * TILE_SIZE, rows * TILE_SIZE), pygame.SRCALPHA)
+
+        index = {}
+        for i, (key, render) in enumerate(entries):
+            surf = render()
+            x = (i % ATLAS_COLUMNS) * TILE_SIZE
+            y = (i // ATLAS_COLUMNS) * TILE_SIZE
+            # 大图初始全透明，用 MAX 混合等价于直接拷贝像素 (保留半透明边缘)
+            sheet.blit(surf, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+            index[repr(key)] = [x, y, surf.get_width(), surf.get_height()]
+        return sheet, index
+
+    @staticmethod
+    def _expected_meta():
+        keys = sorted(repr(key) for key, _ in TextureAtlas.manifest())
+        return {"version": ATLAS_VERSION, "tile_size": TILE_SIZE, "keys": keys}
+
+    @classmethod
+    def save(cls, sheet, index, meta):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        pygame.image.save(sheet, ATLAS_IMG_PATH)
+        with open(ATLAS_INDEX_PATH, 'w', encoding='utf-8') as f:
+            json.dump({"meta": meta, "index": index}, f, ensure_ascii=False)
+
+    @classmethod
+    def load_or_build(cls):
+        """
+        读取磁盘上的图集；文件缺失或与当前配置不符时重新生成并存盘。
+        需要在 pygame.display.set_mode() 之后调用 (convert_alpha 依赖显示格式)。
+        """
+        meta = cls._expected_meta()
+        try:
+            with open(ATLAS_INDEX_PATH, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("meta") != meta:
+                raise ValueError("atlas is stale")
+            sheet = pygame.image.load(ATLAS_IMG_PATH)
+            index = data["index"]
+        except (OSError, ValueError, KeyError, pygame.error):
+            sheet, index = cls.build()
+            try:
+                cls.save(sheet, index, meta)
+            except (OSError, pygame.error) as e:
+                # 存盘失败不影响本次运行，只是下次还要重新生成
+                print(f"Atlas not saved: {e}")
+
+        return cls(sheet.convert_alpha(), index)
+
+if __name__ == "__main__":
+    # 手动重建图集：python atlas.py
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((1, 1))
+    sheet, index = TextureAtlas.build()
+    TextureAtlas.save(sheet, index, TextureAtlas._expected_meta())
+    print(f"Atlas saved: {ATLAS_IMG_PATH} ({len(index)} regions)")
@@ -0,0 +1,86 @@
+# src/cache.py
+from collections import OrderedDict
+import pygame
+from tracing import tracer
+
+def surface_bytes(value):
+    """估算 Surface 占用的像素内存；图集子图与大图共享像素，不重复计算"""
+    if isinstance(value, pygame.Surface) and value.get_parent() is None:
+        return value.get_width() * value.get_height() * value.get_bytesize()
+    return 0
+
+class LRUCache:
+    """
+    [有界缓存]
+    按最近使用顺序淘汰 (LRU)，同时限制条目数和字节数，并统计命中/未命中/淘汰次数。
+    """
+    def __init__(self, name, max_entries, max_bytes=None, sizeof=surface_bytes):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.miss_span = f"{name} miss"
+
+        self._data = OrderedDict()   # Key=资源键, Value=(资源, 字节数)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value):
+        if key in self._data:
+            self.bytes -= self._data.pop(key)[1]
+        size = self.sizeof(value)
+        self._data[key] = (value, size)
+        self.bytes += size
+        self._evict()
+        return value
+
+    def get_or_create(self, key, create, *args):
+        """命中直接返回；未命中时调用 create(*args) 生成并放入缓存 (生成过程记在追踪时间线的 miss 区间里)"""
+        value = self.get(key)
+        if value is None:
+            with tracer.span(self.miss_span, 'assets'):
+                value = self.put(key, create(*args))
+        return value
+
+    def _evict(self):
+        # 至少保留刚放进去的那一条
+        while len(self._data) > 1 and (
+            len(self._data) > self.max_entries or
+            (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            _, (_, size) = self._data.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+        self.bytes = 0
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -20,26 +20,135 @@ class CameraGroup(pygame.sprite.Group):
         # 我们只存图片和位置，不再把它当作 Sprite 对象去遍历
         self.static_grid = {} 
 
+        # 静态实体存储 (金币、陷阱、茧)：同样按格子取图，不作为 Sprite 遍历
+        # 每一层需要提供 tiles (Key=(col, row)) 和 image_of(记录)
+        self.entity_layers = []
+
+        # 脏矩形渲染：记录上一帧的镜头位置和画过的东西
+        self._needs_full = True
+        self._last_offset = pygame.math.Vector2()
+        self._drawn_entities = {}   # Key=(col, row), Value=(实体层, 画上去的图片)
+        self._sprite_rects = []     # 上一帧动态物体在屏幕上的矩形
+
+        # 动态物体的粗粒度空间分桶：只取镜头附近几个桶里的精灵来画
+        self.buckets = {}           # Key=(bx, by), Value=set(精灵)
+        self._bucket_of = {}        # Key=精灵, Value=所在桶
+        self._order = {}            # Key=精灵, Value=加入顺序 (决定绘制先后)
+        self._next_order = 0
+        self._pending = set()       # 刚加入组的精灵 (构造函数里先入组、后设 rect)，用到时再归桶
+
     def trigger_shake(self, intensity=5, duration=20):
         self.shake_intensity = intensity
         self.shake_timer = duration
 
-    def add_static(self, sprite):
+    def add_static(self, col, row, image):
         """
         [新增] 专门用于添加静态物体（墙壁）
         将它们记录在网格字典里，而不是普通的 sprite 列表里
         """
-        # 计算网格坐标
-        col = int(sprite.rect.x // TILE_SIZE)
-        row = int(sprite.rect.y // TILE_SIZE)
-        # 存入字典
-        self.static_grid[(col, row)] = sprite.image
+        self.static_grid[(col, row)] = image
+
+    # =========================================================================
+    #  空间分桶
+    # =========================================================================
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite)
+        self._order[sprite] = self._next_order
+        self._next_order += 1
+        self._pending.add(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        key = self._bucket_of.pop(sprite, None)
+        if key is not None:
+            bucket = self.buckets[key]
+            bucket.discard(sprite)
+            if not bucket:
+                del self.buckets[key]
+        self._order.pop(sprite, None)
+        self._pending.discard(sprite)
+
+    def _rebucket(self, sprite):
+        """按精灵左上角所在的桶归类；桶没变就什么都不做"""
+        key = (sprite.rect.x // CULL_BUCKET_SIZE, sprite.rect.y // CULL_BUCKET_SIZE)
+        old = self._bucket_of.get(sprite)
+        if old == key:
+            return
+        if old is not None:
+            self.buckets[old].discard(sprite)
+            if not self.buckets[old]:
+                del self.buckets[old]
+        self.buckets.setdefault(key, set()).add(sprite)
+        self._bucket_of[sprite] = key
+
+    def update(self, *args, **kwargs):
+        # 更新之后顺手重新归桶 (更新中被 kill 的精灵已经移出了组，不再归桶)
+        # 更新中新加入的精灵 (拖尾、气泡) 也在这里归桶
+        for sprite in self.sprites():
+            sprite.update(*args, **kwargs)
+            if sprite in self._order:
+                self._rebucket(sprite)
+        self._flush_pending()
 
-    def custom_draw(self, player):
+    def _flush_pending(self):
+        for sprite in self._pending:
+            self._rebucket(sprite)
+        self._pending.clear()
+
+    def sprites_in_view(self, margin=0):
+        """与镜头矩形 (向外扩 margin) 相交的动态物体，按加入顺序排好"""
+        view = pygame.Rect(int(self.offset.x) - margin, int(self.offset.y) - margin,
+                           self.display_surface.get_width() + 2 * margin,
+                           self.display_surface.get_height() + 2 * margin)
+        # 精灵按左上角归桶，往左上多查 CULL_SPRITE_MAX 像素，避免漏掉伸进屏幕的大精灵
+        start_bx = (view.left - CULL_SPRITE_MAX) // CULL_BUCKET_SIZE
+        start_by = (view.top - CULL_SPRITE_MAX) // CULL_BUCKET_SIZE
+        end_bx = view.right // CULL_BUCKET_SIZE
+        end_by = view.bottom // CULL_BUCKET_SIZE
+
+        self._flush_pending()
+        found = []
+        for bx in range(start_bx, end_bx + 1):
+            for by in range(start_by, end_by + 1):
+                bucket = self.buckets.get((bx, by))
+                if bucket:
+                    found.extend(sprite for sprite in bucket if view.colliderect(sprite.rect))
+        found.sort(key=self._order.__getitem__)
+        return found
+
+    def add_layer(self, store):
+        """注册一个静态实体存储，按注册顺序在墙之后绘制"""
+        self.entity_layers.append(store)
+
+    def invalidate(self):
+        """下一帧强制整屏重画 (例如画面上叠加过 UI 弹窗)"""
+        self._needs_full = True
+
+    def custom_draw(self, player, allow_partial=False):
+        """
+        绘制一帧。
+        :param allow_partial: 为 True 且镜头静止时只重画有变化的区域 (脏矩形)
+        :return: 本帧改动过的屏幕矩形列表；整屏重画时返回 None
+        """
         # 1. 计算偏移
         self.offset.x = player.rect.centerx - self.half_w
         self.offset.y = player.rect.centery - self.half_h
 
+        # 镜头没动、没有震动、上一帧也是完整画面 -> 只需要局部重画
+        stationary = (
+            allow_partial and not self._needs_full and self.shake_timer <= 0
+            and self.offset == self._last_offset
+        )
+        self._last_offset.update(self.offset)
+        self._needs_full = not allow_partial    # 画完之后调用方还会叠加 UI，下一帧要整屏重画
+        if stationary:
+            return self._partial_draw()
+        self._full_draw()
+        return None
+
+    def _full_draw(self):
+        self.display_surface.fill(COLOR_BG)
+
         # 2. 震动偏移
         shake_offset = pygame.math.Vector2()
         if self.shake_timer > 0:
@@ -59,6 +168,9 @@ class CameraGroup(pygame.sprite.Group):
         # 下边界
         end_row = int((self.offset.y + self.display_surface.get_height() + self.shake_intensity) // TILE_SIZE) + 1
 
+        # 记下屏幕上每个实体格子画的是哪张图，静止时据此找出变化的格子
+        self._drawn_entities = {}
+
         # 嵌套循环只遍历屏幕内的几十个格子，而不是全图几千个物体
         for col in range(start_col, end_col):
             for row in range(start_row, end_row):
@@ -69,9 +181,74 @@ class CameraGroup(pygame.sprite.Group):
                     pos_x = col * TILE_SIZE - self.offset.x + shake_offset.x
                     pos_y = row * TILE_SIZE - self.offset.y + shake_offset.y
                     self.display_surface.blit(surf, (pos_x, pos_y))
+                else:
+                    for layer in self.entity_layers:
+                        item = layer.tiles.get((col, row))
+                        if item is not None:
+                            surf = layer.image_of(item)
+                            pos_x = col * TILE_SIZE - self.offset.x + shake_offset.x
+                            pos_y = row * TILE_SIZE - self.offset.y + shake_offset.y
+                            self.display_surface.blit(surf, (pos_x, pos_y))
+                            self._drawn_entities[(col, row)] = (layer, surf)
 
         # === 4. 绘制动态物体 (Player, Ghost, Particles) ===
-        # 这些物体数量少且位置一直变，保持原有逻辑
-        for sprite in self.sprites():
+        # 只画镜头范围内 (含震动余量) 的精灵
+        self._sprite_rects = []
+        for sprite in self.sprites_in_view(self.shake_intensity):
             offset_pos = sprite.rect.topleft - self.offset + shake_offset
-            self.display_surface.blit(sprite.image, offset_pos)
\ No newline at end of file
+            self.display_surface.blit(sprite.image, offset_pos)
+            self._sprite_rects.append(sprite.image.get_rect(topleft=offset_pos))
+
+    def _partial_draw(self):
+        """
+        [脏矩形] 镜头静止时，屏幕上只有动态物体和图片变了的实体格子会变化：
+        只重画这些矩形 (上一帧和这一帧的位置都要算)，并把它们交给 display.update
+        """
+        ox, oy = int(self.offset.x), int(self.offset.y)
+
+        # 图片变了 (金币动画、陷阱转向) 或已经消失 (被拾取、孵化) 的实体格子
+        dirty = []
+        for tile, (layer, surf) in list(self._drawn_entities.items()):
+            item = layer.tiles.get(tile)
+            current = layer.image_of(item) if item is not None else None
+            if current is not surf:
+                dirty.append(pygame.Rect(tile[0] * TILE_SIZE - ox, tile[1] * TILE_SIZE - oy, TILE_SIZE, TILE_SIZE))
+                if current is None:
+                    del self._drawn_entities[tile]
+                else:
+                    self._drawn_entities[tile] = (layer, current)
+
+        # 动态物体：擦掉旧位置，画上新位置
+        sprites = self.sprites_in_view()
+        sprite_rects = [sprite.image.get_rect(topleft=(sprite.rect.x - ox, sprite.rect.y - oy)) for sprite in sprites]
+        dirty.extend(self._sprite_rects)
+        dirty.extend(sprite_rects)
+        self._sprite_rects = sprite_rects
+
+        screen_rect = self.display_surface.get_rect()
+        dirty = [rect.clip(screen_rect) for rect in dirty]
+        dirty = [rect for rect in dirty if rect.w and rect.h]
+
+        for rect in dirty:
+            self.display_surface.set_clip(rect)
+            self.display_surface.fill(COLOR_BG, rect)
+
+            # 该矩形覆盖到的格子：墙和实体
+            for col in range((rect.left + ox) // TILE_SIZE, (rect.right - 1 + ox) // TILE_SIZE + 1):
+                for row in range((rect.top + oy) // TILE_SIZE, (rect.bottom - 1 + oy) // TILE_SIZE + 1):
+                    pos = (col * TILE_SIZE - ox, row * TILE_SIZE - oy)
+                    surf = self.static_grid.get((col, row))
+                    if surf is not None:
+                        self.display_surface.blit(surf, pos)
+                        continue
+                    for layer in self.entity_layers:
+                        item = layer.tiles.get((col, row))
+                        if item is not None:
+                            self.display_surface.blit(layer.image_of(item), pos)
+
+            # 与该矩形相交的动态物体，保持原来的绘制顺序
+            for i in rect.collidelistall(sprite_rects):
+                self.display_surface.blit(sprites[i].image, sprite_rects[i])
+
+        self.display_surface.set_clip(None)
+        return dirty
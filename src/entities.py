@@ -0,0 +1,294 @@
+# src/entities.py
+import pygame
+from array import array
+from settings import *
+from assets import AssetFactory
+from sprites import Spike, Ghost
+from pools import SpritePool
+"""
+[静态实体存储]
+墙、金币、陷阱、茧数量多且基本不动，不再做成 pygame Sprite
+(每个 Sprite 都带 __dict__、多个组的成员关系和重复的引用)。
+每类实体集中存放：金币用平行的类型化数组，陷阱和茧用 __slots__ 记录，
+逻辑由对应的 System 每帧统一执行；绘制由 CameraGroup 按屏幕内的格子取图。
+"""
+
+class CoinStore:
+    """金币：列、行、存活标记放在类型化数组里；所有金币动画同步，共用同一帧"""
+    def __init__(self):
+        self.cols = array('i')
+        self.rows = array('i')
+        self.alive = bytearray()
+        self.tiles = {}         # Key=(col, row), Value=数组下标 (只含未被拾取的)
+        self.collected = []     # 被拾取的下标 (重开关卡时只需要恢复这些)
+        self.frames = AssetFactory.get_coin_assets()
+        self.anim = 0.0
+        self.ticks = 0
+        self.image = self.frames[0]
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def add(self, col, row):
+        self.tiles[(col, row)] = len(self.cols)
+        self.cols.append(col)
+        self.rows.append(row)
+        self.alive.append(1)
+
+    def remove(self, col, row):
+        index = self.tiles.pop((col, row), None)
+        if index is not None:
+            self.alive[index] = 0
+
+    def update(self, stride=1):
+        """:param stride: 每几帧才换一次图 (画质降低时少重画金币)，动画速度不变"""
+        self.anim = (self.anim + COIN_ANIMATION_SPEED) % len(self.frames)
+        self.ticks += 1
+        if self.ticks % stride == 0:
+            self.image = self.frames[int(self.anim)]
+
+    def image_of(self, index):
+        return self.image
+
+    def snapshot(self):
+        return bytes(self.alive)
+
+    def restore(self, snapshot):
+        """恢复到快照时的状态，返回重新出现的格子"""
+        restored = []
+        for index in self.collected:
+            if index < len(snapshot) and snapshot[index] and not self.alive[index]:
+                self.alive[index] = 1
+                tile = (self.cols[index], self.rows[index])
+                self.tiles[tile] = index
+                restored.append(tile)
+        self.collected.clear()
+        self.anim = 0.0
+        self.ticks = 0
+        self.image = self.frames[0]
+        return restored
+
+    def patch_snapshot(self, snapshot, tiles):
+        """热重载后修补快照：tiles 上的金币改成当前状态 (删掉的不再恢复)，新加的金币记为存在"""
+        tiles = set(tiles)
+        patched = bytearray(snapshot)
+        patched.extend(self.alive[len(patched):])
+        for index in range(len(snapshot)):
+            if (self.cols[index], self.rows[index]) in tiles:
+                patched[index] = self.alive[index]
+        return bytes(patched)
+
+    def collect(self, rect):
+        """
+        拾取与 rect 重叠 (不含只贴边) 的金币，返回被拾取的格子列表。
+        每帧都会调用：直接遍历行、列范围，绝大多数帧没有拾取，返回空元组，不创建列表
+        """
+        collected = ()
+        tiles = self.tiles
+        for r in range(rect.top // TILE_SIZE, (rect.bottom - 1) // TILE_SIZE + 1):
+            for c in range(rect.left // TILE_SIZE, (rect.right - 1) // TILE_SIZE + 1):
+                index = tiles.pop((c, r), None)
+                if index is not None:
+                    self.alive[index] = 0
+                    self.collected.append(index)
+                    if not collected:
+                        collected = []
+                    collected.append((c, r))
+        return collected
+
+class TrapRecord:
+    __slots__ = ('col', 'row', 'centerx', 'centery', 'status', 'wake', 'angle', 'image')
+
+    def __init__(self, col, row, image):
+        self.col = col
+        self.row = row
+        self.centerx = col * TILE_SIZE + TILE_SIZE // 2
+        self.centery = row * TILE_SIZE + TILE_SIZE // 2
+        self.status = 'idle'
+        self.wake = None        # 冷却结束的定时器
+        self.angle = 0
+        self.image = image
+
+class TrapSystem:
+    """
+    陷阱：玩家进入上下左右一格范围时转向玩家并放出刺 (Spike 仍是动态精灵)。
+    每帧只查看玩家附近的格子；冷却结束由定时器队列通知。
+    """
+    def __init__(self, player, visible_group, damage_group, timers):
+        self.player = player
+        self.visible_group = visible_group
+        self.damage_group = damage_group
+        self.timers = timers
+        self.spike_pool = SpritePool(Spike)
+        self.tiles = {}         # Key=(col, row), Value=TrapRecord
+
+        # 初始绘制 (青色，虚线)；四个朝向的旋转图只生成一次
+        self.image_base = AssetFactory.create_tile(
+            "刺", COLOR_CYAN, bg_color=COLOR_TRAP,
+            border_style='dashed', angle=0
+        )
+        self.rotated = {0: self.image_base}
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def add(self, col, row):
+        self.tiles[(col, row)] = TrapRecord(col, row, self.image_base)
+
+    def remove(self, col, row):
+        trap = self.tiles.pop((col, row), None)
+        if trap is not None and trap.wake is not None:
+            trap.wake.cancel()
+
+    def image_of(self, trap):
+        return trap.image
+
+    def reset(self):
+        """所有陷阱回到初始状态 (待命、朝上)"""
+        for trap in self.tiles.values():
+            trap.status = 'idle'
+            if trap.wake is not None:
+                trap.wake.cancel()
+                trap.wake = None
+            trap.angle = 0
+            trap.image = self.image_base
+
+    def update(self):
+        # 触发半径 1.5 格：只可能是玩家所在格子周围两格以内的陷阱 (按行优先，与地图顺序一致)
+        px, py = self.player.rect.center
+        pc, pr = px // TILE_SIZE, py // TILE_SIZE
+        tiles = self.tiles
+        for r in range(pr - 2, pr + 3):
+            for c in range(pc - 2, pc + 3):
+                trap = tiles.get((c, r))
+                if trap is not None and trap.status == 'idle':
+                    self._detect_player(trap, px - trap.centerx, py - trap.centery)
+
+    def _detect_player(self, trap, vx, vy):
+        if vx * vx + vy * vy > (TILE_SIZE * 1.5) ** 2: return
+
+        # 轴对齐判定
+        if abs(vx) < TILE_SIZE // 2:
+            direction = (0, 1 if vy > 0 else -1)
+            trap.angle = 180 if vy > 0 else 0
+            self._trigger(trap, direction)
+        elif abs(vy) < TILE_SIZE // 2:
+            direction = (1 if vx > 0 else -1, 0)
+            trap.angle = -90 if vx > 0 else 90
+            self._trigger(trap, direction)
+
+    def _trigger(self, trap, direction):
+        trap.status = 'cooldown'
+        # 冷却时间“超过” TRAP_COOLDOWN 毫秒才恢复
+        trap.wake = self.timers.call_later(TRAP_COOLDOWN + 1, self._cool_down, trap)
+
+        if trap.angle not in self.rotated:
+            self.rotated[trap.angle] = pygame.transform.rotate(self.image_base, trap.angle)
+        trap.image = self.rotated[trap.angle]
+
+        pos = (trap.col * TILE_SIZE, trap.row * TILE_SIZE)
+        self.spike_pool.acquire([self.visible_group, self.damage_group],
+                                start_pos=pos, direction=direction, timers=self.timers)
+
+    def _cool_down(self, trap):
+        trap.status = 'idle'
+        trap.wake = None
+
+class CocoonRecord:
+    __slots__ = ('col', 'row', 'detection_rect', 'is_triggered', 'wake')
+
+    def __init__(self, col, row):
+        self.col = col
+        self.row = row
+        rect = pygame.Rect(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        self.detection_rect = rect.inflate(TILE_SIZE * 2, TILE_SIZE * 2)
+        self.is_triggered = False
+        self.wake = None        # 孵化的定时器
+
+class CocoonSystem:
+    """
+    茧：玩家进入 3x3 范围后开始计时，时间到了孵化成鬼，并让出所在的格子。
+    每帧只查看玩家附近的格子；孵化由定时器队列触发。
+    """
+    def __init__(self, player, visible_group, damage_group, obstacle_grid, timers):
+        self.player = player
+        self.visible_group = visible_group
+        self.damage_group = damage_group
+        self.obstacle_grid = obstacle_grid
+        self.timers = timers
+        self.ghost_pool = SpritePool(Ghost)
+        self.tiles = {}         # Key=(col, row), Value=CocoonRecord (只含未孵化的)
+        self.hatched = []       # 上次 pop_hatched() 之后孵化的格子
+        self.image = AssetFactory.create_tile("茧", COLOR_GHOST, border_style='solid')
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def add(self, col, row):
+        self.tiles[(col, row)] = CocoonRecord(col, row)
+
+    def remove(self, col, row):
+        cocoon = self.tiles.pop((col, row), None)
+        if cocoon is not None and cocoon.wake is not None:
+            cocoon.wake.cancel()
+
+    def image_of(self, cocoon):
+        return self.image
+
+    def snapshot(self):
+        return tuple(self.tiles.values())
+
+    def restore(self, snapshot):
+        """恢复到快照时的状态 (已孵化的茧放回去并重新占住格子)，返回重新出现的格子"""
+        restored = [(c.col, c.row) for c in snapshot if (c.col, c.row) not in self.tiles]
+        for cocoon in snapshot:
+            cocoon.is_triggered = False
+            if cocoon.wake is not None:
+                cocoon.wake.cancel()
+                cocoon.wake = None
+        self.hatched.clear()
+        if restored:
+            # 按快照顺序重建，孵化顺序与第一次进入关卡时一致
+            self.tiles = {(c.col, c.row): c for c in snapshot}
+            self.obstacle_grid.update(restored)
+        return restored
+
+    def patch_snapshot(self, snapshot, tiles):
+        """热重载后修补快照：去掉 tiles 上原有的茧 (包括已孵化的)，加上这些格子上新放的茧"""
+        tiles = set(tiles)
+        kept = tuple(c for c in snapshot if (c.col, c.row) not in tiles)
+        return kept + tuple(self.tiles[t] for t in sorted(tiles, key=lambda t: (t[1], t[0])) if t in self.tiles)
+
+    def update(self):
+        """玩家进入范围的茧开始计时 (只查看玩家附近 3x3 范围能碰到的格子)"""
+        player_rect = self.player.rect
+        tiles = self.tiles
+        # 玩家矩形向四周各扩一格后覆盖的行、列 (直接遍历范围，每帧不创建列表和矩形)
+        left, top = player_rect.left - TILE_SIZE, player_rect.top - TILE_SIZE
+        right, bottom = player_rect.right + TILE_SIZE, player_rect.bottom + TILE_SIZE
+        for r in range(top // TILE_SIZE, (bottom - 1) // TILE_SIZE + 1):
+            for c in range(left // TILE_SIZE, (right - 1) // TILE_SIZE + 1):
+                cocoon = tiles.get((c, r))
+                if cocoon is not None and not cocoon.is_triggered and cocoon.detection_rect.colliderect(player_rect):
+                    cocoon.is_triggered = True
+                    cocoon.wake = self.timers.call_later(COCOON_SPAWN_DELAY, self._hatch, cocoon)
+
+    def pop_hatched(self):
+        """返回并清空最近孵化的格子列表 (每帧都会调用：没有孵化时直接返回空元组，不换新列表)"""
+        if not self.hatched:
+            return ()
+        hatched, self.hatched = self.hatched, []
+        return hatched
+
+    def _hatch(self, cocoon):
+        tile = (cocoon.col, cocoon.row)
+        cocoon.wake = None
+        self.hatched.append(tile)
+        del self.tiles[tile]
+        self.obstacle_grid.discard(tile)
+        self.ghost_pool.acquire(
+            [self.visible_group, self.damage_group],
+            pos=(cocoon.col * TILE_SIZE, cocoon.row * TILE_SIZE),
+            player=self.player,
+            wall_grid=self.obstacle_grid
+        )
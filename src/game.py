@@ -1,89 +1,280 @@
 # src/game.py
-import pygame, sys
+import pygame, sys, time
 from settings import *
 from level import Level
-from maps import LEVELS
+from maps import LEVELS, LEVEL_SEEDS, LEVEL_GEN_MS
 from ui import UI
+from assets import AssetFactory
+from atlas import TextureAtlas
+from simulation import SimClock
+from inputs import BufferedKeyboardInput, InputRecorder
+from telemetry import Telemetry, FrameStats
+from hotreload import MapWatcher
+from tracing import tracer
+from startup import startup
+from quality import QualityGovernor
+from gc_control import gc_control
 
 class Game:
-    def __init__(self):
-        # 初始化 Pygame
-        pygame.init()
+    def __init__(self, record=False, dev=False):
+        """
+        :param record: 为 True 时录制每一次尝试的输入，死亡或通关时保存到 RECORDINGS_DIR
+        :param dev: 开发模式，监视 maps.py，手工关卡改动后即时生效
+        """
+        self.record = record
+        self.map_watcher = MapWatcher() if dev else None
+        self.recorder = None
+        self.keyboard = None    # 当前关卡的键盘输入 (带缓冲)，KEYDOWN 事件喂给它
+        self.show_minimap = MINIMAP_ENABLED
+
+        # 遥测：每次尝试一关记录开始/结束两条事件，写盘在后台线程
+        self.telemetry = Telemetry()
+        self.telemetry.record("session_start", screen=[SCREEN_WIDTH, SCREEN_HEIGHT], fps=FPS)
+        self.frame_stats = None
+        self.attempt_start = 0.0
+
+        # 画质调速器：帧耗时超预算时先降特效，模拟和输入不受影响
+        self.quality = QualityGovernor()
+
+        # 垃圾回收：游玩中不做完整回收，推迟到关卡切换和静止画面
+        gc_control.install()
+
+        # 只初始化用到的子系统 (显示/事件 + 字体)；pygame.init() 还会初始化音频、手柄等，白白拖慢启动
+        with startup.phase("pygame subsystems"):
+            pygame.display.init()
+            pygame.font.init()
 
         # 创建显示窗口
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Pac-Man Game")
+        with startup.phase("display"):
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("Pac-Man Game")
+
+        # 加载纹理图集 (必须在创建窗口之后，才能转换成显示格式)
+        with startup.phase("texture atlas"):
+            AssetFactory.use_atlas(TextureAtlas.load_or_build())
 
         # 设置时钟
         self.clock = pygame.time.Clock()
 
         # 实例化Level
         self.current_level_index = 3
-        self.level = Level(self.current_level_index)    # 加载第0关
+        with startup.phase("first level (deferred)"):
+            self.level = self._create_level(self.current_level_index, deferred=True)    # 加载第0关
+            gc_control.enter_build()
         self.game_state = 'level_start'                 # 游戏状态level_start, playing, game_over
         
         # 实例化ui
-        self.ui = UI()
+        with startup.phase("ui"):
+            self.ui = UI()
 
     def run(self):
         while True:
-            # --- 事件监听 ---
-            for event in pygame.event.get():
-                # 如果检测到用户点击了窗口的关闭按钮，退出程序
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                
-                # 在GAME_OVER状态下检测到用户按下空格键，重启关卡
-                if self.game_state == 'game_over':
-                    if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-                        self.restart_level()
-                
-                # 关卡开始前,按回车进入游戏
-                if self.game_state == 'level_start':
-                    if event.type == pygame.KEYDOWN and (event.key == pygame.K_RETURN or event.key == pygame.K_KP_ENTER):
-                        self.game_state = 'playing'
-        
-            # --- 状态分发 ---      
+            with tracer.span("frame", 'game'):
+                # --- 事件监听 ---
+                with tracer.span("events", 'game'):
+                    self._handle_events()
+
+                # --- 开发模式：地图热重载 ---
+                if self.map_watcher is not None:
+                    self._hot_reload()
+
+                # --- 状态分发 ---
+                with tracer.span("update", 'game'):
+                    dirty_rects = self._update_state()
+
+                # 镜头静止时只推送改动过的区域
+                with tracer.span("present", 'render'):
+                    if dirty_rects is None:
+                        pygame.display.update()
+                    else:
+                        pygame.display.update(dirty_rects)
+                startup.first_frame()
+
+            # --- 控制循环时间 ---
+            with tracer.span("wait", 'game'):
+                self.clock.tick(FPS)
+
+            # --- 画质自适应：rawtime 是这一帧真正干活的时间 (不含锁帧等待) ---
             if self.game_state == 'playing':
+                self._adapt_quality(self.clock.get_rawtime())
+
+    def _handle_events(self):
+        for event in pygame.event.get():
+            # 如果检测到用户点击了窗口的关闭按钮，退出程序
+            if event.type == pygame.QUIT:
+                self.quit()
+
+            # F9：导出性能追踪 (需要 --trace)
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F9 and tracer.enabled:
+                print(f"Trace saved: {tracer.export()}")
+            
+            # 游戏中的方向键按下事件进入输入缓冲；M 键开关小地图，H 键显示下一步提示
+            if self.game_state == 'playing' and event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_m:
+                    self.show_minimap = self.level.show_minimap = not self.show_minimap
+                    self.level.visible_sprites.invalidate()
+                if event.key == pygame.K_h:
+                    moves_left = self.level.show_hint()
+                    self.telemetry.record("hint", level=self.current_level_index, moves_left=moves_left)
+                self.keyboard.feed(event)
+
+            # 在GAME_OVER状态下检测到用户按下空格键，重启关卡
+            if self.game_state == 'game_over':
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                    self.restart_level()
+            
+            # 关卡开始前,按回车进入游戏 (关卡建完之后才响应)
+            if self.game_state == 'level_start' and self.level.is_ready:
+                if event.type == pygame.KEYDOWN and (event.key == pygame.K_RETURN or event.key == pygame.K_KP_ENTER):
+                    self.game_state = 'playing'
+                    self._begin_attempt()
+
+    def _update_state(self):
+        """按当前状态推进一帧并绘制；返回需要刷新的屏幕矩形 (None 表示整屏)"""
+        dirty_rects = None
+        if self.game_state == 'playing':
+            # 运行 Level 并获取返回值
+            frame_start = time.perf_counter()
+            level_signal = self.level.run()
+            dirty_rects = self.level.dirty_rects
+            self.frame_stats.add((time.perf_counter() - frame_start) * 1000)
+            
+            if level_signal == 'game_over':
+                self._save_recording(level_signal)
+                self._end_attempt(level_signal)
+                self.game_state = 'game_over'       
+                gc_control.enter_static()
+            elif level_signal == 'level_complete':
+                self._save_recording(level_signal)
+                self._end_attempt(level_signal)
+                self.next_level()
+
+        elif self.game_state == 'game_over':
+            self.level.visible_sprites.custom_draw(self.level.player) 
+            
+            self.ui.show_game_over()
+        
+        elif self.game_state == 'level_start':
+            # 关卡分帧构建：每帧只花固定的时间预算，画面保持满帧；建完的那一帧冻结关卡对象
+            if not self.level.is_ready and self.level.continue_build():
+                gc_control.level_ready()
+
+            if self.level.player is None:
                 self.screen.fill(COLOR_BG)
-                
-                # 运行 Level 并获取返回值
-                level_signal = self.level.run()
-                
-                if level_signal == 'game_over':
-                    self.game_state = 'game_over'       
-                elif level_signal == 'level_complete':
-                    self.next_level()
-
-            elif self.game_state == 'game_over':
+            else:
                 self.level.visible_sprites.custom_draw(self.level.player) 
-                
-                self.ui.show_game_over()
             
-            elif self.game_state == 'level_start':
-                self.level.visible_sprites.custom_draw(self.level.player) 
-                
-                # 绘制 LEVEL X 弹窗
-                self.ui.show_level_start(self.current_level_index)
-                
-            pygame.display.update()
+            # 绘制 LEVEL X 弹窗
+            self.ui.show_level_start(self.current_level_index, self.level.build_progress)
+        return dirty_rects
 
-            # --- 控制循环时间 ---
-            self.clock.tick(FPS)
+    def _adapt_quality(self, frame_ms):
+        tier = self.quality.observe(frame_ms)
+        if tier is not None:
+            self.level.set_quality(self.quality.settings)
+            self.telemetry.record("quality_change", level=self.current_level_index, tier=tier, frame_ms=frame_ms)
+
+    def quit(self):
+        """退出：写出遥测和追踪数据"""
+        # 写盘失败丢掉的事件数一并上报 (这一条本身之后的丢失由 close() 打印)
+        self.telemetry.record("session_end", dropped=self.telemetry.dropped)
+        self.telemetry.close()
+        if tracer.enabled:
+            print(f"Trace saved: {tracer.export()}")
+        pygame.quit()
+        sys.exit()
     
+    def _create_level(self, level_index, deferred=False):
+        """
+        实例化关卡；录制模式下给关卡接上输入录制器
+        :param deferred: 为 True 时关卡在 level_start 画面中分帧构建
+        """
+        clock = SimClock()
+        self.keyboard = BufferedKeyboardInput(clock)
+        input_source = self.keyboard
+        if self.record:
+            self.recorder = InputRecorder(input_source, clock, level_index, LEVEL_SEEDS.get(level_index))
+            input_source = self.recorder
+        level = Level(level_index, clock=clock, input_source=input_source, deferred=deferred)
+        level.show_minimap = self.show_minimap
+        level.set_quality(self.quality.settings)
+        return level
+
+    def _hot_reload(self):
+        """maps.py 改动后：更新手工关卡数据，当前关卡就地增量重建"""
+        levels = self.map_watcher.poll()
+        if levels is None:
+            return
+        for index, rows in levels.items():
+            LEVELS[index] = rows
+        if self.current_level_index in levels and self.level.is_ready:
+            changed = self.level.apply_map(levels[self.current_level_index])
+            print(f"Hot reload: level {self.current_level_index}, {len(changed)} tiles changed")
+
+    def _begin_attempt(self):
+        """开始游玩当前关卡：上报关卡信息，开始统计帧耗时"""
+        self.frame_stats = FrameStats()
+        self.attempt_start = time.perf_counter()
+        self.quality.reset_window()
+        gc_control.reset_stats()
+        gc_control.enter_play()
+        self.telemetry.record(
+            "level_start",
+            level=self.current_level_index,
+            seed=LEVEL_SEEDS.get(self.current_level_index),
+            size=[len(self.level.map_data[0]), len(self.level.map_data)],
+            gen_ms=round(LEVEL_GEN_MS.get(self.current_level_index, 0.0), 3),
+            build_ms=round(self.level.build_ms, 3),
+        )
+
+    def _end_attempt(self, result):
+        """一次尝试结束 (死亡或通关)：上报结果、用时和帧耗时分位数"""
+        self.telemetry.record(
+            "level_end",
+            level=self.current_level_index,
+            seed=LEVEL_SEEDS.get(self.current_level_index),
+            result=result,
+            cause=self.level.death_cause,
+            ticks_ms=self.level.clock.get_ticks(),      # 模拟时间：通关时即到达门的用时
+            wall_s=round(time.perf_counter() - self.attempt_start, 3),
+            quality_tier=self.quality.tier,
+            **self.frame_stats.summary(),
+            **gc_control.summary(),
+        )
+
+    def _save_recording(self, result):
+        if self.recorder is not None:
+            path = self.recorder.save(result)
+            print(f"Recording saved: {path}")
+            self.recorder = None
+
     def restart_level(self):
-        """重试：重新实例化当前关卡"""
-        self.level = Level(self.current_level_index)
+        """重试：同一关就地从快照恢复；换了关卡 (通关后回到第 0 关) 才重新实例化"""
+        if self.level.level_index == self.current_level_index and self.level.is_ready:
+            self.keyboard.clear()
+            input_source = self.keyboard
+            if self.record:
+                self.recorder = InputRecorder(self.keyboard, self.level.clock, self.current_level_index,
+                                              LEVEL_SEEDS.get(self.current_level_index))
+                input_source = self.recorder
+            self.level.restart(input_source)
+            gc_control.level_restarted()
+        else:
+            self.level = self._create_level(self.current_level_index)
+            gc_control.release_level()
+            gc_control.level_ready()
         self.game_state = 'playing'
+        self._begin_attempt()
 
     def next_level(self):
         """下一关"""
         self.current_level_index += 1
         # 检查是否还有下一关
         if self.current_level_index in LEVELS:
-            self.level = Level(self.current_level_index)
+            self.level = self._create_level(self.current_level_index, deferred=True)
             self.game_state = 'level_start'
+            gc_control.release_level()
+            gc_control.enter_build()
         else:
             self.current_level_index = 0 
             self.restart_level()
\ No newline at end of file
@@ -0,0 +1,134 @@
+# src/gc_control.py
+import gc
+import time
+from contextlib import contextmanager
+from settings import *
+from tracing import tracer
+"""
+[垃圾回收控制]
+一关有成千上万个精灵和组内条目，换关时整批丢弃——这正是会在关卡中途触发完整 (第 2 代) 回收的模式，
+一次要扫描所有存活对象，造成明显的卡顿。这里由游戏自己决定回收时机：
+  分帧构建关卡 (LEVEL X 画面)：和游玩中一样推迟完整回收，免得构建中途某一帧被它卡住
+  关卡建完 (还停在 LEVEL X 画面)：完整回收一次清掉构建期的临时对象，再 gc.freeze() 把存活对象移出回收范围
+  就地重开：关卡对象已经冻结，只做一次年轻代回收
+  游玩中：换成 GC_PLAY_THRESHOLDS，年轻代照常回收 (只扫新对象，很快)，完整回收推迟
+  game over、换关等静止画面：恢复默认阈值并完整回收；换关时先解冻旧关卡，让它能被回收
+  地图生成：整段暂停自动回收 (paused())
+每次回收的耗时都会记下来：按游玩/静止分别统计，开启追踪时写进时间线，另外可以挂调试钩子 (--gc-log)。
+"""
+
+class GcControl:
+    def __init__(self, play_thresholds=GC_PLAY_THRESHOLDS, enabled=GC_CONTROL):
+        self.enabled = enabled
+        self.play_thresholds = play_thresholds
+        self.default_thresholds = gc.get_threshold()
+        self.mode = 'static'        # 'play' / 'static'：回收发生在游玩中还是静止画面
+        self.hooks = []             # 调试钩子：每次回收结束调用 hook(代, 耗时毫秒, 回收对象数, 模式)
+        self.installed = False
+        self._start = 0
+        self.reset_stats()
+
+    def install(self):
+        """开始监听回收 (统计耗时)；重复调用无效"""
+        if not self.installed:
+            gc.callbacks.append(self._on_gc)
+            self.installed = True
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def reset_stats(self):
+        """清空统计 (每次开始游玩时调用)"""
+        self.stats = {mode: {"collections": [0, 0, 0], "total_ms": 0.0, "max_ms": 0.0}
+                      for mode in ('play', 'static')}
+
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._start = time.perf_counter_ns()
+            return
+        end = time.perf_counter_ns()
+        generation = info['generation']
+        pause_ms = (end - self._start) / 1e6
+        stats = self.stats[self.mode]
+        stats["collections"][generation] += 1
+        stats["total_ms"] += pause_ms
+        stats["max_ms"] = max(stats["max_ms"], pause_ms)
+        if tracer.enabled:
+            tracer.add(f"gc gen{generation}", 'gc', self._start, end)
+        for hook in self.hooks:
+            hook(generation, pause_ms, info['collected'], self.mode)
+
+    # =========================================================================
+    #  回收时机
+    # =========================================================================
+    def enter_build(self):
+        """开始分帧构建关卡：推迟完整回收 (构建期的对象都还活着，扫一遍很慢)；建完后 level_ready() 会完整回收一次"""
+        self.mode = 'static'
+        if self.enabled:
+            gc.set_threshold(*self.play_thresholds)
+
+    def level_ready(self):
+        """关卡建完或从快照恢复之后 (开始游玩之前)：完整回收一次，再冻结所有存活对象"""
+        if not self.enabled:
+            return
+        gc.collect()
+        gc.freeze()
+
+    def level_restarted(self):
+        """
+        就地重开 (快照恢复) 之后：关卡对象早已冻结，game over 时也已完整回收过，
+        这里只剩重开时清掉的精灵，年轻代回收一次就够，不再做完整回收和冻结
+        """
+        if self.enabled:
+            gc.collect(0)
+
+    def enter_play(self):
+        """开始游玩：推迟完整回收"""
+        self.mode = 'play'
+        if self.enabled:
+            gc.set_threshold(*self.play_thresholds)
+
+    def enter_static(self):
+        """进入静止画面 (game over 等)：恢复默认阈值，把游玩中攒下的垃圾完整回收掉"""
+        self.mode = 'static'
+        if self.enabled:
+            gc.set_threshold(*self.default_thresholds)
+            gc.collect()
+
+    def release_level(self):
+        """换关：旧关卡不再被引用之后调用。解冻 (冻结的对象不会被回收)，再完整回收"""
+        if self.enabled:
+            gc.unfreeze()
+        self.enter_static()
+
+    @contextmanager
+    def paused(self):
+        """
+        一段只建对象的批量计算 (生成大地图) 期间暂停自动回收：生成过程不产生循环引用，
+        临时对象靠引用计数就能释放，自动回收只会一遍遍扫描越来越多的存活对象。
+        结束后恢复原状，不主动回收
+        """
+        if not self.enabled or not gc.isenabled():
+            yield
+            return
+        gc.disable()
+        try:
+            yield
+        finally:
+            gc.enable()
+
+    def summary(self, mode='play'):
+        """某个模式下的回收统计，供遥测上报"""
+        stats = self.stats[mode]
+        return {
+            "gc_collections": list(stats["collections"]),
+            "gc_total_ms": round(stats["total_ms"], 3),
+            "gc_max_ms": round(stats["max_ms"], 3),
+        }
+
+def log_pause(generation, pause_ms, collected, mode):
+    """调试钩子：每次回收打印一行"""
+    print(f"gc gen{generation} {pause_ms:7.3f} ms  collected {collected:<6} ({mode})")
+
+# 全局实例：Game 和 soak.py 共用
+gc_control = GcControl()
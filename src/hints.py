@@ -0,0 +1,248 @@
+# src/hints.py
+import heapq
+from settings import *
+from slide_graph import SlideGraph, DIRS
+"""
+[提示表] (游戏中按 H)
+关卡载入时在滑行图上从门出发做一次反向 BFS，得到每个停止位置到门的最少滑行次数。
+提示时只看当前位置的 4 个滑行方向，选终点离门最近的那个，是 O(1) 的查表。
+茧孵化 (或重开时放回) 只改变同一行、同一列上被它隔开的那几段的滑行边：
+重新连接这些位置，再只修复距离可能变化的那部分 (先按旧距离找出失去最短路的位置，再从边界向内重新松弛)。
+改动先记下来，下一次查询时才处理：不看提示的话游玩中不用为它花任何时间。
+鬼和刺不算在内：提示给的是地形上的最短路线。
+"""
+
+class HintTable:
+    def __init__(self, grid, doors, stoppers='WO^'):
+        """
+        建好之后还要跑完 build_rows() 才能查询。
+        :param grid: 地图行列表
+        :param doors: 门所在的格子；滑行经过门就算到达
+        :param stoppers: 挡住玩家的地图字符 (与关卡的碰撞网格一致)
+        """
+        self.grid = grid
+        self.stoppers = stoppers
+        self.graph = SlideGraph(grid, stoppers=stoppers, hazards='', deferred=True)
+        self.door_rows = {}     # 行 -> 这一行上门的 x 坐标
+        self.door_cols = {}     # 列 -> 这一列上门的 y 坐标
+        for x, y in doors:
+            self.door_rows.setdefault(y, []).append(x)
+            self.door_cols.setdefault(x, []).append(y)
+        self.succ = {}      # 停止位置 -> [(方向, 终点, 是否经过门)]
+        self.pred = {}      # 停止位置 -> {一次滑行能到这里的停止位置}
+        self.dist = {}      # 停止位置 -> 到门的最少滑行次数 (到不了的不在表里)
+        self.pending = {}   # 还没处理的阻挡变化：格子 -> 是否变成阻挡
+
+    def build_rows(self, chunk=HINT_BUILD_CHUNK):
+        """
+        整张表建一遍 (生成器，配合关卡分帧构建)：滑行图每扫描完一行、每连接完一行 yield 一次，
+        BFS 每展开 chunk 个位置 yield 一次
+        """
+        grid, stoppers = self.grid, self.stoppers
+        h, w = self.graph.h, self.graph.w
+        yield from self.graph.scan_rows(grid)
+        sources = []    # 一次滑行就能经过门的位置 (BFS 的第一层)，连接时顺便收集
+        for y, row in enumerate(grid):
+            for x, char in enumerate(row):
+                if char in stoppers:
+                    continue
+                # 至少一侧是阻挡或地图边缘的空格才可能是滑行的终点
+                for dx, dy in DIRS:
+                    nx, ny = x + dx, y + dy
+                    if not (0 <= nx < w and 0 <= ny < h) or grid[ny][nx] in stoppers:
+                        if self._link((x, y)):
+                            sources.append((x, y))
+                        break
+            yield
+        yield from self._bfs(sources, chunk)
+
+    # =========================================================================
+    #  查询
+    # =========================================================================
+    def next_direction(self, cell):
+        """从 cell 出发最优的下一次滑行方向；到不了门时返回 None"""
+        if self.pending:
+            self._flush()
+        best, best_dir = None, None
+        for direction, end in self.graph.moves(cell):
+            if self._passes_door(cell, end):
+                cost = 1
+            elif end in self.dist:
+                cost = self.dist[end] + 1
+            else:
+                continue
+            if best is None or cost < best:
+                best, best_dir = cost, direction
+        return best_dir
+
+    def moves_left(self, cell):
+        """cell 到门还要滑几次；cell 不是停止位置或到不了时返回 None"""
+        if self.pending:
+            self._flush()
+        return self.dist.get(cell)
+
+    # =========================================================================
+    #  构建
+    # =========================================================================
+    def _passes_door(self, start, end):
+        """start -> end 这一段滑行是否经过门"""
+        (x1, y1), (x2, y2) = start, end
+        if y1 == y2:
+            line, lo, hi = self.door_rows.get(y1), min(x1, x2), max(x1, x2)
+        else:
+            line, lo, hi = self.door_cols.get(x1), min(y1, y2), max(y1, y2)
+        return line is not None and any(lo <= k <= hi for k in line)
+
+    def _link(self, cell):
+        """(重新) 计算 cell 的滑行边，并登记到终点的反向邻接表。返回是否有一条边经过门"""
+        for _, end, _ in self.succ.get(cell, ()):
+            self.pred[end].discard(cell)
+        edges = []
+        door_edge = False
+        for direction, end in self.graph.moves(cell):
+            door = self._passes_door(cell, end)
+            door_edge = door_edge or door
+            edges.append((direction, end, door))
+            self.pred.setdefault(end, set()).add(cell)
+        self.succ[cell] = edges
+        return door_edge
+
+    def _unlink(self, cell):
+        for _, end, _ in self.succ.pop(cell, ()):
+            self.pred[end].discard(cell)
+        self.dist.pop(cell, None)
+
+    def _bfs(self, layer, chunk):
+        """反向 BFS：layer (一次滑行就能经过门的位置) 距离为 1，再沿反向边逐层向外 (每展开 chunk 个位置 yield 一次)"""
+        dist, pred = self.dist, self.pred
+        for cell in layer:
+            dist[cell] = 1
+        d = 1
+        count = 0
+        while layer:
+            d += 1
+            frontier = []
+            for cell in layer:
+                for prev in pred.get(cell, ()):
+                    if prev not in dist:
+                        dist[prev] = d
+                        frontier.append(prev)
+                count += 1
+                if count == chunk:
+                    count = 0
+                    yield
+            layer = frontier
+
+    # =========================================================================
+    #  增量更新
+    # =========================================================================
+    def unblock(self, cell):
+        """cell 上的阻挡消失了 (茧孵化)"""
+        self._queue(cell, False)
+
+    def block(self, cell):
+        """cell 上重新出现阻挡 (重开时茧放回原处)"""
+        self._queue(cell, True)
+
+    def _queue(self, cell, blocked):
+        # 孵化后还没查询就重开：两次改动互相抵消
+        if self.pending.get(cell, blocked) != blocked:
+            del self.pending[cell]
+        else:
+            self.pending[cell] = blocked
+
+    def _flush(self):
+        """处理记下的改动 (各格子互不影响结果，顺序无关)"""
+        pending, self.pending = self.pending, {}
+        for cell, blocked in pending.items():
+            if blocked:
+                span = self._span(cell)
+                self.graph.block(cell)
+                self._unlink(cell)
+            else:
+                self.graph.unblock(cell)
+                span = self._span(cell) + [cell]
+            self._update(self._stops_in(cell, span))
+
+    def _span(self, cell):
+        """cell 为空地时，同一行、同一列上与它连通的那两段格子 (不含 cell；其中停止位置的滑行边会随 cell 变化)"""
+        graph = self.graph
+        x, y = cell
+        left, right = graph.slide(cell, (-1, 0))[0], graph.slide(cell, (1, 0))[0]
+        top, bottom = graph.slide(cell, (0, -1))[1], graph.slide(cell, (0, 1))[1]
+        return [(i, y) for i in range(left, right + 1) if i != x] + [(x, j) for j in range(top, bottom + 1) if j != y]
+
+    def _stops_in(self, cell, span):
+        """
+        span 里 cell 变化之后的停止位置。只有 cell 自己和紧挨着它的四格可能变成或不再是停止位置：
+        挡住时新出现的停止位置要连接上；放开时不再是停止位置的解除连接，不留下过时的边和距离
+        """
+        x, y = cell
+        near = {cell, (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)}
+        stops = []
+        for c in span:
+            if c not in near:
+                if c in self.succ:
+                    stops.append(c)
+            elif self._is_stop(c):
+                stops.append(c)
+            elif c in self.succ:
+                self._unlink(c)
+        return stops
+
+    def _is_stop(self, cell):
+        return any(self.graph.slide(cell, d) == cell for d in DIRS)
+
+    def _candidate(self, cell):
+        """按当前各终点的距离，cell 能取到的最小距离 (None 表示到不了)"""
+        best = None
+        for _, end, door in self.succ[cell]:
+            if door:
+                d = 1
+            elif end in self.dist:
+                d = self.dist[end] + 1
+            else:
+                continue
+            if best is None or d < best:
+                best = d
+        return best
+
+    def _update(self, changed):
+        """changed 里的位置滑行边变了：重新连接，再修复受影响的距离"""
+        for c in changed:
+            self._link(c)
+        dist, pred = self.dist, self.pred
+
+        # 1. 按旧距离从小到大，找出不再有等长路线支撑的位置；失效会沿反向边向上游传递
+        invalid = set()
+        heap = [(dist[c], c) for c in changed if c in dist]
+        heapq.heapify(heap)
+        while heap:
+            d, c = heapq.heappop(heap)
+            if c in invalid:
+                continue
+            if any((door and d == 1) or (end not in invalid and dist.get(end) == d - 1)
+                   for _, end, door in self.succ[c]):
+                continue
+            invalid.add(c)
+            for prev in pred.get(c, ()):
+                if dist.get(prev) == d + 1 and prev not in invalid:
+                    heapq.heappush(heap, (d + 1, prev))
+        for c in invalid:
+            del dist[c]
+
+        # 2. 失效的位置和边变了的位置从仍然有效的邻居取候选距离，按距离从小到大确定并向上游松弛
+        heap = []
+        for c in invalid.union(changed):
+            d = self._candidate(c)
+            if d is not None and d < dist.get(c, d + 1):
+                heap.append((d, c))
+        heapq.heapify(heap)
+        while heap:
+            d, c = heapq.heappop(heap)
+            if c in dist and dist[c] <= d:
+                continue
+            dist[c] = d
+            for prev in pred.get(c, ()):
+                if d + 1 < dist.get(prev, d + 2):
+                    heapq.heappush(heap, (d + 1, prev))
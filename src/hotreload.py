@@ -0,0 +1,56 @@
+# src/hotreload.py
+import os
+import ast
+import time
+from settings import *
+"""
+[地图热重载] (开发模式：python main.py --dev)
+定时检查 maps.py 的修改时间；变了就只解析源码里的 LEVELS = {...} 字面量 (不执行模块，
+不会重新生成程序化关卡)，把手工关卡的新数据交给正在运行的 Level 做增量重建。
+"""
+
+MAPS_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'maps.py')
+
+def read_levels(path=MAPS_SOURCE):
+    """从源码中取出 LEVELS 字典字面量：{关卡号: [行, ...]}"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == 'LEVELS' for target in node.targets
+        ):
+            return ast.literal_eval(node.value)
+    raise ValueError(f"LEVELS not found in {path}")
+
+class MapWatcher:
+    def __init__(self, path=MAPS_SOURCE, interval_ms=HOT_RELOAD_INTERVAL_MS):
+        self.path = path
+        self.interval = interval_ms / 1000
+        self.next_check = 0.0
+        self.mtime = self._mtime()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self):
+        """
+        每帧调用；文件有改动时返回新的 LEVELS，否则返回 None。
+        编辑器保存到一半、语法错误等情况下打印原因并忽略这一次改动。
+        """
+        now = time.perf_counter()
+        if now < self.next_check:
+            return None
+        self.next_check = now + self.interval
+
+        mtime = self._mtime()
+        if mtime is None or mtime == self.mtime:
+            return None
+        self.mtime = mtime
+        try:
+            return read_levels(self.path)
+        except (SyntaxError, ValueError) as e:
+            print(f"Hot reload skipped: {e}")
+            return None
@@ -0,0 +1,114 @@
+# src/inputs.py
+import os
+import json
+import time
+import pygame
+from collections import deque
+from settings import *
+
+# 按键 -> 方向，按优先级排列 (与原来 if/elif 的顺序一致)
+KEY_DIRECTIONS = [
+    ((pygame.K_UP, pygame.K_w), (0, -1)),
+    ((pygame.K_DOWN, pygame.K_s), (0, 1)),
+    ((pygame.K_LEFT, pygame.K_a), (-1, 0)),
+    ((pygame.K_RIGHT, pygame.K_d), (1, 0)),
+]
+
+class KeyboardInput:
+    """实时键盘输入：返回当前按住的方向，没有按键时返回 None"""
+    def poll(self):
+        keys = pygame.key.get_pressed()
+        for key_group, direction in KEY_DIRECTIONS:
+            if any(keys[k] for k in key_group):
+                return direction
+        return None
+
+class BufferedKeyboardInput(KeyboardInput):
+    """
+    [输入缓冲]
+    Game.run 把 KEYDOWN 事件交给 feed()，按下的方向连同按下时刻一起排队；
+    滑行途中按的键不会丢，玩家在滑行结束的那一个 tick 就能拿到它。
+    队列为空时退回到读当前按住的键。
+    """
+    def __init__(self, clock, size=INPUT_BUFFER_SIZE, expire_ms=INPUT_BUFFER_MS):
+        self.clock = clock
+        self.expire_ms = expire_ms
+        self.queue = deque(maxlen=size)    # [(按下时刻, 方向), ...]
+        self.key_map = {k: direction for keys, direction in KEY_DIRECTIONS for k in keys}
+
+    def feed(self, event):
+        if event.type == pygame.KEYDOWN and event.key in self.key_map:
+            self.queue.append((self.clock.get_ticks(), self.key_map[event.key]))
+
+    def clear(self):
+        self.queue.clear()
+
+    def poll(self):
+        now = self.clock.get_ticks()
+        while self.queue:
+            pressed_at, direction = self.queue.popleft()
+            if now - pressed_at <= self.expire_ms:
+                return direction
+        return super().poll()
+
+class InputRecorder:
+    """
+    [输入录制]
+    包装另一个输入源，把每次读到的方向按 (tick, 方向) 记下来，连同关卡编号和地图种子一起存成 JSON。
+    """
+    def __init__(self, source, clock, level_index, seed):
+        self.source = source
+        self.clock = clock
+        self.level_index = level_index
+        self.seed = seed
+        self.events = []    # [[tick, dx, dy], ...]
+
+    def poll(self):
+        direction = self.source.poll()
+        if direction is not None:
+            self.events.append([self.clock.frame, direction[0], direction[1]])
+        return direction
+
+    def save(self, result, directory=RECORDINGS_DIR):
+        """保存录像，返回文件路径"""
+        os.makedirs(directory, exist_ok=True)
+        name = f"level{self.level_index}_{time.strftime('%Y%m%d_%H%M%S')}_{result}.json"
+        path = os.path.join(directory, name)
+        data = {
+            "level": self.level_index,
+            "seed": self.seed,
+            "result": result,
+            "frames": self.clock.frame,
+            "events": self.events,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        return path
+
+class ReplayInput:
+    """[录像输入] 在录制时的同一个 tick 返回同一个方向"""
+    def __init__(self, events, clock):
+        self.clock = clock
+        self.events = {tick: (dx, dy) for tick, dx, dy in events}
+
+    def poll(self):
+        return self.events.get(self.clock.frame)
+
+class AutopilotInput:
+    """
+    [自动驾驶] 按给定的停止位置序列 (MapGenerator.solution_stops) 依次滑行。
+    创建关卡后需要把 player 接上：autopilot.player = level.player
+    """
+    def __init__(self, stops):
+        self.stops = deque(stops)
+        self.player = None
+
+    def poll(self):
+        tile = (self.player.rect.x // TILE_SIZE, self.player.rect.y // TILE_SIZE)
+        while self.stops and self.stops[0] == tile:
+            self.stops.popleft()
+        if not self.stops:
+            return None
+        tx, ty = self.stops[0]
+        dx, dy = tx - tile[0], ty - tile[1]
+        return ((dx > 0) - (dx < 0), 0) if dx else (0, (dy > 0) - (dy < 0))
@@ -1,128 +1,430 @@
 # src/level.py
+import time
 import pygame
 from settings import *
 from maps import LEVELS
-from sprites import Wall, Door, Coin, Cocoon, Trap, Ghost, Player
+from sprites import Door, Ghost, Player
+from entities import CoinStore, TrapSystem, CocoonSystem
 from assets import AssetFactory
 from particles import TrailSprite, BubbleSprite
 from camera import CameraGroup
+from minimap import Minimap
+from hints import HintTable
+from simulation import SimClock
+from timers import TimerQueue
+from inputs import KeyboardInput
+from tracing import tracer
+
+# 会挡住玩家的地图字符：墙、茧、陷阱
+OBSTACLE_CHARS = 'WO^'
 
 class Level:
-    def __init__(self, level_index):
+    def __init__(self, level_index, map_data=None, clock=None, input_source=None, deferred=False):
+        """
+        :param map_data: 地图行列表；默认取 LEVELS[level_index] (回放时传入按种子重建的地图)
+        :param clock: 模拟时钟；默认新建一个 SimClock
+        :param input_source: 玩家输入源；默认读键盘 (回放时传入 ReplayInput)
+        :param deferred: 为 True 时不在构造函数里建完关卡，而是由 continue_build() 分多帧完成
+        """
         self.display_surface = pygame.display.get_surface()
         self.level_index = level_index
+        self.map_data = map_data if map_data is not None else LEVELS[level_index]
+        self.clock = clock if clock is not None else SimClock()
+        self.timers = TimerQueue(self.clock)     # 茧孵化、陷阱冷却、刺的预警/停留
+        self.input_source = input_source if input_source is not None else KeyboardInput()
         
         # 初始化组
         self.visible_sprites = CameraGroup()
-        self.obstacle_sprites = pygame.sprite.Group()
         self.damage_sprites = pygame.sprite.Group()
-        self.coin_sprites = pygame.sprite.Group()
         self.goal_sprites = pygame.sprite.Group()
+
+        # 小地图：缓存图在构建的最后一步画好，之后只按变化的格子局部重画
+        self.minimap = Minimap(self)
+        self.show_minimap = MINIMAP_ENABLED
+
+        # 分帧构建：_build_job 每次 next() 只做一小块工作
+        self.player = None
+        self.dirty_rects = None     # 上一帧改动过的屏幕矩形 (None 表示整屏)
+        self.is_ready = False
+        self.build_progress = 0.0
+        self.build_ms = 0.0         # 构建实际花掉的时间 (分帧构建时是各帧之和)
+        self.death_cause = None     # 死亡原因：'ghost' / 'spike'
+        self.hints = None           # 提示表 (构建的最后阶段生成)
+        self.hint_until = 0         # 提示箭头显示到这个时刻 (模拟时间毫秒)，0 表示没有显示
+        self.quality = QUALITY_TIERS[0]     # 特效档位 (由 Game 的画质调速器设置)
+        self._bubble_credit = 0.0   # 气泡密度 < 1 时累积的份额，攒够 1 才生成一个
+        self._build_job = self._build_steps()
         
-        self._build_level()
+        if not deferred:
+            self._build_level()
 
     def _build_level(self):
-        """解析地图数据并生成物体"""
+        """一次性建完整个关卡"""
+        start = time.perf_counter()
+        with tracer.span("Level.build", 'level'):
+            for _ in self._build_job:
+                pass
+        self.build_ms += (time.perf_counter() - start) * 1000
+
+    def continue_build(self, budget_ms=LEVEL_BUILD_BUDGET_MS):
+        """
+        [分帧构建] 在 budget_ms 毫秒的时间预算内尽量推进关卡构建。
+        返回 True 表示已经建完，可以开始游玩。
+        """
+        if self.is_ready:
+            return True
+        start = time.perf_counter()
+        deadline = start + budget_ms / 1000
+        with tracer.span("Level.build", 'level'):
+            for _ in self._build_job:
+                if time.perf_counter() >= deadline:
+                    break
+        self.build_ms += (time.perf_counter() - start) * 1000
+        return self.is_ready
+
+    def _build_steps(self):
+        """解析地图数据并生成物体 (生成器：每处理完一行 yield 一次)"""
         # 获取当前地图数据
-        current_map = LEVELS[self.level_index]
+        current_map = self.map_data
+        total_rows = len(current_map) * 4 + self.minimap.rows   # 碰撞网格一遍 + 生成物体一遍 + 提示表两遍 + 小地图
 
-        # 生成碰撞网格
+        # 预热本关要用到的资源
+        AssetFactory.preload_level(current_map)
+        yield
+
+        # 生成碰撞网格，顺便找到玩家出生点
         self.obstacle_grid = set()
+        player_pos = None
         for r, row in enumerate(current_map):
             for c, col in enumerate(row):
-                if col == 'W' or col == 'O' or col == '^':
+                if col in OBSTACLE_CHARS:
                     self.obstacle_grid.add((c, r))
+                elif col == 'P':
+                    player_pos = (c, r)
+            self.build_progress = (r + 1) / total_rows
+            yield
 
-        # 生成玩家
-        for r, row in enumerate(current_map):
-            for c, col in enumerate(row):
-                if col == 'P':
-                    self.player = Player(
-                        groups=[self.visible_sprites],
-                        pos=(c*TILE_SIZE, r*TILE_SIZE),
-                        obstacle_sprites=self.obstacle_sprites,
-                        create_particle_func=self.trigger_particle
-                    )
+        # 生成玩家 (其他物体要引用玩家，所以最先生成)
+        if player_pos is not None:
+            c, r = player_pos
+            self.player = Player(
+                groups=[self.visible_sprites],
+                pos=(c*TILE_SIZE, r*TILE_SIZE),
+                obstacle_grid=self.obstacle_grid,
+                create_particle_func=self.trigger_particle,
+                clock=self.clock,
+                input_source=self.input_source
+            )
+
+        # 静态实体存储 (不再是 Sprite)，由 CameraGroup 按格子绘制
+        self.coins = CoinStore()
+        self.traps = TrapSystem(self.player, self.visible_sprites, self.damage_sprites, self.timers)
+        self.cocoons = CocoonSystem(self.player, self.visible_sprites, self.damage_sprites,
+                                    self.obstacle_grid, self.timers)
+        for store in (self.coins, self.traps, self.cocoons):
+            self.visible_sprites.add_layer(store)
+        self.wall_image = AssetFactory.create_tile("墙", COLOR_WALL, border_style='solid')
+        self.doors = {}         # Key=(col, row), Value=Door
+        self.map_ghosts = {}    # 地图上直接放置的鬼：Key=出生格子, Value=Ghost (热重载时用来移除)
 
         # 生成其他物体
         for r, row in enumerate(current_map):
             for c, col in enumerate(row):
-                pos = (c * TILE_SIZE, r * TILE_SIZE)
-                
-                if col == 'W':
-                    # 墙壁：特殊处理，加入静态网格优化
-                    wall = Wall([self.obstacle_sprites], pos)
-                    self.visible_sprites.add_static(wall)
-                
-                elif col == 'D':
-                    Door(
-                        groups=[self.visible_sprites, self.goal_sprites],
-                        pos=pos,
-                    )
-                    
-                elif col == 'C':
-                    Coin(
-                        groups=[self.visible_sprites, self.coin_sprites], # 加入可见组和金币组
-                        pos=pos,
-                    )
-                    
-                elif col == 'G':
-                    Ghost(
-                        groups=[self.visible_sprites, self.damage_sprites], # 加入伤害组
-                        pos=pos,
-                        obstacle_sprites=self.obstacle_sprites,
-                        player=self.player, # 鬼需要知道人在哪
-                        wall_grid=self.obstacle_grid
-                    )
-                    
-                elif col == 'O':
-                    Cocoon(
-                        groups=[self.visible_sprites, self.obstacle_sprites], 
-                        pos=pos,
-                        player=self.player, # 需要玩家引用来检测距离
-                        visible_group=self.visible_sprites,
-                        damage_group=self.damage_sprites,
-                        obstacle_sprites=self.obstacle_sprites,
-                        wall_grid=self.obstacle_grid
-                    )
-                
-                elif col == '^':
-                    Trap(
-                        groups=[self.visible_sprites, self.obstacle_sprites], 
-                        pos=pos, 
-                        damage_group=self.damage_sprites, 
-                        player=self.player
-                    )
+                self._spawn(c, r, col)
+            self.build_progress = (len(current_map) + r + 1) / total_rows
+            yield
+
+        # 提示表：逐行登记阻挡、逐行连接滑行边，再从门反向 BFS (之后的 yield 是 BFS 的分段，进度条不再前进)
+        self.hints = HintTable(current_map, self.doors, stoppers=OBSTACLE_CHARS)
+        for i, _ in enumerate(self.hints.build_rows()):
+            self.build_progress = (len(current_map) * 2 + min(i + 1, len(current_map) * 2)) / total_rows
+            yield
+
+        # 画小地图缓存
+        for i, _ in enumerate(self.minimap.build_rows()):
+            self.build_progress = (len(current_map) * 4 + i + 1) / total_rows
+            yield
+
+        self.build_progress = 1.0
+        self.is_ready = True
+        self._snapshot = self._capture_snapshot()
+
+    def _spawn(self, c, r, col):
+        """按地图字符生成一个格子上的物体 (碰撞网格另行维护)"""
+        pos = (c * TILE_SIZE, r * TILE_SIZE)
+        
+        if col == 'W':
+            # 墙壁：只记录图片，碰撞走 obstacle_grid
+            self.visible_sprites.add_static(c, r, self.wall_image)
+        
+        elif col == 'D':
+            self.doors[(c, r)] = Door(
+                groups=[self.visible_sprites, self.goal_sprites],
+                pos=pos,
+            )
+            
+        elif col == 'C':
+            self.coins.add(c, r)
+            
+        elif col == 'G':
+            self.map_ghosts[(c, r)] = Ghost(
+                groups=[self.visible_sprites, self.damage_sprites], # 加入伤害组
+                pos=pos,
+                player=self.player, # 鬼需要知道人在哪
+                wall_grid=self.obstacle_grid
+            )
+            
+        elif col == 'O':
+            self.cocoons.add(c, r)
+        
+        elif col == '^':
+            self.traps.add(c, r)
+
+    def _despawn(self, c, r, col):
+        """移除 _spawn 在该格子上生成的物体 (已被拾取/孵化的不用处理)"""
+        tile = (c, r)
+        if col == 'W':
+            self.visible_sprites.static_grid.pop(tile, None)
+        elif col == 'D':
+            door = self.doors.pop(tile, None)
+            if door is not None: door.kill()
+        elif col == 'C':
+            self.coins.remove(c, r)
+        elif col == 'G':
+            ghost = self.map_ghosts.pop(tile, None)
+            if ghost is not None: ghost.kill()
+        elif col == 'O':
+            self.cocoons.remove(c, r)
+        elif col == '^':
+            self.traps.remove(c, r)
+
+    def apply_map(self, new_map):
+        """
+        [热重载] 与当前地图逐行比较，只重建变化的格子；玩家位置保持不变 ('P' 的改动忽略)。
+        返回变化的格子列表。
+        """
+        old_map = self.map_data
+        changed = []
+        for r in range(max(len(old_map), len(new_map))):
+            old_row = old_map[r] if r < len(old_map) else ""
+            new_row = new_map[r] if r < len(new_map) else ""
+            if old_row == new_row:
+                continue
+            for c in range(max(len(old_row), len(new_row))):
+                old = old_row[c] if c < len(old_row) else '.'
+                new = new_row[c] if c < len(new_row) else '.'
+                if old == new or 'P' in (old, new):
+                    continue
+                self._despawn(c, r, old)
+                if new in OBSTACLE_CHARS:
+                    self.obstacle_grid.add((c, r))
+                else:
+                    self.obstacle_grid.discard((c, r))
+                self._spawn(c, r, new)
+                changed.append((c, r))
+
+        self.map_data = new_map
+        if len(new_map) != len(old_map) or max(map(len, new_map)) != max(map(len, old_map)):
+            # 地图尺寸变了：小地图整张重画
+            self.minimap = Minimap(self)
+            for _ in self.minimap.build_rows():
+                pass
+        elif changed:
+            self.minimap.patch(changed)
+        self.visible_sprites.invalidate()
+        if self.is_ready:
+            self._patch_snapshot(changed)
+            self.hints = HintTable(new_map, self.doors, stoppers=OBSTACLE_CHARS)
+            for _ in self.hints.build_rows():
+                pass
+            # 地图上还是 'O'，但这一局里已经孵化的茧不挡路 (重开时再由 restart 放回)
+            for cocoon in self._snapshot["cocoons"]:
+                if (cocoon.col, cocoon.row) not in self.cocoons.tiles:
+                    self.hints.unblock((cocoon.col, cocoon.row))
+        return changed
+
+    def pool_stats(self):
+        """刺和孵化鬼的对象池统计"""
+        return {
+            "spike": self.traps.spike_pool.stats(),
+            "ghost": self.cocoons.ghost_pool.stats(),
+        }
+
+    # --- 快照重开 ---
+    def _capture_snapshot(self):
+        """
+        记录刚建好时各实体的位置与状态 (只存坐标、标记和记录的引用，不复制图片)。
+        陷阱初始状态都一样，不用单独存。
+        """
+        return {
+            "player": self.player.rect.topleft if self.player is not None else None,
+            "ghosts": [(ghost, ghost.rect.topleft) for ghost in self.map_ghosts.values()],
+            "coins": self.coins.snapshot(),
+            "cocoons": self.cocoons.snapshot(),
+        }
+
+    def _patch_snapshot(self, changed):
+        """
+        热重载只改了 changed 这些格子：快照里只替换这些格子上的物体，其余保持刚建好时的状态
+        (不能重新拍快照，那样会把玩家位置、已拾取的金币、已孵化的茧当成初始状态)。
+        """
+        snapshot = self._snapshot
+        tiles = set(changed)
+        ghosts = [(ghost, pos) for ghost, pos in snapshot["ghosts"]
+                  if (pos[0] // TILE_SIZE, pos[1] // TILE_SIZE) not in tiles]
+        ghosts += [(ghost, ghost.rect.topleft) for tile, ghost in self.map_ghosts.items() if tile in tiles]
+        snapshot["ghosts"] = ghosts
+        snapshot["coins"] = self.coins.patch_snapshot(snapshot["coins"], tiles)
+        snapshot["cocoons"] = self.cocoons.patch_snapshot(snapshot["cocoons"], tiles)
+
+    def restart(self, input_source=None):
+        """
+        [快照重开] 就地把关卡恢复到刚建好时的状态：复用已有的组、精灵和实体记录，
+        只清掉运行中产生的东西 (孵化的鬼、刺、粒子)，不重新解析地图。
+        :param input_source: 新的输入源 (例如新的录制器)；默认沿用原来的
+        """
+        snapshot = self._snapshot
+        if input_source is not None:
+            self.input_source = input_source
+            self.player.input_source = input_source
+        self.clock.reset()
+        self.timers.clear()
+        self.death_cause = None
+        self.dirty_rects = None
+        self.hint_until = 0
+
+        # 运行中产生的精灵：孵化出来的鬼、刺、拖尾、气泡
+        keep = {self.player, *self.doors.values(), *self.map_ghosts.values()}
+        for sprite in self.visible_sprites.sprites():
+            if sprite not in keep:
+                sprite.kill()
+
+        self.player.reset(snapshot["player"])
+        for ghost, pos in snapshot["ghosts"]:
+            ghost.reset(pos)
+        self.traps.reset()
+        restored = self.cocoons.restore(snapshot["cocoons"])
+        for tile in restored:
+            self.hints.block(tile)
+        changed = self.coins.restore(snapshot["coins"]) + restored
+        if changed:
+            self.minimap.patch(changed)
+
+        self.visible_sprites.shake_timer = 0
+        self._bubble_credit = 0.0
+        self.visible_sprites.invalidate()
 
     # --- 粒子/特效接口 ---
+    def set_quality(self, quality):
+        """切换特效档位 (QUALITY_TIERS 中的一项)；只影响画面，不影响模拟"""
+        self.quality = quality
+
     def trigger_particle(self, type, pos, surf=None, life_span=0, direction_key=None):
         if type == 'trail' and direction_key:
-             self._spawn_trail(pos, direction_key)
+             # 拖尾传进来的是玩家的 rect，到这里才取左上角 (玩家每帧移动时不用先打包坐标)
+             self._spawn_trail(pos.topleft, direction_key)
         elif type == 'bubble':
-             BubbleSprite([self.visible_sprites], pos)
+             # 按密度均匀地抽掉一部分气泡
+             self._bubble_credit += self.quality["particles"]
+             if self._bubble_credit >= 1:
+                 self._bubble_credit -= 1
+                 BubbleSprite([self.visible_sprites], pos)
 
     def _spawn_trail(self, pos, direction_key):
         assets = AssetFactory.get_trail_assets()
         if direction_key in assets:
             surfaces = assets[direction_key]
+            layers = self.quality["trail_layers"]
             TrailSprite([self.visible_sprites], pos, surfaces[0], TRAIL_LIFE_MAIN)
-            TrailSprite([self.visible_sprites], pos, surfaces[1], TRAIL_LIFE_UP)
-            TrailSprite([self.visible_sprites], pos, surfaces[2], TRAIL_LIFE_DOWN)
+            if layers >= 2:
+                TrailSprite([self.visible_sprites], pos, surfaces[1], TRAIL_LIFE_UP)
+            if layers >= 3:
+                TrailSprite([self.visible_sprites], pos, surfaces[2], TRAIL_LIFE_DOWN)
+
+    # --- 提示 ---
+    def show_hint(self):
+        """
+        按 H：在玩家旁边显示通往门的下一步方向，持续 HINT_DURATION_MS (期间每停下一次都换成新位置的提示)。
+        只影响画面，不影响模拟。返回玩家当前位置到门还要滑几次 (滑行中或到不了时为 None)
+        """
+        self.hint_until = self.clock.get_ticks() + HINT_DURATION_MS
+        if self.player.status != 'idle':
+            return None
+        return self.hints.moves_left((self.player.rect.x // TILE_SIZE, self.player.rect.y // TILE_SIZE))
+
+    def _draw_hint(self):
+        """玩家停着时画提示箭头，返回占用的屏幕矩形；不需要画时返回 None"""
+        if not self.hint_until:
+            return None
+        if self.clock.get_ticks() >= self.hint_until:
+            # 刚过期：下一帧整屏重画，把箭头擦掉
+            self.hint_until = 0
+            self.visible_sprites.invalidate()
+            return None
+        player = self.player
+        if player.status != 'idle':
+            return None
+        direction = self.hints.next_direction((player.rect.x // TILE_SIZE, player.rect.y // TILE_SIZE))
+        if direction is None:
+            return None
+
+        # 箭头画在玩家前方一格的位置
+        dx, dy = direction
+        offset = self.visible_sprites.offset
+        cx = player.rect.centerx - int(offset.x) + dx * TILE_SIZE
+        cy = player.rect.centery - int(offset.y) + dy * TILE_SIZE
+        size = HINT_ARROW_SIZE
+        tip = (cx + dx * size, cy + dy * size)
+        left = (cx - dx * size - dy * size, cy - dy * size + dx * size)
+        right = (cx - dx * size + dy * size, cy - dy * size - dx * size)
+        return pygame.draw.polygon(self.display_surface, HINT_COLOR, [tip, left, right])
 
     def _check_game_status(self):
         hit_func = pygame.sprite.collide_rect_ratio(0.5)
-        if pygame.sprite.spritecollide(self.player, self.damage_sprites, False, collided=hit_func):
+        hits = pygame.sprite.spritecollide(self.player, self.damage_sprites, False, collided=hit_func)
+        if hits:
+            self.death_cause = type(hits[0]).__name__.lower()
             return 'game_over'
         
         door_hit_func = pygame.sprite.collide_rect_ratio(0.8)
         if pygame.sprite.spritecollide(self.player, self.goal_sprites, False, collided=door_hit_func):
             return 'level_complete'
             
-        pygame.sprite.spritecollide(self.player, self.coin_sprites, True)
+        collected = self.coins.collect(self.player.rect)
+        if collected:
+            self.minimap.patch(collected)
         return 'playing'
     
-    def run(self):
-        self.visible_sprites.update()
-        self.display_surface.fill(COLOR_BG) 
-        self.visible_sprites.custom_draw(self.player)
-        return self._check_game_status()
\ No newline at end of file
+    def run(self, draw=True):
+        """
+        推进一帧。
+        :param draw: False 时只做逻辑不绘制 (无界面回放)
+        """
+        with tracer.span("Level.run", 'level'):
+            self.clock.tick()
+            with tracer.span("sprites.update", 'level'):
+                self.visible_sprites.update()
+            with tracer.span("entities.update", 'level'):
+                self.coins.update(self.quality["coin_anim_stride"])
+                self.traps.update()
+                self.cocoons.update()
+            # 到期的定时器：茧孵化、陷阱冷却结束、刺切换阶段 (在各实体更新之后统一触发)
+            with tracer.span("timers", 'level'):
+                self.timers.run_due()
+                hatched = self.cocoons.pop_hatched()
+                if hatched:
+                    self.minimap.patch(hatched)
+                    for tile in hatched:
+                        self.hints.unblock(tile)
+            if draw:
+                with tracer.span("draw", 'render'):
+                    # 返回 None 表示整屏都重画了
+                    self.dirty_rects = self.visible_sprites.custom_draw(self.player, allow_partial=DIRTY_RECT_RENDERING)
+                    if self.show_minimap:
+                        minimap_rect = self.minimap.draw(self.display_surface)
+                        if self.dirty_rects is not None:
+                            self.dirty_rects.append(minimap_rect)
+                    hint_rect = self._draw_hint()
+                    if hint_rect is not None and self.dirty_rects is not None:
+                        self.dirty_rects.append(hint_rect)
+            return self._check_game_status()
\ No newline at end of file
@@ -1,6 +1,34 @@
 # main.py
-from game import Game
+import argparse
+from startup import startup
 
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pac-Human")
+    parser.add_argument('--record', action='store_true', help="record inputs of every attempt to recordings/")
+    parser.add_argument('--dev', action='store_true', help="hot-reload hand-made levels when maps.py changes")
+    parser.add_argument('--trace', action='store_true',
+                        help="record a trace-event timeline to traces/ (F9 or exit to save)")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="print a per-phase breakdown of the time to the first frame")
+    parser.add_argument('--gc-log', action='store_true', help="print every garbage collection and its pause time")
+    args = parser.parse_args()
+
+    # 追踪要在导入 game 之前打开：导入 maps 时就会生成程序化关卡
+    if args.trace:
+        from tracing import tracer
+        tracer.enable()
+
+    if args.startup_report:
+        startup.enable()
+
+    if args.gc_log:
+        from gc_control import gc_control, log_pause
+        gc_control.add_hook(log_pause)
+
+    with startup.phase("import (incl. level generation)"):
+        from game import Game
+    from maps import LEVEL_GEN_MS
+    startup.add("  level generation", sum(LEVEL_GEN_MS.values()))
+
+    game = Game(record=args.record, dev=args.dev)
+    game.run()
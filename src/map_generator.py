@@ -1,6 +1,11 @@
 # src/map_generator.py
+import re
 import random
 from collections import deque
+from itertools import compress
+from slide_graph import SlideGraph
+from tracing import tracer
+from gc_control import gc_control
 
 # ==============================================================================
 #                                  配置参数
@@ -21,6 +26,14 @@ MAP_CONFIG = {
     
     # 变异参数
     "enable_flip": True,       # 是否允许地图镜像翻转
+
+    # 迷宫模式 (mode='maze') 参数
+    "maze_min_size": 7,         # 最小边长
+    "room_density": 1 / 80,     # 每多少格挖一个房间
+    "room_size": (3, 8),        # 房间边长范围
+    "braid_ratio": 0.3,         # 额外打通的墙占迷宫格的比例 (制造环路)
+    "repair_budget": 2000,      # 放障碍挡住路线时，局部修补路线最多展开的节点数 (超出则放弃这组位置)
+    "scale_items": True,        # 物品组数是否随地图面积等比放大 (以母图面积为基准)
 }
 
 # 母图 (你的手绘图)
@@ -58,97 +71,434 @@ BASE_TEMPLATE = [
     "WWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWW"
 ]
 
+FREE_RUN = re.compile(r'\.+')   # 连续空地
+
+class FreeRunIndex:
+    """
+    [空位索引]
+    记录地图中所有横向、纵向的连续空地段 (run)，按长度分桶。
+    放置长度为 L 的物品组时，直接在所有长度 >= L 的空地段里均匀抽取一个位置，
+    放下后把被占用的空地段切开，不需要随机撒点再重试。
+    每次 generate() 只扫描一次地图建索引，之后各类物品都在同一个索引上放置；
+    只对某一类物品不可用的格子用 block() 暂时挡住，放完再 unblock() 合并回去。
+    正在放置的几种长度 (track()) 的放法总数随 block / unblock 一起更新，抽取时不用再把所有桶加一遍。
+    """
+    HORIZONTAL, VERTICAL = 0, 1
+
+    def __init__(self, grid, blocked=(), rng=random):
+        """
+        :param blocked: 额外视为不可用的格子
+        """
+        self.grid = grid
+        self.h = len(grid)
+        self.w = len(grid[0])
+        self.rng = rng
+
+        # run id 按创建顺序递增，各属性存在按 id 下标的平铺列表里 (删除的 run 留着不用)
+        self.runs = []                  # run id -> (方向, 起点x, 起点y, 长度)
+        self.slot = []                  # run id -> 在桶里的下标 (O(1) 删除)
+        self.buckets = {}               # Key=长度, Value=[run id, ...]
+        self.run_of = [[-1] * (self.w * self.h), [-1] * (self.w * self.h)]  # 每格所在的 run
+        self.totals = {}                # Key=track() 登记的物品组长度, Value=当前的放法总数
+        self.tracked = []               # totals 的键，从小到大 (大多数空地段比所有物品组都短，更新时可以提前结束)
+
+        # 被禁用的格子在副本里换成 '#'，然后用正则在 C 层面一次找出所有连续的 '.'
+        rows = [row[:] for row in grid]
+        for bx, by in blocked:
+            if 0 <= bx < self.w and 0 <= by < self.h:
+                rows[by][bx] = '#'
+        rows = [''.join(row) for row in rows]
+        columns = [''.join(col) for col in zip(*rows)]
+
+        # 只统计内圈 (最外圈永远是墙)。大地图上有十几万段，这里不逐段调用 _add_run，直接批量登记
+        w = self.w
+        runs, slot, buckets = self.runs, self.slot, self.buckets
+        for orient, lines, limit in ((self.HORIZONTAL, rows, self.w - 1), (self.VERTICAL, columns, self.h - 1)):
+            labels = self.run_of[orient]
+            for k in range(1, len(lines) - 1):
+                for m in FREE_RUN.finditer(lines[k], 1, limit):
+                    i, end = m.span()
+                    length = end - i
+                    run_id = len(runs)
+                    bucket = buckets.get(length)
+                    if bucket is None:
+                        bucket = buckets[length] = []
+                    slot.append(len(bucket))
+                    bucket.append(run_id)
+                    if orient == self.HORIZONTAL:
+                        runs.append((orient, i, k, length))
+                        start = k * w + i
+                        labels[start:start + length] = [run_id] * length
+                    else:
+                        runs.append((orient, k, i, length))
+                        start = i * w + k
+                        labels[start:start + length * w:w] = [run_id] * length
+
+    def _cells(self, orient, x, y, length):
+        if orient == self.HORIZONTAL:
+            return [(x + i, y) for i in range(length)]
+        return [(x, y + i) for i in range(length)]
+
+    def _add_run(self, orient, x, y, length):
+        run_id = len(self.runs)
+        self.runs.append((orient, x, y, length))
+        bucket = self.buckets.get(length)
+        if bucket is None:
+            bucket = self.buckets[length] = []
+        self.slot.append(len(bucket))
+        bucket.append(run_id)
+        # 用切片一次性标记这一段的所有格子
+        labels = self.run_of[orient]
+        start = y * self.w + x
+        if orient == self.HORIZONTAL:
+            labels[start:start + length] = [run_id] * length
+        else:
+            labels[start:start + length * self.w:self.w] = [run_id] * length
+
+    def _remove_run(self, run_id):
+        run = self.runs[run_id]
+        length = run[3]
+        bucket = self.buckets[length]
+        i = self.slot[run_id]
+        last = bucket.pop()
+        if last != run_id:
+            bucket[i] = last
+            self.slot[last] = i
+        if not bucket:
+            del self.buckets[length]
+        return run
+
+    def block(self, cell):
+        """把一格标记为已占用：横、纵两个方向上所在的空地段各切成两段 (切出来为空的一侧不登记)"""
+        cx, cy = cell
+        i = cy * self.w + cx
+        for orient in (self.HORIZONTAL, self.VERTICAL):
+            labels = self.run_of[orient]
+            run_id = labels[i]
+            if run_id < 0:
+                continue
+            labels[i] = -1
+            _, x, y, length = self._remove_run(run_id)
+            cut = cx - x if orient == self.HORIZONTAL else cy - y
+            rest = length - cut - 1
+            if cut:
+                self._add_run(orient, x, y, cut)
+            if rest:
+                if orient == self.HORIZONTAL:
+                    self._add_run(orient, cx + 1, y, rest)
+                else:
+                    self._add_run(orient, x, cy + 1, rest)
+            self._recount(length, cut, rest, 1)
+
+    def unblock(self, cell):
+        """block 的逆操作：格子放回空地，横、纵两个方向上与两侧的空地段合并成一段"""
+        cx, cy = cell
+        i = cy * self.w + cx
+        for orient, step in ((self.HORIZONTAL, 1), (self.VERTICAL, self.w)):
+            labels = self.run_of[orient]
+            before, after = labels[i - step], labels[i + step]
+            x, y, length = cx, cy, 1
+            left = right = 0
+            if before >= 0:
+                _, x, y, left = self._remove_run(before)
+            if after >= 0:
+                right = self._remove_run(after)[3]
+            length += left + right
+            self._add_run(orient, x, y, length)
+            self._recount(length, left, right, -1)
+
+    def _recount(self, whole, left, right, sign):
+        """
+        长度 whole 的一段切成 left、right 两段 (中间一格被占用；sign=-1 表示反过来合并)，
+        按净变化一次更新各个长度的放法总数
+        """
+        for l in self.tracked:
+            if l > whole:
+                break
+            d = l - 1
+            change = (left - d if left > d else 0) + (right - d if right > d else 0) - (whole - d)
+            self.totals[l] += sign * change
+
+    def is_free(self, cell):
+        """格子是否在某个空地段里 (没被占用、也没被挡住)"""
+        x, y = cell
+        return 0 < x < self.w - 1 and 0 < y < self.h - 1 and self.run_of[self.HORIZONTAL][y * self.w + x] >= 0
+
+    def track(self, lengths):
+        """之后只为 lengths 这几种长度维护放法总数 (换一类物品时调用，各统计一遍)"""
+        self.tracked = sorted(set(lengths))
+        self.totals = {l: self._count(l) for l in self.tracked}
+
+    def _count(self, length):
+        return sum(len(ids) * (l - length + 1) for l, ids in self.buckets.items() if l >= length)
+
+    def count_placements(self, length):
+        """长度为 length 的物品组一共有多少种放法 (没有 track() 的长度现统计)"""
+        total = self.totals.get(length)
+        return self._count(length) if total is None else total
+
+    def sample(self, length):
+        """均匀抽取一个能放下 length 格的位置，返回格子列表；没有空间时返回 None"""
+        total = self.count_placements(length)
+        if total == 0:
+            return None
+        r = self.rng.randrange(total)
+        for l, ids in self.buckets.items():
+            if l < length:
+                continue
+            per_run = l - length + 1
+            weight = len(ids) * per_run
+            if r < weight:
+                orient, x, y, _ = self.runs[ids[r // per_run]]
+                offset = r % per_run
+                if orient == self.HORIZONTAL:
+                    return self._cells(orient, x + offset, y, length)
+                return self._cells(orient, x, y + offset, length)
+            r -= weight
+        return None
+
 class MapGenerator:
-    def __init__(self, width=None, height=None):
-        # 兼容接口
-        self.raw_grid = [list(row) for row in BASE_TEMPLATE]
-        self.h = len(self.raw_grid)
-        self.w = len(self.raw_grid[0])
+    def __init__(self, width=None, height=None, mode='template'):
+        """
+        :param mode: 'template' 基于母图变异 (忽略宽高，兼容旧接口)；
+                     'maze' 按给定宽高从零生成墙体 (迷宫 + 房间)，耗时与面积成正比
+        """
+        self.mode = mode
+        if mode == 'maze':
+            self.raw_grid = None
+            self.w = max(MAP_CONFIG["maze_min_size"], width or len(BASE_TEMPLATE[0]))
+            self.h = max(MAP_CONFIG["maze_min_size"], height or len(BASE_TEMPLATE))
+        else:
+            self.raw_grid = [list(row) for row in BASE_TEMPLATE]
+            self.h = len(self.raw_grid)
+            self.w = len(self.raw_grid[0])
         self.dirs = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+        self.rng = random.Random()
 
-    def generate(self):
+    @tracer.traced("MapGenerator.generate", 'mapgen')
+    def generate(self, seed=None):
         """
-        基于模板的生成流程
+        生成流程：墙体布局 -> 变异 -> 出生点/门 -> 填充物品
+        :param seed: 随机种子；相同的种子总是生成相同的地图 (用于录像回放)
         """
-        # 1. 深度拷贝模板，并清理掉原来的物品
-        self.grid = []
-        for row in self.raw_grid:
-            new_row = []
-            for char in row:
-                if char == 'W': new_row.append('W')
-                else: new_row.append('.')
-            self.grid.append(new_row)
+        # 大地图会创建几十万个对象，生成期间暂停自动回收 (见 gc_control.paused)
+        with gc_control.paused():
+            return self._generate(seed)
+
+    def _generate(self, seed):
+        if seed is not None:
+            self.rng.seed(seed)
+        # 1. 墙体布局：迷宫模式从零生成；模板模式深度拷贝模板，并清理掉原来的物品
+        if self.mode == 'maze':
+            self.grid = self._carve_maze()
+        else:
+            self.grid = []
+            for row in self.raw_grid:
+                new_row = []
+                for char in row:
+                    if char == 'W': new_row.append('W')
+                    else: new_row.append('.')
+                self.grid.append(new_row)
 
         # 2. 地图变异
         if MAP_CONFIG["enable_flip"]:
             self._apply_random_flip()
 
+        # 滑行图：P、D 都不阻挡滑行，放好之后图也不变，后面求解和增量校验继续用它
+        self.slide_graph = SlideGraph(self.grid)
+
         # 3. [优化] 寻找最佳出生点
-        # 尝试多次，确保玩家出生在一个“能去很多地方”的位置
+        # 在滑行图的强连通分量里选，确保玩家出生在一个“能去很多地方”的位置
         # 防止出生在死角导致门只能生成在附近
-        best_start = None
-        best_reachability = {}
-        
-        for _ in range(20): # 尝试找20个不同的起点
-            # 在全图中随机找空地，不局限于左上角
-            try_pos = self._find_random_empty_spot()
-            reach = self._get_sliding_distances(try_pos)
-            # 如果这个起点能到达全图 40% 以上的区域，就是一个合格的起点
-            if len(reach) > (self.w * self.h) * 0.4:
-                best_start = try_pos
-                best_reachability = reach
-                break
-        
-        # 如果实在找不到完美的，就退化到找一个能走的就行
-        if not best_start:
-            best_start = self._find_random_empty_spot()
-            best_reachability = self._get_sliding_distances(best_start)
-
-        self.player_pos = best_start
+        self.player_pos = self._choose_start()
+        reachability = self._get_sliding_distances(self.player_pos)
         self.grid[self.player_pos[1]][self.player_pos[0]] = 'P'
 
         # 4. [优化] 放置门 D (物理距离最远)
-        self._place_door_far_away(best_reachability)
+        self._place_door_far_away(reachability)
 
-        # 5. 计算解法路径
-        solution_path = self._solve_sliding_path()
+        # 5. 计算解法路径 (之后每放一组障碍都在滑行图上增量校验，保证始终有解)
+        self._solve_sliding_path()
         safe_zone = self._get_area_around(self.player_pos, 3) | \
                     self._get_area_around(self.door_pos, 3)
 
+        # 空位索引：P、D 放好之后扫描一次，茧、陷阱、金币都在它上面放置
+        self.free_runs = FreeRunIndex(self.grid, rng=self.rng)
+        self.placed_groups = {}
+
         # 6. 填充物品
         print(f"Populating map... P:{self.player_pos} -> D:{self.door_pos}")
         
-        self._place_linear_groups('O', MAP_CONFIG["cocoon_groups"], 
-                                  MAP_CONFIG["cocoon_group_size"], safe_zone)
-        self._place_linear_groups('^', MAP_CONFIG["trap_groups"], 
-                                  MAP_CONFIG["trap_group_size"], safe_zone | solution_path, strict=True)
+        with tracer.span("mapgen.cocoons", 'mapgen'):
+            self._place_linear_groups('O', self._item_count("cocoon_groups"), 
+                                      MAP_CONFIG["cocoon_group_size"], safe_zone,
+                                      validate=lambda pts: self._keeps_solvable(pts, hazard=True))
+        with tracer.span("mapgen.traps", 'mapgen'):
+            self._place_linear_groups('^', self._item_count("trap_groups"), 
+                                      MAP_CONFIG["trap_group_size"], safe_zone | self.solution_tiles, strict=True,
+                                      validate=self._keeps_solvable)
+        # 墙刺只把墙换成刺，两者都是永久阻挡，滑行图不变
         self._place_wall_spikes()
-        self._place_linear_groups('C', MAP_CONFIG["coin_groups"], 
-                                  MAP_CONFIG["coin_group_size"], set())
+        with tracer.span("mapgen.coins", 'mapgen'):
+            self._place_linear_groups('C', self._item_count("coin_groups"), 
+                                      MAP_CONFIG["coin_group_size"], set())
 
         return ["".join(row) for row in self.grid]
 
+    def _item_count(self, key):
+        """物品组数；迷宫模式下按面积相对母图放大"""
+        count = MAP_CONFIG[key]
+        if self.mode == 'maze' and MAP_CONFIG["scale_items"]:
+            template_area = len(BASE_TEMPLATE) * len(BASE_TEMPLATE[0])
+            count = max(count, round(count * self.w * self.h / template_area))
+        return count
+
+    # =========================================================================
+    #  墙体生成 (迷宫模式)
+    # =========================================================================
+    @tracer.traced("mapgen.carve_maze", 'mapgen')
+    def _carve_maze(self):
+        """
+        [线性生成] 奇数坐标为迷宫格，随机深度优先 (显式栈) 打通相邻格之间的墙，
+        再挖出随机房间、打通少量额外的墙形成环路。每一步的工作量都与面积成正比。
+        """
+        w, h = self.w, self.h
+        rng = self.rng
+
+        # 1. 迷宫：cols x rows 个迷宫格，格 (cx, cy) 对应地图坐标 (2cx+1, 2cy+1)
+        #    visited 外面多包一圈 (预先标成已访问，省掉越界判断)，格 (cx, cy) 的下标是 (cy+1)*stride + cx+1；
+        #    地图先挖在平铺的列表里 (下标 y*w + x)，栈里同时记两边的下标，走一步只做加法
+        cols, rows = (w - 1) // 2, (h - 1) // 2
+        stride = cols + 2
+        visited = bytearray([1]) * (stride * (rows + 2))
+        for cy in range(rows):
+            visited[(cy + 1) * stride + 1:(cy + 1) * stride + cols + 1] = bytes(cols)
+        cells = ['W'] * (w * h)
+        # 四个方向 (顺序同原来的左、右、上、下)：(迷宫格下标的增量, 地图下标的增量)
+        left, right, up, down = (-1, -2), (1, 2), (-stride, -2 * w), (stride, 2 * w)
+
+        start = rng.randrange(cols * rows)
+        cy, cx = divmod(start, cols)
+        cell, pos = (cy + 1) * stride + cx + 1, (2 * cy + 1) * w + 2 * cx + 1
+        visited[cell] = 1
+        cells[pos] = '.'
+        stack = [(cell, pos)]
+        while stack:
+            cell, pos = stack[-1]
+            neighbours = []
+            if not visited[cell - 1]: neighbours.append(left)
+            if not visited[cell + 1]: neighbours.append(right)
+            if not visited[cell - stride]: neighbours.append(up)
+            if not visited[cell + stride]: neighbours.append(down)
+            if not neighbours:
+                stack.pop()
+                continue
+
+            dc, dp = rng.choice(neighbours)
+            visited[cell + dc] = 1
+            cells[pos + dp] = '.'
+            cells[pos + dp // 2] = '.'     # 两格之间的墙
+            stack.append((cell + dc, pos + dp))
+        grid = [cells[y * w:(y + 1) * w] for y in range(h)]
+
+        # 2. 房间合并：挖出矩形空地，提供大片滑行区域
+        min_room, max_room = MAP_CONFIG["room_size"]
+        max_room = min(max_room, w - 2, h - 2)
+        min_room = min(min_room, max_room)
+        for _ in range(int(w * h * MAP_CONFIG["room_density"])):
+            rw = rng.randint(min_room, max_room)
+            rh = rng.randint(min_room, max_room)
+            x0 = rng.randint(1, w - 1 - rw)
+            y0 = rng.randint(1, h - 1 - rh)
+            for y in range(y0, y0 + rh):
+                grid[y][x0:x0 + rw] = ['.'] * rw
+
+        # 3. 打通额外的墙：只打通夹在两个迷宫格之间的墙 (一个坐标奇、一个坐标偶)
+        # randint(a, b) 就是 randrange(a, b + 1)：直接调用少一层，随机序列不变
+        for _ in range(int(cols * rows * MAP_CONFIG["braid_ratio"])):
+            x = rng.randrange(1, w - 1)
+            y = rng.randrange(1, h - 1)
+            if (x + y) % 2 == 1:
+                grid[y][x] = '.'
+
+        return grid
+
     # =========================================================================
     #  变异逻辑
     # =========================================================================
+    @tracer.traced("mapgen.flip", 'mapgen')
     def _apply_random_flip(self):
-        if random.random() < 0.5:
+        if self.rng.random() < 0.5:
             for row in self.grid: row.reverse()
-        if random.random() < 0.5:
+        if self.rng.random() < 0.5:
             self.grid.reverse()
 
     # =========================================================================
     #  门与位置计算
     # =========================================================================
-    def _find_random_empty_spot(self):
-        """在全图中随机找一个空点"""
-        for _ in range(100):
-            rx = random.randint(1, self.w - 2)
-            ry = random.randint(1, self.h - 2)
-            if self.grid[ry][rx] == '.':
-                return (rx, ry)
-        return (1, 1) # Fallback
+    @tracer.traced("mapgen.start", 'mapgen')
+    def _choose_start(self):
+        """
+        [算法优化] 滑行是单向的：A 能滑到 B 不代表 B 能滑回 A。
+        对所有停止位置做一次强连通分量分解，把滑行图缩成 DAG，再按拓扑序线性地扫几遍：
+        - 最大的分量是最大的“来回都能滑”的区域；能到达它的分量沿反向边一遍标出来，
+          到不了它的就是单向陷阱区域，不考虑
+        - 在能到达最大分量的分量里，按“沿 DAG 一路滑下去最多能经过多少位置”(最重路径) 选出生点
+        只用分量大小和拓扑序，不求每个分量的完整可达集合 (那需要传递闭包，规模大时是平方级)。
+        代替原来随机试多个起点、每个起点跑一整遍 BFS 的做法，结果也不再依赖运气。
+        """
+        stops = self._stop_cells()
+        if not stops:
+            return (1, 1) # Fallback
+        _, sccs, dag = self.slide_graph.condensation(stops)
+        sizes = [len(members) for members in sccs]
+        # 分量很多 (大地图上上万个)：先按数值比较，只在并列的分量里才去求最小坐标
+        biggest = max(sizes)
+        largest = max((i for i in range(len(sccs)) if sizes[i] == biggest), key=lambda i: min(sccs[i]))
+
+        # 编号是逆拓扑序 (dag[i] 里的编号都小于 i)：从小到大扫，下游总是先算好
+        reaches = [False] * len(sccs)    # 能否滑进最大分量
+        heaviest = [0] * len(sccs)       # 从该分量出发，沿一条 DAG 路径最多经过的位置数
+        for i, succ in enumerate(dag):
+            reach, best = i == largest, 0
+            for j in succ:
+                if reaches[j]:
+                    reach = True
+                if heaviest[j] > best:
+                    best = heaviest[j]
+            reaches[i] = reach
+            heaviest[i] = sizes[i] + best
 
+        # 分数一样时选更大的分量，再按坐标比较，保证同一种子结果不变
+        top = max((heaviest[i], sizes[i]) for i in range(len(sccs)) if reaches[i])
+        best = max((i for i in range(len(sccs)) if reaches[i] and (heaviest[i], sizes[i]) == top),
+                   key=lambda i: min(sccs[i]))
+        # 分量内随机选一个位置
+        return self.rng.choice(sorted(sccs[best]))
+
+    def _stop_cells(self):
+        """
+        滑行能停下的空地 = 每一行、每一列里连续空地 (长度 >= 2) 的两端 (此时地图上只有墙和空地)。
+        其余空地只能作为滑行的中途，不会是滑行图里的节点。
+        先在按列展开的标记数组里打标 (格子 (x, y) 的下标是 x * h + y，下标顺序就是 (x, y) 的排序顺序)，
+        最后按下标顺序取出，不用集合去重再排序。
+        """
+        h = self.h
+        flags = bytearray(self.w * h)
+        for y, row in enumerate(self.grid):
+            for m in FREE_RUN.finditer("".join(row)):
+                a, b = m.span()
+                if b - a >= 2:
+                    flags[a * h + y] = flags[(b - 1) * h + y] = 1
+        for x, col in enumerate(zip(*self.grid)):
+            base = x * h
+            for m in FREE_RUN.finditer("".join(col)):
+                a, b = m.span()
+                if b - a >= 2:
+                    flags[base + a] = flags[base + b - 1] = 1
+        return [divmod(i, h) for i in compress(range(len(flags)), flags)]
+
+    @tracer.traced("mapgen.door", 'mapgen')
     def _place_door_far_away(self, reachability):
         """
         [算法优化] 
@@ -179,56 +529,92 @@ class MapGenerator:
 
         # 从分数最高的 5 个点里随机选一个 (增加一点随机性，但保证都很远)
         limit = max(1, min(5, len(candidates)))
-        self.door_pos = random.choice(candidates[:limit])[0]
+        self.door_pos = self.rng.choice(candidates[:limit])[0]
         
         self.grid[self.door_pos[1]][self.door_pos[0]] = 'D'
 
     # =========================================================================
     #  物品填充 (成组)
     # =========================================================================
-    def _place_linear_groups(self, char, count, size_range, forbidden, strict=False):
+    def _place_linear_groups(self, char, count, size_range, forbidden, strict=False, validate=None):
+        """
+        成组放置物品 (一条横线或竖线)。
+        位置直接从空位索引里抽取，只要地图上还有空间就一定能放满 count 组。
+        strict=True 时 forbidden 中的格子不可占用。
+        validate(points) 返回 False 时放弃这组位置，并把这些格子从本次候选中剔除，再抽下一个位置
+        (被拒绝不占名额：一直抽到放满 count 组或者索引里没有位置为止)。
+        实际放下的组数记在 placed_groups[char]。
+        """
+        index = self.free_runs
+        index.track(range(size_range[0], size_range[1] + 1))
+        # 只在这一次调用里不可用的格子 (禁区、被拒绝的位置)：先挡住，放完再放回索引
+        held = []
+        if strict:
+            for cell in forbidden:
+                if index.is_free(cell):
+                    index.block(cell)
+                    held.append(cell)
+
         placed = 0
-        attempts = 0
-        while placed < count and attempts < 200:
-            attempts += 1
-            rx = random.randint(1, self.w - 2)
-            ry = random.randint(1, self.h - 2)
-            if self.grid[ry][rx] != '.': continue
-
-            length = random.randint(size_range[0], size_range[1])
-            dx, dy = random.choice(self.dirs)
-            
-            points = []
-            valid = True
-            for i in range(length):
-                nx, ny = rx + dx*i, ry + dy*i
-                if not (0 < nx < self.w-1 and 0 < ny < self.h-1): valid=False; break
-                if self.grid[ny][nx] != '.': valid=False; break
-                if (nx, ny) in forbidden and strict: valid=False; break
-                points.append((nx, ny))
-            
-            if valid and points:
-                for px, py in points: self.grid[py][px] = char
-                placed += 1
+        while placed < count:
+            length = self.rng.randint(size_range[0], size_range[1])
+            points = index.sample(length)
+            # 放不下这么长的，就退而求其次放短一点的
+            while points is None and length > size_range[0]:
+                length -= 1
+                points = index.sample(length)
+            if points is None:
+                break
+            if validate is not None and not validate(points):
+                for p in points: index.block(p)
+                held.extend(points)
+                continue
+
+            for px, py in points:
+                self.grid[py][px] = char
+                index.block((px, py))
+            placed += 1
+
+        for cell in held:
+            index.unblock(cell)
+        self.placed_groups[char] = placed
 
+    @tracer.traced("mapgen.wall_spikes", 'mapgen')
     def _place_wall_spikes(self):
-        walls = [(x,y) for y in range(self.h) for x in range(self.w) if self.grid[y][x] == 'W']
-        random.shuffle(walls)
+        """
+        在贴着空地的墙上放墙刺。
+        只收集内圈中“至少有一面朝向空地”的墙作为候选，再不放回地随机抽取 (Fisher-Yates)。
+        """
+        candidates = []
+        for y in range(1, self.h - 1):
+            row = self.grid[y]
+            for x in range(1, self.w - 1):
+                if row[x] == 'W' and (row[x - 1] == '.' or row[x + 1] == '.' or
+                                      self.grid[y - 1][x] == '.' or self.grid[y + 1][x] == '.'):
+                    candidates.append((x, y))
+
         placed = 0
-        for wx, wy in walls:
-            if placed >= MAP_CONFIG["wall_spike_groups"]: break
+        target = self._item_count("wall_spike_groups")
+        for i in range(len(candidates)):
+            if placed >= target: break
+            j = self.rng.randrange(i, len(candidates))
+            candidates[i], candidates[j] = candidates[j], candidates[i]
+            wx, wy = candidates[i]
+            # 之前放的墙刺可能已经占用了这面墙
+            if self.grid[wy][wx] != 'W': continue
+
             open_dir = None
             for dx, dy in self.dirs:
-                if 0<=wx+dx<self.w and 0<=wy+dy<self.h and self.grid[wy+dy][wx+dx] == '.':
+                if self.grid[wy+dy][wx+dx] == '.':
                     open_dir = (dx, dy); break
             if not open_dir: continue
             
             grow_dir = (0, 1) if open_dir[0] != 0 else (1, 0)
-            length = random.randint(MAP_CONFIG["wall_spike_len"][0], MAP_CONFIG["wall_spike_len"][1])
+            length = self.rng.randint(MAP_CONFIG["wall_spike_len"][0], MAP_CONFIG["wall_spike_len"][1])
             
             curr_placed = False
-            for i in range(length):
-                tx, ty = wx + grow_dir[0]*i, wy + grow_dir[1]*i
+            for i_len in range(length):
+                tx, ty = wx + grow_dir[0]*i_len, wy + grow_dir[1]*i_len
                 if not(0<tx<self.w-1 and 0<ty<self.h-1) or self.grid[ty][tx] != 'W': break
                 cx, cy = tx+open_dir[0], ty+open_dir[1]
                 if 0<=cx<self.w and 0<=cy<self.h and self.grid[cy][cx] in ['.','P','C']:
@@ -239,52 +625,57 @@ class MapGenerator:
     # =========================================================================
     #  滑行与寻路
     # =========================================================================
-    def _slide(self, start, direction):
-        cx, cy = start
-        dx, dy = direction
-        path = []
-        while True:
-            nx, ny = cx + dx, cy + dy
-            if not (0 <= nx < self.w and 0 <= ny < self.h) or self.grid[ny][nx] == 'W':
-                return (cx, cy), path
-            cx, cy = nx, ny
-            path.append((cx, cy))
-
+    @tracer.traced("mapgen.reachability", 'mapgen')
     def _get_sliding_distances(self, start):
+        # moves() 与逐个方向 slide() 的终点顺序相同，只是一个轴只做一次二分查找 (这时还没有临时阻挡)
+        moves = self.slide_graph.moves
         q = deque([(start, 0)])
         visited = {start: 0}
         while q:
             curr, steps = q.popleft()
-            for d in self.dirs:
-                end, _ = self._slide(curr, d)
+            for _, end in moves(curr):
                 if end not in visited:
                     visited[end] = steps + 1
                     q.append((end, steps+1))
         return visited
 
+    @tracer.traced("mapgen.solve", 'mapgen')
     def _solve_sliding_path(self):
-        q = deque([(self.player_pos, [])])
-        visited = {self.player_pos}
-        while q:
-            curr, path = q.popleft()
-            if curr == self.door_pos:
-                full_path_tiles = set()
-                curr_node = self.player_pos
-                for next_node in path:
-                    if next_node[0] == curr_node[0]:
-                        step = 1 if next_node[1] > curr_node[1] else -1
-                        for y in range(curr_node[1], next_node[1]+step, step): full_path_tiles.add((curr_node[0], y))
-                    else:
-                        step = 1 if next_node[0] > curr_node[0] else -1
-                        for x in range(curr_node[0], next_node[0]+step, step): full_path_tiles.add((x, curr_node[1]))
-                    curr_node = next_node
-                return full_path_tiles
-            for d in self.dirs:
-                end, _ = self._slide(curr, d)
-                if end not in visited:
-                    visited.add(end)
-                    q.append((end, path + [end]))
-        return set()
+        """在滑行图上求解 P -> D，记录停止位置序列与经过的格子，返回经过的格子"""
+        stops = self.slide_graph.solve(self.player_pos, self.door_pos)
+        self.solution_stops = stops or []
+        self.solution_tiles = SlideGraph.path_tiles(self.player_pos, stops) if stops is not None else set()
+        return self.solution_tiles
+
+    def _keeps_solvable(self, points, hazard=False):
+        """
+        [增量校验] 把 points 加入滑行图 (hazard=True 表示茧这类会消失的障碍)，检查门是否仍然可达。
+        - 只重新检查射线经过这些格子的那几段路线；都没碰到就直接通过
+        - 碰到了：从第一段断开的滑行的起点出发做一次有限步数的 BFS，
+          接回原路线上断点之后的任意一个停止位置；接不上则撤销并拒绝
+        """
+        add, remove = (self.slide_graph.add_hazard, self.slide_graph.remove_hazard) if hazard else \
+                      (self.slide_graph.block, self.slide_graph.unblock)
+        for p in points: add(p)
+        if not any(p in self.solution_tiles for p in points):
+            return True
+
+        route = [self.player_pos] + self.solution_stops
+        broken = [k for k in range(len(route) - 1)
+                  if any(SlideGraph.ray_contains(route[k], route[k + 1], p) for p in points)]
+        first, last = broken[0], broken[-1]
+
+        # 同一位置出现多次时取最靠后的那次，接回去的路线更短
+        rejoin = {route[j]: j for j in range(last + 1, len(route))}
+        detour = self.slide_graph.search(route[first], rejoin, MAP_CONFIG["repair_budget"])
+        if detour is None:
+            for p in points: remove(p)
+            return False
+
+        target = detour[-1] if detour else route[first]
+        self.solution_stops = route[1:first + 1] + detour + route[rejoin[target] + 1:]
+        self.solution_tiles = SlideGraph.path_tiles(self.player_pos, self.solution_stops)
+        return True
 
     def _get_area_around(self, pos, r):
         px, py = pos
@@ -294,6 +685,12 @@ class MapGenerator:
         return area
 
 if __name__ == "__main__":
-    gen = MapGenerator()
+    # python map_generator.py            -> 模板模式
+    # python map_generator.py 60 40      -> 60x40 迷宫模式
+    import sys
+    if len(sys.argv) == 3:
+        gen = MapGenerator(int(sys.argv[1]), int(sys.argv[2]), mode='maze')
+    else:
+        gen = MapGenerator()
     for row in gen.generate():
         print(f'    "{row}",')
\ No newline at end of file
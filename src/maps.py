@@ -1,4 +1,6 @@
 # src/maps.py
+import time
+import random
 from map_generator import MapGenerator
 # 0,1,2号教程关卡
 # W = 墙, P = 玩家, . = 空地 (暂时只用这两个测试)
@@ -90,8 +92,16 @@ LEVELS = {
 
 generator = MapGenerator(width=25, height=25)
 
+# 每个生成关卡的随机种子 (录像里记录种子，回放时用它重建同一张地图)
+LEVEL_SEEDS = {}
+# 每个生成关卡的生成耗时 (毫秒)，供遥测上报
+LEVEL_GEN_MS = {}
+
 for i in range(3, 20):
-    LEVELS[i] = generator.generate()
+    LEVEL_SEEDS[i] = random.randrange(2 ** 32)
+    start = time.perf_counter()
+    LEVELS[i] = generator.generate(seed=LEVEL_SEEDS[i])
+    LEVEL_GEN_MS[i] = (time.perf_counter() - start) * 1000
 
 if __name__ == "__main__":    
     for level_id in sorted(LEVELS.keys()):
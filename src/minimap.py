@@ -0,0 +1,80 @@
+# src/minimap.py
+import pygame
+from settings import *
+from sprites import Ghost
+"""
+[小地图]
+关卡建好时把整张图缩小画进一张缓存 Surface；之后只在格子变化 (拾取金币、茧孵化) 时重画对应的那一小块。
+每帧只需要贴一次缓存图，再画玩家和鬼的标记，耗时与地图大小无关。
+"""
+
+class Minimap:
+    def __init__(self, level):
+        self.level = level
+        self.map_h = len(level.map_data)
+        self.map_w = max(len(row) for row in level.map_data)
+
+        # 大地图降采样：每个小地图单元覆盖 k x k 个格子，每个单元画成 cell_px 像素见方
+        longest = max(self.map_w, self.map_h)
+        self.k = -(-longest // MINIMAP_MAX_SIZE)
+        self.cell_px = max(1, min(MINIMAP_MAX_CELL_PX, MINIMAP_MAX_SIZE // -(-longest // self.k)))
+        self.cols = -(-self.map_w // self.k)
+        self.rows = -(-self.map_h // self.k)
+
+        self.surface = pygame.Surface((self.cols * self.cell_px, self.rows * self.cell_px))
+        self.surface.fill(MINIMAP_COLORS['.'])
+        self.rect = self.surface.get_rect(topright=(SCREEN_WIDTH - MINIMAP_MARGIN, MINIMAP_MARGIN))
+
+    def build_rows(self):
+        """整张图画一遍 (生成器：每画完一行单元 yield 一次，配合关卡分帧构建)"""
+        for cy in range(self.rows):
+            for cx in range(self.cols):
+                self._paint_cell(cx, cy)
+            yield
+
+    def patch(self, tiles):
+        """只重画这些格子所在的单元"""
+        for cell in {(c // self.k, r // self.k) for c, r in tiles}:
+            self._paint_cell(*cell)
+
+    def _kind(self, tile):
+        level = self.level
+        if tile in level.visible_sprites.static_grid: return 'W'
+        if tile in level.doors: return 'D'
+        if tile in level.cocoons.tiles: return 'O'
+        if tile in level.traps.tiles: return '^'
+        if tile in level.coins.tiles: return 'C'
+        return '.'
+
+    def _paint_cell(self, cx, cy):
+        # 单元内有门/茧/陷阱/金币就显示它 (按这个优先级)，否则墙占一半以上显示为墙
+        kinds = {}
+        for r in range(cy * self.k, min((cy + 1) * self.k, self.map_h)):
+            for c in range(cx * self.k, min((cx + 1) * self.k, self.map_w)):
+                kind = self._kind((c, r))
+                kinds[kind] = kinds.get(kind, 0) + 1
+        for kind in ('D', 'O', '^', 'C'):
+            if kind in kinds:
+                break
+        else:
+            kind = 'W' if kinds.get('W', 0) * 2 >= sum(kinds.values()) else '.'
+        rect = (cx * self.cell_px, cy * self.cell_px, self.cell_px, self.cell_px)
+        self.surface.fill(MINIMAP_COLORS[kind], rect)
+
+    def _marker(self, sprite, size):
+        x = self.rect.x + sprite.rect.centerx // TILE_SIZE // self.k * self.cell_px
+        y = self.rect.y + sprite.rect.centery // TILE_SIZE // self.k * self.cell_px
+        offset = (self.cell_px - size) // 2
+        return pygame.Rect(x + offset, y + offset, size, size)
+
+    def draw(self, surface):
+        """贴缓存图，再画玩家和鬼的标记；返回占用的屏幕矩形 (供脏矩形刷新)"""
+        border = self.rect.inflate(2, 2)
+        surface.blit(self.surface, self.rect)
+        size = max(2, self.cell_px)
+        for sprite in self.level.damage_sprites:
+            if isinstance(sprite, Ghost):
+                surface.fill(COLOR_GHOST, self._marker(sprite, size).clip(border))
+        surface.fill(COLOR_PLAYER_TEXT, self._marker(self.level.player, size + 1).clip(border))
+        pygame.draw.rect(surface, MINIMAP_BORDER_COLOR, border, 1)
+        return border
@@ -23,8 +23,8 @@ class BubbleSprite(pygame.sprite.Sprite):
     """玩家碰撞时产生的气泡类"""
     def __init__(self, groups, center_pos):
         super().__init__(groups)
-        # 随机大小：直径 (2px - 6px)
-        diameter = random.randint(6, 9)
+        # 随机大小：直径 (6px - 9px)
+        diameter = random.randint(*BUBBLE_SIZE_RANGE)
         radius = diameter // 2
 
         # 在透明画布的中心画一个圆
@@ -0,0 +1,62 @@
+# src/pools.py
+import pygame
+"""
+[对象池]
+刺和孵化出来的鬼生命周期短、出现频繁。kill() 之后不丢弃，而是放回池里；
+下次需要时取出来调用 reset() 复用，稳定游玩时不再为它们分配新对象。
+"""
+
+class PooledSprite(pygame.sprite.Sprite):
+    """可回收的精灵：从池里取出的实例在 kill() 时自动归还"""
+    pool = None
+
+    def kill(self):
+        was_alive = self.alive()
+        super().kill()
+        # 重复 kill 不会重复归还
+        if was_alive and self.pool is not None:
+            self.pool.release(self)
+
+class SpritePool:
+    def __init__(self, sprite_class, name=None):
+        """
+        :param sprite_class: PooledSprite 子类；构造参数为 (groups, **kwargs)，
+                             并提供 reset(**kwargs) 恢复到刚构造时的状态
+        """
+        self.sprite_class = sprite_class
+        self.name = name or sprite_class.__name__.lower()
+        self.free = []
+        self.created = 0
+        self.reused = 0
+        self.released = 0
+        self.peak_in_use = 0
+
+    @property
+    def in_use(self):
+        return self.created - len(self.free)
+
+    def acquire(self, groups, **kwargs):
+        if self.free:
+            sprite = self.free.pop()
+            sprite.reset(**kwargs)
+            sprite.add(*groups)
+            self.reused += 1
+        else:
+            sprite = self.sprite_class(groups, **kwargs)
+            sprite.pool = self
+            self.created += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        return sprite
+
+    def release(self, sprite):
+        self.free.append(sprite)
+        self.released += 1
+
+    def stats(self):
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "in_use": self.in_use,
+            "free": len(self.free),
+            "peak_in_use": self.peak_in_use,
+        }
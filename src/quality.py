@@ -0,0 +1,55 @@
+# src/quality.py
+from settings import *
+from telemetry import percentile
+"""
+[画质自适应]
+Game.run 每帧把时钟测得的实际耗时 (逻辑 + 绘制，不含为了锁帧而等待的时间) 交给调速器。
+每 QUALITY_WINDOW 帧看一次 p90：超出预算就降一档特效 (气泡密度、拖尾层数、金币动画频率)，
+连续几个窗口都很宽裕再升回一档。
+只动纯视觉的东西：模拟固定每帧一步、输入照常缓冲，绝不靠跳帧或丢输入来省时间。
+"""
+
+class QualityGovernor:
+    def __init__(self, budget_ms=QUALITY_BUDGET_MS, tiers=QUALITY_TIERS, enabled=QUALITY_ADAPTIVE):
+        self.budget_ms = budget_ms
+        self.tiers = tiers
+        self.enabled = enabled
+        self.tier = 0               # 当前档位下标，0 为最高画质
+        self.samples = []
+        self.calm_windows = 0       # 连续有余量的窗口数
+
+    @property
+    def settings(self):
+        return self.tiers[self.tier]
+
+    def observe(self, frame_ms):
+        """
+        记录一帧的耗时 (毫秒)。
+        :return: 档位变化时返回新档位下标，否则返回 None
+        """
+        if not self.enabled:
+            return None
+        self.samples.append(frame_ms)
+        if len(self.samples) < QUALITY_WINDOW:
+            return None
+
+        p90 = percentile(sorted(self.samples), 90)
+        self.samples.clear()
+        if p90 > self.budget_ms * QUALITY_DOWNGRADE_RATIO:
+            self.calm_windows = 0
+            if self.tier < len(self.tiers) - 1:
+                self.tier += 1
+                return self.tier
+        elif p90 < self.budget_ms * QUALITY_UPGRADE_RATIO:
+            self.calm_windows += 1
+            if self.calm_windows >= QUALITY_UPGRADE_WINDOWS and self.tier > 0:
+                self.calm_windows = 0
+                self.tier -= 1
+                return self.tier
+        else:
+            self.calm_windows = 0
+        return None
+
+    def reset_window(self):
+        """丢弃当前窗口的样本 (关卡切换、暂停之后，旧样本不代表之后的负载)"""
+        self.samples.clear()
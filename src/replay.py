@@ -0,0 +1,74 @@
+# src/replay.py
+import os
+import sys
+import json
+import time
+import argparse
+
+# 无界面运行：必须在导入 pygame 之前设置
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from settings import *
+from map_generator import MapGenerator
+from simulation import SimClock
+from inputs import ReplayInput
+
+def load_recording(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def build_map(recording):
+    """手工关卡直接读 LEVELS；生成关卡按录像里的种子重新生成同一张地图"""
+    if recording["seed"] is None:
+        from maps import LEVELS
+        return LEVELS[recording["level"]]
+    return MapGenerator().generate(seed=recording["seed"])
+
+def run_replay(recording, max_frames=None):
+    """
+    [快进回放] 不绘制、不限帧，尽可能快地把录像重跑一遍。
+    返回 (结果, 帧数)；结果为 'game_over' / 'level_complete'，跑完仍未结束则为 'playing'。
+    """
+    from level import Level
+
+    clock = SimClock()
+    level = Level(
+        recording["level"],
+        map_data=build_map(recording),
+        clock=clock,
+        input_source=ReplayInput(recording["events"], clock),
+    )
+
+    if max_frames is None:
+        max_frames = recording.get("frames", 0) + FPS
+    status = 'playing'
+    while status == 'playing' and clock.frame < max_frames:
+        status = level.run(draw=False)
+    return status, clock.frame
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-run input recordings headless")
+    parser.add_argument('recordings', nargs='+', help="recording JSON files")
+    args = parser.parse_args(argv)
+
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+    mismatches = 0
+    for path in args.recordings:
+        recording = load_recording(path)
+        start = time.perf_counter()
+        status, frames = run_replay(recording)
+        elapsed = time.perf_counter() - start
+
+        expected = (recording.get("result"), recording.get("frames"))
+        ok = (status, frames) == expected
+        mismatches += not ok
+        print(f"{'OK  ' if ok else 'DIFF'} {os.path.basename(path)}: {status} @ frame {frames} "
+              f"(recorded {expected[0]} @ {expected[1]}) in {elapsed:.2f}s")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
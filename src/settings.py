@@ -6,6 +6,10 @@ SCREEN_WIDTH = 420    # 游戏屏幕宽度（单位：像素）
 SCREEN_HEIGHT = 600   # 游戏屏幕高度（单位：像素）
 TILE_SIZE = 30        # 地图中小格子边长（单位：像素）；宽度14个，高度20个
 FPS = 60              # 帧率（每秒的刷新次数）
+LEVEL_BUILD_BUDGET_MS = 6   # 分帧构建关卡时，每帧最多花在构建上的时间 (毫秒)
+DIRTY_RECT_RENDERING = True # 镜头静止时只重画有变化的区域
+CULL_BUCKET_SIZE = 240      # 动态物体空间分桶的边长 (像素)
+CULL_SPRITE_MAX = 60        # 动态物体的最大尺寸 (像素)，剔除时按它放宽查询范围
 COLOR_BG = (0, 0, 0)  # 黑色背景
 
 # ui弹窗设置
@@ -18,10 +22,12 @@ UI_BOX_HEIGHT = 100                   # 画框高度
 UI_BOX_BG_COLOR = (220, 220, 220)     # 浅灰色底
 UI_BOX_BORDER_COLOR = (255, 255, 255) # 白色边框
 UI_BORDER_WIDTH = 3                   # 边框粗细
+UI_PROGRESS_HEIGHT = 8                # 加载进度条高度
+UI_PROGRESS_COLOR = (80, 160, 80)     # 加载进度条颜色：绿色
 
 # 茧和鬼的设置
 COLOR_GHOST = (255, 0, 0)    # 字的颜色：红色
-GHOST_SPEED = 1              # 鬼的移动速度
+GHOST_SPEED = 1              # 鬼的移动速度 (需要能整除 TILE_SIZE，鬼才会正好停在格子中心)
 COCOON_SPAWN_DELAY = 1000    # 茧孵化所需时间 (毫秒)
 
 # 墙和门的颜色设置
@@ -31,6 +37,29 @@ COLOR_DOOR = (255, 215, 0)   # 门：金色
 # 玩家设置
 COLOR_PLAYER_TEXT = (255, 255, 0) # 玩家文字：标准黄色
 PLAYER_SPEED = 10                 # 确保能整除 TILE_SIZE 以保证移动平滑
+INPUT_BUFFER_SIZE = 2             # 滑行中最多缓存几次按键
+INPUT_BUFFER_MS = 400             # 缓存的按键超过这个时间 (毫秒) 还没用上就作废
+
+# 小地图
+MINIMAP_ENABLED = True                # 默认是否显示 (游戏中按 M 切换)
+MINIMAP_MAX_SIZE = 110                # 小地图最长边 (像素)
+MINIMAP_MAX_CELL_PX = 4               # 小地图上一个单元最多画几个像素
+MINIMAP_MARGIN = 8                    # 距屏幕右上角的边距
+MINIMAP_BORDER_COLOR = (255, 255, 255)
+MINIMAP_COLORS = {
+    '.': (20, 20, 20),                # 空地
+    'W': (128, 128, 128),             # 墙
+    'D': (255, 215, 0),               # 门
+    'C': (150, 120, 0),               # 金币
+    'O': (120, 0, 0),                 # 茧
+    '^': (0, 160, 160),               # 陷阱
+}
+
+# 提示 (游戏中按 H)
+HINT_DURATION_MS = 2000               # 按一次提示，箭头显示多久 (毫秒)
+HINT_ARROW_SIZE = 9                   # 箭头半径 (像素)
+HINT_COLOR = (0, 255, 128)            # 箭头颜色
+HINT_BUILD_CHUNK = 500                # 分帧构建提示表时，BFS 每展开多少个位置让出一次
 
 # 陷阱和刺的设置
 TRAP_COOLDOWN = 3000         # 陷阱总冷却时间 (要比刺的整套动作长)
@@ -46,15 +75,18 @@ COLOR_CYAN = (0, 255, 255)   # 青色 (用于文字和边框)
 COLOR_COIN = (255, 215, 0)      # 金色
 COLOR_COIN_EDGE = (200, 150, 0) # 深金色 (用于描边)
 COIN_ANIMATION_SPEED = 0.10     # 动画播放速度
+COIN_FRAME_COUNT = 5            # 金币不重复的动画帧数 (半圈)
 
 # 拖尾设置
 TRAIL_LIFE_MAIN = int((2 * TILE_SIZE) / PLAYER_SPEED)     # 中间拖尾的生命周期
 TRAIL_LIFE_UP = int((1.3 * TILE_SIZE) / PLAYER_SPEED)     # 上侧拖尾生命周期
 TRAIL_LIFE_DOWN = int((1.5 * TILE_SIZE) / PLAYER_SPEED)   # 下侧拖尾生命周期
 COLOR_LINES = (255, 255, 0)                               # 黄色
+TRAIL_DIRECTIONS = [(1, 0), (-1, 0), (0, -1), (0, 1)]     # 拖尾的四个朝向
 
 # 气泡设置
 BUBBLE_COLOR = (211, 211, 211)                            # 浅灰色
+BUBBLE_SIZE_RANGE = (6, 9)                                # 气泡直径范围 (像素)
 
 # 图片资源位置
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))    # 获取当前项目的根目录；abspath()获取当前文件的绝对路径；dirname()获取父目录，即去除最后一个路径
@@ -64,4 +96,69 @@ GRAPHICS_DIR = os.path.join(ASSETS_DIR, 'graphics')
 WALL_IMG_PATH = os.path.join(GRAPHICS_DIR, 'wall.png')                    # 墙图片位置
 PLAYER_IMG_PATH = os.path.join(GRAPHICS_DIR, 'player.png')                # 玩家图片位置
 GHOST_IMG_PATH = os.path.join(GRAPHICS_DIR, 'ghost.png')                  # 鬼图片位置
-DOOR_IMG_PATH = os.path.join(GRAPHICS_DIR, 'door.png')                    # 门图片位置
\ No newline at end of file
+DOOR_IMG_PATH = os.path.join(GRAPHICS_DIR, 'door.png')                    # 门图片位置
+
+# 资源缓存上限：(最多条目数, 最多字节数 / None 表示不限)
+ASSET_CACHE_LIMITS = {
+    'tile':   (64, 2 * 1024 * 1024),
+    'bubble': (16, 64 * 1024),
+    'bullet': (16, 256 * 1024),
+    'font':   (8, None),
+}
+
+# 纹理图集 (首次启动时生成，之后一次读入)
+CACHE_DIR = os.path.join(ASSETS_DIR, 'cache')                             # 运行时生成的缓存文件
+ATLAS_IMG_PATH = os.path.join(CACHE_DIR, 'atlas.png')                     # 图集图片
+ATLAS_INDEX_PATH = os.path.join(CACHE_DIR, 'atlas.json')                  # 图集索引
+ATLAS_VERSION = 1                                                         # 绘制逻辑改动后 +1，强制重建图集
+ATLAS_COLUMNS = 8                                                         # 图集每行放几个格子
+FONT_NAMES = ['simhei', 'microsoftyahei', 'pingfangsc']                 # 方块文字使用的系统字体 (按优先级)
+FONT_CACHE_PATH = os.path.join(CACHE_DIR, 'fonts.json')                   # 已解析的字体文件路径
+
+# 性能追踪 (tracing.py)
+TRACE_BUFFER_SIZE = 100000                                                # 环形缓冲区最多保留多少个区间
+TRACE_DIR = os.path.join(BASE_DIR, 'traces')                              # trace 文件保存位置
+
+# 开发模式
+HOT_RELOAD_INTERVAL_MS = 250                                              # 多久检查一次 maps.py 是否被修改
+
+# 录像
+RECORDINGS_DIR = os.path.join(BASE_DIR, 'recordings')                     # 输入录像保存位置
+
+# 遥测
+TELEMETRY_ENABLED = True                                                  # 是否记录每关的性能与结果
+TELEMETRY_DIR = os.path.join(BASE_DIR, 'telemetry')                       # 遥测日志 (JSON lines) 保存位置
+TELEMETRY_BATCH_SIZE = 64                                                 # 攒够多少条事件就唤醒写盘线程
+TELEMETRY_FLUSH_INTERVAL = 5.0                                            # 最长多少秒写一次盘
+
+# 压力测试 (soak.py)
+SOAK_FRAME_BUDGET_MS = 1000 / FPS                                         # 每帧 p99 耗时上限 (毫秒)
+SOAK_MEMORY_CEILING_MB = 64                                               # 跑完所有关卡后内存最多增长多少 (MB)
+SOAK_MAX_SECONDS = 120                                                    # 单关最长模拟时间 (秒)，超时算失败
+SOAK_ALLOC_TICKS = 400                                                    # 分配检查测量多少帧
+SOAK_PLACEMENT_MAPS = 200                                                 # 放置检查生成多少张模板地图
+SOAK_ALLOC_SLACK_BYTES = 32                                               # 每次 update 允许的临时内存峰值 (最多一个装箱的整数；一个 Vector2 就超过)
+SOAK_ALLOC_WARMUP = 16                                                    # 每类精灵 (刺按状态) 的前几个稳态样本不算 (解释器还在特化字节码)
+SOAK_MAPGEN_SIZES = (250, 500)                                            # 生成耗时检查：迷宫模式生成这些边长的正方形地图
+SOAK_MAPGEN_RUNS = 2                                                      # 每个尺寸生成几次，取最快的一次 (排除机器抖动)
+SOAK_MAPGEN_BUDGET_S = 1.0                                                # 最大尺寸的生成耗时上限 (秒)
+SOAK_MAPGEN_SCALING = 1.5                                                 # 最大尺寸每格耗时最多是最小尺寸的几倍 (耗时应与面积成线性)
+
+# 画质自适应 (quality.py)：帧耗时超出预算时逐级降低特效，有余量时再逐级恢复
+QUALITY_ADAPTIVE = True                                                   # 是否开启
+QUALITY_BUDGET_MS = 1000 / FPS                                            # 每帧逻辑 + 绘制的耗时预算 (不含等待)
+QUALITY_WINDOW = 30                                                       # 每多少帧评估一次 (取这段时间的 p90)
+QUALITY_DOWNGRADE_RATIO = 0.9                                             # p90 超过预算的这个比例就降一级
+QUALITY_UPGRADE_RATIO = 0.5                                               # p90 低于预算的这个比例才考虑升一级
+QUALITY_UPGRADE_WINDOWS = 4                                               # 连续这么多个评估窗口都有余量才升级 (防止来回跳)
+# 从高到低的画质档位：气泡密度、拖尾层数、金币动画每几帧换一次图
+QUALITY_TIERS = [
+    {"particles": 1.0,  "trail_layers": 3, "coin_anim_stride": 1},
+    {"particles": 0.5,  "trail_layers": 2, "coin_anim_stride": 2},
+    {"particles": 0.25, "trail_layers": 1, "coin_anim_stride": 4},
+    {"particles": 0.0,  "trail_layers": 1, "coin_anim_stride": 8},
+]
+
+# 垃圾回收控制 (gc_control.py)：游玩时不做完整回收，推迟到关卡切换和静止画面
+GC_CONTROL = True                                                         # 是否由游戏接管完整回收的时机
+GC_PLAY_THRESHOLDS = (700, 10, 10 ** 6)                                   # 游玩时的 gc 阈值：年轻代照常回收，第 2 代等于关闭
@@ -0,0 +1,23 @@
+# src/simulation.py
+from settings import *
+
+class SimClock:
+    """
+    [模拟时钟]
+    所有计时逻辑 (茧孵化、陷阱冷却、刺的伸缩) 都从这里取时间，而不是直接读 pygame.time.get_ticks()。
+    每帧固定前进 1000/FPS 毫秒：同样的输入总能得到同样的结果，回放时也可以不等待真实时间。
+    """
+    def __init__(self, step_ms=1000 / FPS):
+        self.step_ms = step_ms
+        self.frame = 0      # 已经模拟的帧数 (录像中的 tick)
+
+    def tick(self):
+        """前进一帧"""
+        self.frame += 1
+
+    def get_ticks(self):
+        """当前模拟时间 (毫秒)，用法与 pygame.time.get_ticks() 相同"""
+        return int(self.frame * self.step_ms)
+
+    def reset(self):
+        self.frame = 0
@@ -0,0 +1,310 @@
+# src/slide_graph.py
+import re
+from bisect import bisect_left, insort
+from collections import deque
+
+DIRS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
+def _occupied(line, lo, hi):
+    """有序坐标表 line 里是否有落在 [lo, hi] 内的坐标"""
+    i = bisect_left(line, lo)
+    return i < len(line) and line[i] <= hi
+
+class SlideGraph:
+    """
+    [滑行图]
+    节点是停止位置，边是一次滑行 (沿一个方向一直走到撞墙)。
+    每一行、每一列各维护一个有序的阻挡坐标表，任意一次滑行的终点用二分查找 O(log n) 得到；
+    放置或移除一个障碍只改动它所在的那一行和那一列，
+    也就是只有“射线穿过该格”的滑行边会变化，其余的边不用重算。
+
+    - stoppers: 永久阻挡 (墙、刺)，滑行撞上就停
+    - hazards:  临时阻挡 (茧)，孵化后会消失；经过它的滑行边视为不可用，
+                这样求出的路线无论茧在不在都成立
+    """
+    def __init__(self, grid, stoppers='W^', hazards='O', deferred=False):
+        """:param deferred: 为 True 时先不扫描地图，由调用方逐行推进 scan_rows() (配合关卡分帧构建)"""
+        self.h = len(grid)
+        self.w = len(grid[0])
+        self.stoppers = stoppers
+        self.hazards = hazards
+        self.row_stops = [[] for _ in range(self.h)]
+        self.col_stops = [[] for _ in range(self.w)]
+        self.row_hazards = [[] for _ in range(self.h)]
+        self.col_hazards = [[] for _ in range(self.w)]
+        if not deferred:
+            for _ in self.scan_rows(grid):
+                pass
+
+    def scan_rows(self, grid):
+        """
+        登记地图上的阻挡 (生成器：每扫描完一行 yield 一次)。按行、列顺序扫描，得到的坐标天然有序。
+        用正则在 C 层面找出阻挡字符的位置，不逐格判断
+        """
+        stop_at = re.compile('[%s]' % re.escape(self.stoppers)).finditer
+        hazard_at = re.compile('[%s]' % re.escape(self.hazards)).finditer if self.hazards else None
+        col_stops, col_hazards = self.col_stops, self.col_hazards
+        for y, row in enumerate(grid):
+            line = row if isinstance(row, str) else ''.join(row)
+            xs = self.row_stops[y] = [m.start() for m in stop_at(line)]
+            for x in xs:
+                col_stops[x].append(y)
+            if hazard_at is not None:
+                xs = self.row_hazards[y] = [m.start() for m in hazard_at(line)]
+                for x in xs:
+                    col_hazards[x].append(y)
+            yield
+
+    # =========================================================================
+    #  增量更新
+    # =========================================================================
+    def block(self, cell):
+        x, y = cell
+        insort(self.row_stops[y], x)
+        insort(self.col_stops[x], y)
+
+    def unblock(self, cell):
+        x, y = cell
+        self.row_stops[y].remove(x)
+        self.col_stops[x].remove(y)
+
+    def add_hazard(self, cell):
+        x, y = cell
+        insort(self.row_hazards[y], x)
+        insort(self.col_hazards[x], y)
+
+    def remove_hazard(self, cell):
+        x, y = cell
+        self.row_hazards[y].remove(x)
+        self.col_hazards[x].remove(y)
+
+    # =========================================================================
+    #  滑行查询
+    # =========================================================================
+    def slide(self, start, direction):
+        """从 start 沿 direction 滑行，返回停下的位置 (只看永久阻挡)"""
+        x, y = start
+        dx, dy = direction
+        if dy == 0:
+            stops = self.row_stops[y]
+            i = bisect_left(stops, x)
+            if dx > 0:
+                # 右侧最近的阻挡 (跳过自身所在格)
+                if i < len(stops) and stops[i] == x: i += 1
+                return (stops[i] - 1 if i < len(stops) else self.w - 1, y)
+            return (stops[i - 1] + 1 if i > 0 else 0, y)
+        stops = self.col_stops[x]
+        i = bisect_left(stops, y)
+        if dy > 0:
+            if i < len(stops) and stops[i] == y: i += 1
+            return (x, stops[i] - 1 if i < len(stops) else self.h - 1)
+        return (x, stops[i - 1] + 1 if i > 0 else 0)
+
+    def crosses_hazard(self, start, end):
+        """start -> end 这段射线上 (含两端) 是否有临时阻挡"""
+        (x1, y1), (x2, y2) = start, end
+        if y1 == y2:
+            return _occupied(self.row_hazards[y1], min(x1, x2), max(x1, x2))
+        return _occupied(self.col_hazards[x1], min(y1, y2), max(y1, y2))
+
+    def moves(self, cell):
+        """
+        从 cell 出发所有可用的滑行：[(方向, 终点), ...]，方向顺序同 DIRS。
+        这是寻路的最内层，同一行 (列) 的两个方向共用一次二分查找。
+        """
+        x, y = cell
+        result = []
+
+        stops = self.col_stops[x]
+        i = bisect_left(stops, y)
+        up = stops[i - 1] + 1 if i > 0 else 0
+        if i < len(stops) and stops[i] == y: i += 1
+        down = stops[i] - 1 if i < len(stops) else self.h - 1
+        hazards = self.col_hazards[x]
+        if up != y and not (hazards and _occupied(hazards, up, y)):
+            result.append(((0, -1), (x, up)))
+        if down != y and not (hazards and _occupied(hazards, y, down)):
+            result.append(((0, 1), (x, down)))
+
+        stops = self.row_stops[y]
+        i = bisect_left(stops, x)
+        left = stops[i - 1] + 1 if i > 0 else 0
+        if i < len(stops) and stops[i] == x: i += 1
+        right = stops[i] - 1 if i < len(stops) else self.w - 1
+        hazards = self.row_hazards[y]
+        if left != x and not (hazards and _occupied(hazards, left, x)):
+            result.append(((-1, 0), (left, y)))
+        if right != x and not (hazards and _occupied(hazards, x, right)):
+            result.append(((1, 0), (right, y)))
+        return result
+
+    # =========================================================================
+    #  寻路
+    # =========================================================================
+    def solve(self, start, goal):
+        """BFS 求最少滑行次数的路线，返回依次停下的位置列表 (不含起点)；到不了返回 None"""
+        return self.search(start, {goal})
+
+    def search(self, start, goals, max_nodes=None):
+        """
+        BFS 到 goals 中任意一个位置，返回停止位置列表 (不含起点，最后一个是到达的目标)。
+        max_nodes 限制最多展开的节点数，超出视为找不到 (用于局部修补路线)。
+        """
+        parent = {start: None}
+        q = deque([start])
+        while q:
+            curr = q.popleft()
+            if curr in goals:
+                stops = []
+                while curr != start:
+                    stops.append(curr)
+                    curr = parent[curr]
+                stops.reverse()
+                return stops
+            if max_nodes is not None and len(parent) > max_nodes:
+                return None
+            for _, end in self.moves(curr):
+                if end not in parent:
+                    parent[end] = curr
+                    q.append(end)
+        return None
+
+    def condensation(self, cells):
+        """
+        Tarjan 强连通分量 (迭代实现，大图不会超出递归深度)，线性时间。
+        同一分量里的位置两两可以互相滑到；分量之间的滑行是单向的，把分量缩成点就是一张 DAG。
+        返回 (comp, sccs, dag)：comp[k] 是 cells[k] 所在的分量编号，sccs[编号] 是该分量的位置列表，
+        dag[编号] 是一次滑行能进入的其他分量编号列表 (不重复)。
+        编号按逆拓扑序分配：dag[i] 里的编号都小于 i (下游分量先编号)。
+        只考虑 cells 之内的位置。
+        大地图上这里有几十万个节点：内部只用平铺的整数数组 (格子 (x, y) 的下标是 x * h + y，
+        与按坐标排序的 cells 顺序一致，查表时访问的位置相邻；边按节点连续存放)，不建坐标字典，也不为每条边生成元组。
+        """
+        cells = list(cells)
+        n = len(cells)
+        w, h = self.w, self.h
+        ids = [-1] * (w * h)            # 格子下标 -> 节点编号，不在 cells 里的是 -1
+        for k, (x, y) in enumerate(cells):
+            ids[x * h + y] = k
+
+        # 边：节点 k 的后继是 targets[first[k]:first[k + 1]] (与 moves() 的规则相同)
+        first = [0] * (n + 1)
+        targets = []
+        push = targets.append
+        row_stops, col_stops = self.row_stops, self.col_stops
+        row_hazards, col_hazards = self.row_hazards, self.col_hazards
+        for k, (x, y) in enumerate(cells):
+            stops = col_stops[x]
+            i = bisect_left(stops, y)
+            up = stops[i - 1] + 1 if i > 0 else 0
+            if i < len(stops) and stops[i] == y: i += 1
+            down = stops[i] - 1 if i < len(stops) else h - 1
+            hazards = col_hazards[x]
+            if up != y and not (hazards and _occupied(hazards, up, y)):
+                j = ids[x * h + up]
+                if j >= 0: push(j)
+            if down != y and not (hazards and _occupied(hazards, y, down)):
+                j = ids[x * h + down]
+                if j >= 0: push(j)
+
+            stops = row_stops[y]
+            i = bisect_left(stops, x)
+            left = stops[i - 1] + 1 if i > 0 else 0
+            if i < len(stops) and stops[i] == x: i += 1
+            right = stops[i] - 1 if i < len(stops) else w - 1
+            hazards = row_hazards[y]
+            if left != x and not (hazards and _occupied(hazards, left, x)):
+                j = ids[left * h + y]
+                if j >= 0: push(j)
+            if right != x and not (hazards and _occupied(hazards, x, right)):
+                j = ids[right * h + y]
+                if j >= 0: push(j)
+            first[k + 1] = len(targets)
+
+        index = [-1] * n                # 访问序号；-1 未访问，n 已归入某个分量 (不再参与 low 的更新)
+        low = [0] * n
+        comp = [-1] * n
+        pos = first[:n]                 # 每个节点下一条要看的边
+        order = []                      # 按分量依次排列的节点 (同一分量的节点相邻)
+        stack = []
+        sccs = []
+        counter = 0
+
+        for root in range(n):
+            if index[root] >= 0:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            work = [root]
+            while work:
+                node = work[-1]
+                p, end = pos[node], first[node + 1]
+                while p < end:
+                    nxt = targets[p]
+                    p += 1
+                    if index[nxt] < 0:
+                        pos[node] = p
+                        index[nxt] = low[nxt] = counter
+                        counter += 1
+                        stack.append(nxt)
+                        work.append(nxt)
+                        break
+                    if index[nxt] < low[node]:
+                        low[node] = index[nxt]
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1]
+                        if low[node] < low[parent]:
+                            low[parent] = low[node]
+                    if low[node] == index[node]:
+                        # node 是分量的根：栈上它之后的都属于这个分量
+                        c = len(sccs)
+                        members = []
+                        while True:
+                            k = stack.pop()
+                            index[k] = n
+                            comp[k] = c
+                            order.append(k)
+                            members.append(cells[k])
+                            if k == node:
+                                break
+                        sccs.append(members)
+
+        # 分量的出边：同一分量的节点相邻，seen[j] == c 表示 j 已经登记为 c 的后继
+        dag = [[] for _ in sccs]
+        seen = [-1] * len(sccs)
+        for k in order:
+            c = comp[k]
+            for p in range(first[k], first[k + 1]):
+                j = comp[targets[p]]
+                if j != c and seen[j] != c:
+                    seen[j] = c
+                    dag[c].append(j)
+        return comp, sccs, dag
+
+    @staticmethod
+    def ray_contains(start, end, cell):
+        """cell 是否在 start -> end 这一段滑行经过的格子上"""
+        (x1, y1), (x2, y2), (x, y) = start, end, cell
+        if y1 == y2 == y:
+            return min(x1, x2) <= x <= max(x1, x2)
+        if x1 == x2 == x:
+            return min(y1, y2) <= y <= max(y1, y2)
+        return False
+
+    @staticmethod
+    def path_tiles(start, stops):
+        """把停止位置序列展开成路线经过的所有格子"""
+        tiles = {start}
+        cx, cy = start
+        for nx, ny in stops:
+            if nx == cx:
+                step = 1 if ny > cy else -1
+                for y in range(cy, ny + step, step): tiles.add((cx, y))
+            else:
+                step = 1 if nx > cx else -1
+                for x in range(cx, nx + step, step): tiles.add((x, cy))
+            cx, cy = nx, ny
+        return tiles
@@ -0,0 +1,404 @@
+# src/soak.py
+import io
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import contextlib
+
+# 无界面运行：必须在导入 pygame 之前设置
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from settings import *
+from map_generator import MapGenerator
+from simulation import SimClock
+from inputs import AutopilotInput
+from telemetry import FrameStats
+from gc_control import gc_control
+"""
+[压力测试]
+用 MapGenerator 求出的滑行解法自动驾驶玩家，无界面连续跑很多张生成地图 (多种子、多尺寸)，
+统计每帧耗时分布、精灵数量峰值、切换关卡后的内存增长、每关耗时和游玩中的垃圾回收停顿 (回收时机与游戏相同)。
+最后用 tracemalloc 检查玩家、鬼、刺的稳态 update() 没有创建临时对象，
+检查热重载之后重开仍然回到刚建好时的状态，检查缓冲或按住的方向键在滑行停下的同一个 tick 就开始下一次滑行，
+检查生成器在模板地图上总能放满配置的物品组数，并检查迷宫模式生成大地图的耗时 (500x500 在预算内、耗时与面积成线性)。
+超出帧预算、内存上限或分配检查不通过时以非零状态退出，方便在发布前发现 Level / CameraGroup / 精灵的性能退化。
+
+    python soak.py --seeds 10 --sizes template 60x60 120x120
+"""
+
+def rss_mb():
+    """当前进程常驻内存 (MB)；没有 /proc 的平台退回到峰值常驻内存"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+def parse_size(text):
+    """'template' 或 '宽x高'"""
+    if text == 'template':
+        return None
+    w, h = text.lower().split('x')
+    return int(w), int(h)
+
+def generate(size, seed):
+    """生成地图，返回 (地图, 解法停止位置, 生成耗时毫秒)"""
+    generator = MapGenerator() if size is None else MapGenerator(*size, mode='maze')
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):     # 屏蔽生成器的进度输出
+        grid = generator.generate(seed=seed)
+    return grid, generator.solution_stops, (time.perf_counter() - start) * 1000
+
+def play(grid, stops, max_ticks, draw=True):
+    """自动驾驶跑完一关，返回统计字典"""
+    from level import Level
+
+    clock = SimClock()
+    autopilot = AutopilotInput(stops)
+    start = time.perf_counter()
+    level = Level(0, map_data=grid, clock=clock, input_source=autopilot)
+    build_ms = (time.perf_counter() - start) * 1000
+    autopilot.player = level.player
+    gc_control.level_ready()
+    gc_control.reset_stats()
+    gc_control.enter_play()
+
+    frames = FrameStats()
+    peak_sprites = peak_damage = 0
+    status = 'playing'
+    start = time.perf_counter()
+    while status == 'playing' and clock.frame < max_ticks:
+        tick_start = time.perf_counter()
+        status = level.run(draw=draw)
+        frames.add((time.perf_counter() - tick_start) * 1000)
+        peak_sprites = max(peak_sprites, len(level.visible_sprites))
+        peak_damage = max(peak_damage, len(level.damage_sprites))
+
+    return {
+        "result": status if status != 'playing' else 'timeout',
+        "cause": level.death_cause,
+        "ticks": clock.frame,
+        "wall_s": time.perf_counter() - start,
+        "build_ms": build_ms,
+        "peak_sprites": peak_sprites,
+        "peak_damage": peak_damage,
+        "pools": level.pool_stats(),
+        "frame_samples": frames.samples,
+        "gc": gc_control.summary(),
+    }
+
+def placement_check(count=SOAK_PLACEMENT_MAPS):
+    """
+    [放置检查] 生成 count 张模板地图，模板上总有空位，茧、陷阱、金币都应放满配置的组数
+    (被增量校验拒绝的位置不能占用名额)。返回没放满的 [(种子, 物品, 放下组数, 配置组数)]
+    """
+    keys = {'O': "cocoon_groups", '^': "trap_groups", 'C': "coin_groups"}
+    short = []
+    for seed in range(1, count + 1):
+        generator = MapGenerator()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator.generate(seed=seed)
+        for char, key in keys.items():
+            want = generator._item_count(key)
+            if generator.placed_groups[char] < want:
+                short.append((seed, char, generator.placed_groups[char], want))
+    return short
+
+def mapgen_check(sizes=SOAK_MAPGEN_SIZES, runs=SOAK_MAPGEN_RUNS):
+    """[生成耗时检查] 迷宫模式生成 边长x边长 的地图，每个尺寸生成 runs 次取最快的一次。返回 {边长: 秒}"""
+    return {side: min(generate((side, side), seed)[2] for seed in range(1, runs + 1)) / 1000
+            for side in sizes}
+
+def input_check(grid):
+    """
+    [输入检查] 滑行最后一帧里按下的键 (输入缓冲) 和一直按住的键，都要在滑行停下的同一个 tick 开始下一次滑行，
+    不能先停一帧。先沿一个能走的方向滑到底，再往回滑 (原路返回总是能走)。
+    返回没做到的输入源名称列表
+    """
+    from level import Level
+    from inputs import BufferedKeyboardInput, KEY_DIRECTIONS
+
+    class HeldInput:
+        """一直按住 direction 这个方向"""
+        direction = None
+        def poll(self):
+            return self.direction
+
+    keys = {direction: key_group[0] for key_group, direction in KEY_DIRECTIONS}
+    failed = []
+    for name in ('buffered', 'held'):
+        clock = SimClock()
+        source = BufferedKeyboardInput(clock) if name == 'buffered' else HeldInput()
+        level = Level(0, map_data=grid, clock=clock, input_source=source)
+        player = level.player
+        player.create_particle = _no_particles
+
+        def press(direction):
+            if name == 'buffered':
+                source.feed(pygame.event.Event(pygame.KEYDOWN, key=keys[direction]))
+            else:
+                source.direction = direction
+
+        first = next(d for d in keys if player._hit_obstacle(player.rect.x + d[0], player.rect.y + d[1]) is None)
+        back = (-first[0], -first[1])
+        press(first)
+        level.run(draw=False)     # Level.run 自己推进时钟
+        for _ in range(max(len(grid), len(grid[0])) * TILE_SIZE // PLAYER_SPEED + 1):
+            if player.direction != first:
+                break
+            # 下一帧就会撞上：在这一帧按下返回的方向
+            if player._hit_obstacle(player.rect.x + first[0] * player.speed,
+                                    player.rect.y + first[1] * player.speed) is not None:
+                press(back)
+            level.run(draw=False)
+        if player.status != 'moving' or player.direction != back:
+            failed.append(name)
+    return failed
+
+def reload_check(grid):
+    """
+    [热重载检查] 玩到一半 (玩家离开出生点、拾取一枚金币、孵化一个茧) 时热重载一次
+    (删掉另一枚金币、在空地上加一枚)，再重开：应当回到刚建好时的状态，只带上这次热重载改动的格子。
+    返回不满足的项目列表
+    """
+    from level import Level, OBSTACLE_CHARS
+    from hints import HintTable
+
+    clock = SimClock()
+    level = Level(0, map_data=grid, clock=clock, input_source=AutopilotInput([]))
+    player = level.player
+    spawn = player.rect.topleft
+    coin_tiles = sorted(level.coins.tiles)
+    if len(coin_tiles) < 2 or not level.cocoons.tiles:
+        return []
+    collected, removed = coin_tiles[0], coin_tiles[1]
+    added = next((c, r) for r, row in enumerate(grid) for c, char in enumerate(row)
+                 if char == '.' and (c, r) != (spawn[0] // TILE_SIZE, spawn[1] // TILE_SIZE))
+    cocoon_tile, cocoon = next(iter(level.cocoons.tiles.items()))
+
+    # 玩到一半
+    level.coins.collect(pygame.Rect(collected[0] * TILE_SIZE, collected[1] * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+    level.cocoons._hatch(cocoon)
+    for tile in level.cocoons.pop_hatched():
+        level.hints.unblock(tile)
+    player.rect.topleft = (collected[0] * TILE_SIZE, collected[1] * TILE_SIZE)
+
+    rows = [list(row) for row in grid]
+    rows[removed[1]][removed[0]] = '.'
+    rows[added[1]][added[0]] = 'C'
+    new_map = ["".join(row) for row in rows]
+    level.apply_map(new_map)
+    level.restart()
+
+    problems = []
+    if player.rect.topleft != spawn:
+        problems.append(f"player at {player.rect.topleft}, spawn {spawn}")
+    if collected not in level.coins.tiles:
+        problems.append(f"collected coin {collected} not restored")
+    if removed in level.coins.tiles:
+        problems.append(f"coin {removed} deleted by the reload came back")
+    if added not in level.coins.tiles:
+        problems.append(f"coin {added} added by the reload missing")
+    if cocoon_tile not in level.cocoons.tiles or cocoon_tile not in level.obstacle_grid:
+        problems.append(f"hatched cocoon {cocoon_tile} not restored")
+    fresh = HintTable(new_map, level.doors, stoppers=OBSTACLE_CHARS)
+    for _ in fresh.build_rows():
+        pass
+    level.hints.moves_left(cocoon_tile)    # 先处理重开时排队的改动
+    if level.hints.dist != fresh.dist:
+        problems.append("hint table differs from a fresh build")
+    return problems
+
+def _no_particles(type, pos, surf=None, life_span=0, direction_key=None):
+    """分配检查时不生成特效：拖尾、气泡本来就是新精灵，不属于移动逻辑"""
+
+def _phase(sprite):
+    """
+    精灵当前所处的阶段：刺的 state；玩家的 status 和方向 (撞墙的那一帧可能立刻读到下一次输入，换个方向接着滑)；
+    鬼所在的格子 (走到下一个格子中心时重新选方向)
+    """
+    if hasattr(sprite, 'state'):
+        return sprite.state
+    if hasattr(sprite, 'status'):
+        return sprite.status, sprite.direction
+    return sprite.col, sprite.row
+
+def _update_peak(update):
+    """执行一次 update，返回期间临时内存的峰值 (字节)"""
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()    # 读 before 时分配的元组、整数放在重置之前，不算进峰值
+    update()
+    return tracemalloc.get_traced_memory()[1] - before
+
+def alloc_check(grid, stops, ticks=SOAK_ALLOC_TICKS):
+    """
+    [分配检查] 在一张关卡里放上鬼和刺，自动驾驶跑 ticks 帧，逐个测量玩家、鬼、刺 update() 期间的内存峰值。
+    只统计稳态的帧：阶段切换、停下读输入、鬼走到格子中心选方向、被回收的那一帧本来就会登记定时器/归还对象池，不算在内。
+    稳态的帧里玩家、鬼、刺都只是 move_ip，不读像素坐标 (CPython 里超过 256 的整数也是新对象)；
+    SOAK_ALLOC_SLACK_BYTES 只留一个装箱整数的余量，每帧新建一个 Vector2 就会超出。
+    返回 {类名: 去掉测量本身开销后的最大峰值 (字节)}
+    """
+    from level import Level
+    from sprites import Player, Ghost, Spike, DIR_UP
+
+    clock = SimClock()
+    autopilot = AutopilotInput(stops)
+    level = Level(0, map_data=grid, clock=clock, input_source=autopilot)
+    autopilot.player = level.player
+    level.player.create_particle = _no_particles
+    groups = [level.visible_sprites, level.damage_sprites]
+    for col, row in list(level.cocoons.tiles)[:8]:
+        level.cocoons.ghost_pool.acquire(groups, pos=(col * TILE_SIZE, row * TILE_SIZE),
+                                         player=level.player, wall_grid=level.obstacle_grid)
+    for col, row in list(level.traps.tiles)[:8]:
+        level.traps.spike_pool.acquire(groups, start_pos=(col * TILE_SIZE, row * TILE_SIZE),
+                                       direction=DIR_UP, timers=level.timers)
+    for _ in range(5):
+        level.run(draw=False)
+
+    class Idle:
+        def update(self):
+            pass
+
+    tracemalloc.start()
+    try:
+        overhead = min(_update_peak(Idle().update) for _ in range(50))
+        worst = {}
+        seen = {}
+        for _ in range(ticks):
+            clock.tick()
+            for sprite in level.visible_sprites.sprites():
+                if not isinstance(sprite, (Player, Ghost, Spike)):
+                    sprite.update()
+                    continue
+                phase = _phase(sprite)
+                idle = getattr(sprite, 'status', None) == 'idle'
+                peak = _update_peak(sprite.update)
+                if idle or _phase(sprite) != phase or not sprite.alive():
+                    continue
+                name = type(sprite).__name__
+                # 每段代码头几次执行时解释器还在特化字节码，会有少量分配 (刺的每个状态是不同的处理函数)
+                key = (name, phase if isinstance(phase, str) else None)
+                seen[key] = seen.get(key, 0) + 1
+                if seen[key] <= SOAK_ALLOC_WARMUP:
+                    continue
+                worst[name] = max(worst.get(name, 0), peak - overhead)
+            level.traps.update()
+            level.cocoons.update()
+            level.timers.run_due()
+            level.cocoons.pop_hatched()
+    finally:
+        tracemalloc.stop()
+    return worst
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Autopilot soak benchmark over generated levels")
+    parser.add_argument('--seeds', type=int, default=5, help="levels per size")
+    parser.add_argument('--first-seed', type=int, default=1)
+    parser.add_argument('--sizes', nargs='+', default=['template', '60x60', '120x120'],
+                        help="'template' or WxH (maze mode)")
+    parser.add_argument('--budget-ms', type=float, default=SOAK_FRAME_BUDGET_MS, help="p99 frame-time budget")
+    parser.add_argument('--max-growth-mb', type=float, default=SOAK_MEMORY_CEILING_MB,
+                        help="allowed memory growth after the first level")
+    parser.add_argument('--max-seconds', type=float, default=SOAK_MAX_SECONDS, help="simulated time limit per level")
+    parser.add_argument('--no-draw', action='store_true', help="skip rendering (logic only)")
+    args = parser.parse_args(argv)
+
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+    max_ticks = int(args.max_seconds * FPS)
+    all_frames = FrameStats()
+    results = {}
+    baseline = None
+    failures = []
+
+    for size_text in args.sizes:
+        size = parse_size(size_text)
+        for seed in range(args.first_seed, args.first_seed + args.seeds):
+            grid, stops, gen_ms = generate(size, seed)
+            stats = play(grid, stops, max_ticks, draw=not args.no_draw)
+
+            # 关卡对象释放 (解冻 + 完整回收) 后再量内存；第一关跑完作为基线 (资源缓存、图集等都已加载)
+            gc_control.release_level()
+            memory = rss_mb()
+            if baseline is None:
+                baseline = memory
+
+            pools = stats["pools"]
+            collections = stats["gc"]["gc_collections"]
+            summary = FrameStats()
+            summary.samples = stats["frame_samples"]
+            frame = summary.summary()
+            all_frames.samples.extend(stats["frame_samples"])
+            results[stats["result"]] = results.get(stats["result"], 0) + 1
+
+            print(f"{size_text:>9} seed {seed:<4} {stats['result']:<14} "
+                  f"ticks {stats['ticks']:<5} wall {stats['wall_s']:.2f}s  "
+                  f"gen {gen_ms:.0f}ms build {stats['build_ms']:.0f}ms  "
+                  f"p50 {frame['p50_ms']:.2f} p99 {frame['p99_ms']:.2f} max {frame['max_ms']:.2f}ms  "
+                  f"sprites {stats['peak_sprites']} (damage {stats['peak_damage']})  "
+                  f"pooled spikes {pools['spike']['created']} new/{pools['spike']['reused']} reused, "
+                  f"ghosts {pools['ghost']['created']} new/{pools['ghost']['reused']} reused  "
+                  f"gc {'/'.join(map(str, collections))} max {stats['gc']['gc_max_ms']:.2f}ms  "
+                  f"rss {memory:.1f}MB")
+            if stats["result"] == 'timeout':
+                failures.append(f"{size_text} seed {seed}: autopilot did not finish in {args.max_seconds}s")
+
+    total = all_frames.summary()
+    growth = memory - baseline
+    print(f"\n{sum(results.values())} levels {results}; "
+          f"{total['frames']} ticks p50 {total['p50_ms']:.2f} p90 {total['p90_ms']:.2f} "
+          f"p99 {total['p99_ms']:.2f} max {total['max_ms']:.2f}ms; memory growth {growth:+.1f}MB")
+
+    if total["p99_ms"] > args.budget_ms:
+        failures.append(f"p99 frame time {total['p99_ms']:.2f}ms exceeds budget {args.budget_ms:.2f}ms")
+    if growth > args.max_growth_mb:
+        failures.append(f"memory grew {growth:.1f}MB, ceiling {args.max_growth_mb:.1f}MB")
+
+    worst = alloc_check(*generate(parse_size(args.sizes[0]), args.first_seed)[:2])
+    print("alloc check: " + ", ".join(f"{name} {size}B" for name, size in sorted(worst.items())) +
+          f" peak per update (slack {SOAK_ALLOC_SLACK_BYTES}B)")
+    for name, size in sorted(worst.items()):
+        if size > SOAK_ALLOC_SLACK_BYTES:
+            failures.append(f"{name}.update allocates {size}B per frame in steady state")
+
+    late = input_check(generate(parse_size(args.sizes[0]), args.first_seed)[0])
+    print(f"input check: next slide starts on the tick the slide ends for "
+          f"{', '.join(n for n in ('buffered', 'held') if n not in late) or 'no'} input")
+    for name in late:
+        failures.append(f"{name} input: next slide starts a tick after the slide ends")
+
+    problems = reload_check(generate(None, args.first_seed)[0])
+    print(f"reload check: restart after a hot reload, {len(problems)} problems")
+    for problem in problems:
+        failures.append(f"restart after hot reload: {problem}")
+
+    short = placement_check()
+    print(f"placement check: {SOAK_PLACEMENT_MAPS} template maps, {len(short)} with fewer groups than configured")
+    for seed, char, placed, want in short:
+        failures.append(f"template seed {seed}: placed {placed}/{want} '{char}' groups")
+
+    times = mapgen_check()
+    small, large = min(times), max(times)
+    scaling = (times[large] / large ** 2) / (times[small] / small ** 2)
+    print("mapgen check: maze " + ", ".join(f"{side}x{side} {sec:.2f}s" for side, sec in times.items()) +
+          f", per-cell cost x{scaling:.2f} from {small}x{small} to {large}x{large}")
+    if times[large] > SOAK_MAPGEN_BUDGET_S:
+        failures.append(f"maze {large}x{large} took {times[large]:.2f}s, budget {SOAK_MAPGEN_BUDGET_S:.2f}s")
+    if scaling > SOAK_MAPGEN_SCALING:
+        failures.append(f"map generation per-cell cost grew x{scaling:.2f} from {small}x{small} to {large}x{large}, "
+                        f"limit x{SOAK_MAPGEN_SCALING:.2f}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,16 @@ import pygame
 import math
 from settings import *
 from assets import AssetFactory
+from pools import PooledSprite
+
+# 方向常量：移动相关的代码都直接用这几个元组，不再每帧新建 Vector2
+DIR_NONE = (0, 0)
+DIR_UP = (0, -1)
+DIR_DOWN = (0, 1)
+DIR_LEFT = (-1, 0)
+DIR_RIGHT = (1, 0)
+DIRECTIONS = (DIR_UP, DIR_DOWN, DIR_LEFT, DIR_RIGHT)
+_CANONICAL = {d: d for d in DIRECTIONS}     # 输入源给的方向 -> 对应的常量
 
 # 基础类
 class BaseStaticSprite(pygame.sprite.Sprite):
@@ -13,195 +23,103 @@ class BaseStaticSprite(pygame.sprite.Sprite):
         self.rect = self.image.get_rect(topleft=pos)
 
 # 游戏实体类 (Sprites)
-class Wall(BaseStaticSprite):
-    def __init__(self, groups, pos):
-        # 墙：绿色，实线
-        super().__init__(groups, pos, "墙", COLOR_WALL)
-
 class Door(BaseStaticSprite):
     def __init__(self, groups, pos):
         # 门：金色，实线
         super().__init__(groups, pos, "门", COLOR_DOOR)
 
-class Coin(pygame.sprite.Sprite):
-    def __init__(self, groups, pos):
-        super().__init__(groups)
-        self.frames = AssetFactory.get_coin_assets()
-        self.idx = 0
-        self.image = self.frames[0]
-        self.rect = self.image.get_rect(center=(pos[0]+TILE_SIZE//2, pos[1]+TILE_SIZE//2))
-    
-    def update(self):
-        self.idx = (self.idx + COIN_ANIMATION_SPEED) % len(self.frames)
-        self.image = self.frames[int(self.idx)]
-
-class Cocoon(pygame.sprite.Sprite):
-    def __init__(self, groups, pos, player, visible_group, damage_group, obstacle_sprites, wall_grid):
-        super().__init__(groups)
-        self.pos = pos
-        self.player = player
-
-        self.visible_group = visible_group
-        self.damage_group = damage_group
-        self.obstacle_sprites = obstacle_sprites
-        self.wall_grid = wall_grid
-        
-        self.image = AssetFactory.create_tile("茧", COLOR_GHOST, border_style='solid')
-        self.rect = self.image.get_rect(topleft=pos)
-        
-        self.is_triggered = False
-        self.trigger_time = 0
-        self.detection_rect = self.rect.inflate(TILE_SIZE * 2, TILE_SIZE * 2)
-
-    def update(self):
-        if self.is_triggered:
-            if pygame.time.get_ticks() - self.trigger_time >= COCOON_SPAWN_DELAY:
-                Ghost(
-                    groups=[self.visible_group, self.damage_group], 
-                    pos=self.rect.topleft, 
-                    obstacle_sprites=self.obstacle_sprites, 
-                    player=self.player,
-                    wall_grid=self.wall_grid
-                )
-                self.kill()
-        elif self.detection_rect.colliderect(self.player.rect):
-            self.is_triggered = True
-            self.trigger_time = pygame.time.get_ticks()
-
-class Trap(pygame.sprite.Sprite):
-    def __init__(self, groups, pos, damage_group, player):
+class Spike(PooledSprite):
+    def __init__(self, groups, start_pos, direction, timers):
         super().__init__(groups)
-        self.pos = pygame.math.Vector2(pos)
-        self.damage_group = damage_group
-        self.visible_groups = groups[0]
-        self.player = player
-        
-        # 逻辑属性
-        self.angle = 0
-        self.direction = pygame.math.Vector2(0, -1)
-        self.direction = pygame.math.Vector2(0, -1)
-        self.status = 'idle'
-        self.cooldown_timer = 0
-        
-        # 初始绘制 (青色，虚线)
-        self.image_base = AssetFactory.create_tile(
-            "刺", COLOR_CYAN, bg_color=COLOR_TRAP, 
-            border_style='dashed', angle=0
-        )
-        
-        self.image = self.image_base
-        self.rect = self.image.get_rect(topleft=pos)
-
-    def update(self):
-        now = pygame.time.get_ticks()
-        if self.status == 'cooldown':
-            if now - self.cooldown_timer > TRAP_COOLDOWN:
-                self.status = 'idle'
-        else:
-            self._detect_player(now)
-
-    def _detect_player(self, now):
-        vec = pygame.math.Vector2(self.player.rect.center) - pygame.math.Vector2(self.rect.center)
-        if vec.length() > TILE_SIZE * 1.5: return
-        
-        # 轴对齐判定
-        align_x = abs(vec.x) < TILE_SIZE // 2
-        align_y = abs(vec.y) < TILE_SIZE // 2
-        
-        if align_x:
-            self.direction = pygame.math.Vector2(0, 1 if vec.y > 0 else -1)
-            self.angle = 180 if vec.y > 0 else 0
-            self._trigger(now)
-        elif align_y:
-            self.direction = pygame.math.Vector2(1 if vec.x > 0 else -1, 0)
-            self.angle = -90 if vec.x > 0 else 90
-            self._trigger(now)
-
-    def _trigger(self, now):
-        self.status = 'cooldown'
-        self.cooldown_timer = now
-
-        if self.angle != 0:
-            self.image = pygame.transform.rotate(self.image_base, self.angle)
-        else:
-            self.image = self.image_base
-
-        Spike([self.visible_groups, self.damage_group], self.rect.topleft, self.direction)
-
-class Spike(pygame.sprite.Sprite):
-    def __init__(self, groups, start_pos, direction):
-        super().__init__(groups)
-        self.start_pos = pygame.math.Vector2(start_pos)
-        self.direction = direction
-        self.state = 'warning'
-        self.timer = 0
-        self.last_time = pygame.time.get_ticks()
-        self.dist = 0
         self.speed = SPIKE_SPEED
+        self.reset(start_pos, direction, timers)
         
-        # 生成子弹
-        self.image = AssetFactory.create_spike_bullet(direction, COLOR_SPIKE)
-        self.rect = self.image.get_rect(topleft=start_pos)
-        
-        # 状态处理映射
+        # 状态处理映射 (每个实例只建一次，对象池复用时不再重建)
+        # 预警、停留两个阶段只是等时间，交给定时器队列，每帧不用处理
         self.state_handlers = {
-            'warning': self._handle_warning,
             'extending': self._handle_extending,
-            'active': self._handle_active,
             'retracting': self._handle_retracting
         }
 
-    def update(self):
-        now = pygame.time.get_ticks()
-        dt = now - self.last_time
-        self.last_time = now
+    def reset(self, start_pos, direction, timers):
+        """恢复到刚放出时的状态 (构造和对象池复用共用)"""
+        self.direction = (int(direction[0]), int(direction[1]))
+        self.timers = timers
+        self.state = 'warning'
+        self.dist = 0
+        self.wake = timers.call_later(SPIKE_WARNING_TIME, self._set_state, 'extending')
         
+        # 生成子弹 (图片来自缓存，同方向共用)
+        self.image = AssetFactory.create_spike_bullet(self.direction, COLOR_SPIKE)
+        self.rect = self.image.get_rect(topleft=start_pos)
+
+    def kill(self):
+        self.wake.cancel()
+        super().kill()
+
+    def update(self):
         handler = self.state_handlers.get(self.state)
         if handler:
-            handler(dt)
-            
-    def _handle_warning(self, dt):
-        self.timer += dt
-        if self.timer >= SPIKE_WARNING_TIME: 
-            self.state = 'extending'; self.timer = 0
+            handler()
+
+    def _set_state(self, state):
+        self.state = state
             
-    def _handle_extending(self, dt):
-        self.dist = min(self.dist + self.speed, TILE_SIZE)
-        if self.dist >= TILE_SIZE: self.state = 'active'
-        self._update_pos()
+    def _handle_extending(self):
+        step = self.speed if self.dist + self.speed <= TILE_SIZE else TILE_SIZE - self.dist
+        self.dist += step
+        if self.dist >= TILE_SIZE:
+            self.state = 'active'
+            self.wake = self.timers.call_later(SPIKE_WAIT_TIME, self._set_state, 'retracting')
+        self._shift(step)
         
-    def _handle_active(self, dt):
-        self.timer += dt
-        if self.timer >= SPIKE_WAIT_TIME: self.state = 'retracting'; self.timer = 0
-        
-    def _handle_retracting(self, dt):
+    def _handle_retracting(self):
         self.dist -= self.speed
         if self.dist <= 0: self.kill()
-        self._update_pos()
+        self._shift(-self.speed)
         
-    def _update_pos(self):
-        pos = self.start_pos + self.direction * self.dist
-        self.rect.topleft = (round(pos.x), round(pos.y))
+    def _shift(self, step):
+        """沿方向移动 step 像素 (相对移动，不用读写超过 256 的像素坐标)"""
+        dx, dy = self.direction
+        self.rect.move_ip(dx * step, dy * step)
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self, groups, pos, obstacle_sprites, create_particle_func):
+    """
+    玩家：位置就是 rect 上的整数像素坐标，方向是 DIRECTIONS 里的常量元组。
+    滑行时记下正在进入的格子 (col, row) 和走完这一格还剩几步：只在对齐到格子时查一次前方的格子，
+    途中每帧只是 move_ip，不读取像素坐标 (超过 256 的整数每读一次都是新对象)。
+    """
+    def __init__(self, groups, pos, obstacle_grid, create_particle_func, clock, input_source):
         super().__init__(groups)
         
         # 使用工厂生成：黄色 "我"，无边框 (border_style='none')
         self.image_base = AssetFactory.create_tile("我", COLOR_PLAYER_TEXT, border_style='none')
-        self.image = self.image_base.copy()
+        self.image = self.image_base
+        self.line_assets = AssetFactory.get_trail_assets()
+        self.images = {DIR_NONE: self.image_base}   # 各方向叠好拖尾线的图，第一次用到时生成
         
         # 统一：使用 pos 初始化
         self.rect = self.image.get_rect(topleft=pos)
-        self.pos = pygame.math.Vector2(self.rect.topleft)
         
-        self.obstacle_sprites = obstacle_sprites
+        self.obstacle_grid = obstacle_grid  # 碰撞网格：墙、陷阱、未孵化的茧所在的格子
         self.create_particle = create_particle_func
-        self.line_assets = AssetFactory.get_trail_assets()
-        self.direction = pygame.math.Vector2()
+        self.clock = clock
+        self.input_source = input_source    # 键盘 / 录像，poll() 返回方向或 None
+        self.direction = DIR_NONE
         self.speed = PLAYER_SPEED
         self.status = 'idle'
         self.move_start_time = 0
+        self.col = self.row = 0     # 滑行中：正在进入的格子
+        self.steps = 0              # 走完这一格还剩几帧；0 表示正好对齐在 (col, row) 上
+        self.velocity = DIR_NONE    # 每帧的位移，开始滑行时算好 (-10 这样的负数每次相乘都是新对象)
+
+    def reset(self, pos):
+        """重开关卡：回到出生点，停止滑行"""
+        self.rect.topleft = pos
+        self.direction = DIR_NONE
+        self.status = 'idle'
+        self.move_start_time = 0
+        self.image = self.image_base
 
     def update(self):
         if self.status == 'idle':
@@ -210,100 +128,151 @@ class Player(pygame.sprite.Sprite):
             self._move()
 
     def _input(self):
-        keys = pygame.key.get_pressed()
-        d = pygame.math.Vector2()
-        if keys[pygame.K_UP] or keys[pygame.K_w]: d.y = -1
-        elif keys[pygame.K_DOWN] or keys[pygame.K_s]: d.y = 1
-        elif keys[pygame.K_LEFT] or keys[pygame.K_a]: d.x = -1
-        elif keys[pygame.K_RIGHT] or keys[pygame.K_d]: d.x = 1
+        direction = self.input_source.poll()
 
-        if d.length() != 0:
-            check_rect = self.rect.move(d.x, d.y)
-            if not any(s.rect.colliderect(check_rect) for s in self.obstacle_sprites):
-                self.direction = d
+        if direction is not None:
+            direction = _CANONICAL[tuple(direction)]
+            if self._hit_obstacle(self.rect.x + direction[0], self.rect.y + direction[1]) is None:
+                self.direction = direction
                 self.status = 'moving'
-                self.move_start_time = pygame.time.get_ticks()
+                self.move_start_time = self.clock.get_ticks()
+                self.col, self.row = self.rect.x // TILE_SIZE, self.rect.y // TILE_SIZE
+                self.steps = 0
+                self.velocity = (direction[0] * self.speed, direction[1] * self.speed)
                 self._update_image_layer()
 
     def _update_image_layer(self):
-        self.image = self.image_base.copy()
-        key = (int(self.direction.x), int(self.direction.y))
-        if key in self.line_assets:
-            for layer in self.line_assets[key]:
-                self.image.blit(layer, (0, 0))
+        image = self.images.get(self.direction)
+        if image is None:
+            image = self.image_base.copy()
+            for layer in self.line_assets.get(self.direction, ()):
+                image.blit(layer, (0, 0))
+            self.images[self.direction] = image
+        self.image = image
 
     def _move(self):
-        key = (int(self.direction.x), int(self.direction.y))
-        self.create_particle('trail', self.rect.topleft, direction_key=key)
+        self.create_particle('trail', self.rect, direction_key=self.direction)
         
-        self.pos += self.direction * self.speed
-        self.rect.topleft = round(self.pos.x), round(self.pos.y)
-        
-        hit = pygame.sprite.spritecollideany(self, self.obstacle_sprites)
-        if hit:
-            self._handle_collision(hit)
+        dx, dy = self.direction
+        if not self.steps:
+            # 对齐在格子上：前方一格是障碍就撞上 (与先移动再检测重叠的结果相同，只是不用先走进去再退回来)
+            ahead = (self.col + dx, self.row + dy)
+            if ahead in self.obstacle_grid:
+                self._handle_collision(ahead)
+                return
+            self.col, self.row = ahead
+            self.steps = TILE_SIZE // self.speed
+        vx, vy = self.velocity
+        self.rect.move_ip(vx, vy)
+        self.steps -= 1
+
+    def _hit_obstacle(self, x, y):
+        """左上角在 (x, y) 时压到的第一个障碍格 (col, row)，按行优先；没有则返回 None"""
+        grid = self.obstacle_grid
+        first_col, last_col = x // TILE_SIZE, (x + self.rect.width - 1) // TILE_SIZE
+        row, last_row = y // TILE_SIZE, (y + self.rect.height - 1) // TILE_SIZE
+        while row <= last_row:
+            col = first_col
+            while col <= last_col:
+                if (col, row) in grid:
+                    return col, row
+                col += 1
+            row += 1
+        return None
 
     def _handle_collision(self, hit):
-        if self.direction.x > 0: self.rect.right = hit.rect.left
-        elif self.direction.x < 0: self.rect.left = hit.rect.right
-        elif self.direction.y > 0: self.rect.bottom = hit.rect.top
-        elif self.direction.y < 0: self.rect.top = hit.rect.bottom
-        self.pos = pygame.math.Vector2(self.rect.topleft)
+        col, row = hit
+        dx, dy = self.direction
+        if dx > 0: self.rect.right = col * TILE_SIZE
+        elif dx < 0: self.rect.left = (col + 1) * TILE_SIZE
+        elif dy > 0: self.rect.bottom = row * TILE_SIZE
+        elif dy < 0: self.rect.top = (row + 1) * TILE_SIZE
         
-        if pygame.time.get_ticks() - self.move_start_time > 10:
+        if self.clock.get_ticks() - self.move_start_time > 10:
             for _ in range(int(self.speed * 0.8)):
                 self.create_particle('bubble', self.rect.center)
         
         self.status = 'idle'
-        self.direction = pygame.math.Vector2()
-        self.image = self.image_base.copy()
+        self.direction = DIR_NONE
+        self.image = self.image_base
+
+        # 滑行结束的同一个 tick 立刻读下一次输入：缓冲的按键和一直按住的键都不用再等一帧
+        self._input()
 
-class Ghost(pygame.sprite.Sprite):
-    def __init__(self, groups, pos, obstacle_sprites, player, wall_grid):
+class Ghost(PooledSprite):
+    """
+    鬼：走到格子中心时挑离玩家最近的方向 (不回头，除非是死路)。
+    和玩家一样记下所在的格子和到下一个格子中心还剩几步，途中每帧只是 move_ip；
+    选方向时玩家位置也拆成格子和格内偏移，比较的都是小整数，不创建临时对象。
+    """
+    def __init__(self, groups, pos, player, wall_grid):
         super().__init__(groups)
         
         self.image = AssetFactory.create_tile("鬼", COLOR_GHOST, border_style='none')
         self.rect = self.image.get_rect(topleft=pos)
-        self.pos = pygame.math.Vector2(pos)
         
-        self.obstacle_sprites = obstacle_sprites
         self.wall_grid = wall_grid
         self.player = player
-        self.direction = pygame.math.Vector2()
+        self.direction = DIR_NONE
         self.speed = GHOST_SPEED
+        self.col, self.row = pos[0] // TILE_SIZE, pos[1] // TILE_SIZE
+        self.steps = 0      # 到下一个格子中心还剩几帧；0 表示停着不动
+        self.find_dir()
+
+    def reset(self, pos, player=None, wall_grid=None):
+        """回到出生点，按玩家位置重新选方向 (重开关卡、对象池复用)"""
+        if player is not None: self.player = player
+        if wall_grid is not None: self.wall_grid = wall_grid
+        self.rect.topleft = pos
+        self.col, self.row = pos[0] // TILE_SIZE, pos[1] // TILE_SIZE
+        self.direction = DIR_NONE
         self.find_dir()
 
     def update(self):
-        self.pos += self.direction * self.speed
-        self.rect.topleft = (round(self.pos.x), round(self.pos.y))
-        if self.direction.length() != 0:
-            cx = (self.rect.centerx // TILE_SIZE) * TILE_SIZE + TILE_SIZE // 2
-            cy = (self.rect.centery // TILE_SIZE) * TILE_SIZE + TILE_SIZE // 2
-            if (self.rect.centerx-cx)**2 + (self.rect.centery-cy)**2 < (self.speed*0.5)**2:
-                self.pos.x = cx - TILE_SIZE // 2; self.pos.y = cy - TILE_SIZE // 2
-                self.rect.topleft = (self.pos.x, self.pos.y)
+        if self.steps:
+            vx, vy = self.velocity
+            self.rect.move_ip(vx, vy)
+            self.steps -= 1
+            if not self.steps:
+                # 到了下一个格子的中心，重新选方向
+                self.col += self.direction[0]
+                self.row += self.direction[1]
                 self.find_dir()
 
     def find_dir(self):
-        dirs = [pygame.math.Vector2(0,-1), pygame.math.Vector2(0,1), 
-                pygame.math.Vector2(-1,0), pygame.math.Vector2(1,0)]
-        valid = []
+        """
+        在格子中心选方向：候选是走一格之后的位置，到玩家中心的平方距离最小者优先 (同距离按 DIRECTIONS 顺序)。
+        各候选离开中心的距离相同，距离最小就是在方向上的投影 d·(玩家 - 鬼) 最大；
+        投影拆成格子差和格内偏移两部分比较 (都是小整数)，结果和比较像素值一样。
+        """
+        col, row = self.col, self.row
+        player_rect = self.player.rect
+        ax = player_rect.centerx // TILE_SIZE - col
+        bx = player_rect.centerx % TILE_SIZE - TILE_SIZE // 2
+        ay = player_rect.centery // TILE_SIZE - row
+        by = player_rect.centery % TILE_SIZE - TILE_SIZE // 2
+        back_x, back_y = -self.direction[0], -self.direction[1]
 
-        cx = int(self.rect.centerx // TILE_SIZE)
-        cy = int(self.rect.centery // TILE_SIZE)
+        best = reverse = None
+        best_a = best_b = 0
+        for d in DIRECTIONS:
+            dx, dy = d
+            if (col + dx, row + dy) in self.wall_grid:
+                continue
+            if dx == back_x and dy == back_y:
+                reverse = d         # 回头路：只有它一条路时才走
+                continue
+            a = dx * ax + dy * ay
+            b = dx * bx + dy * by
+            # 偏移都在 [-TILE_SIZE/2, TILE_SIZE/2] 内：格子差大 2 以上一定更大，差 0 或 1 时折算成像素比较
+            if best is None or a > best_a + 1 or (a >= best_a and (a - best_a) * TILE_SIZE + b > best_b):
+                best, best_a, best_b = d, a, b
 
-        for d in dirs:
-            target_x = cx + int(d.x)
-            target_y = cy + int(d.y)
-
-            if (target_x, target_y) not in self.wall_grid:
-                valid.append(d)
-        
-        if not valid: self.direction = pygame.math.Vector2(); return
-        if len(valid) > 1:
-            valid = [d for d in valid if d + self.direction != pygame.math.Vector2(0,0)]
-        
-        target = pygame.math.Vector2(self.player.rect.center)
-        curr = pygame.math.Vector2(self.rect.center)
-        valid.sort(key=lambda d: (target - (curr + d*TILE_SIZE)).length_squared())
-        self.direction = valid[0]
\ No newline at end of file
+        if best is not None:
+            self.direction = best
+        elif reverse is not None:
+            self.direction = reverse
+        else:
+            self.direction = DIR_NONE
+        self.velocity = (self.direction[0] * self.speed, self.direction[1] * self.speed)
+        self.steps = TILE_SIZE // self.speed if self.direction is not DIR_NONE else 0
@@ -0,0 +1,62 @@
+# src/startup.py
+import time
+"""
+[启动耗时报告] (python main.py --startup-report)
+把从进程启动到第一帧显示在屏幕上的时间按阶段拆开 (导入/生成关卡、初始化子系统、建窗口、
+载入图集、构建首关……)，第一帧推送后打印一张表，方便找出拖慢启动的环节。
+未开启时 phase() 只多一次计时，不打印任何东西。
+"""
+
+class StartupTimer:
+    def __init__(self):
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self.phases = []        # [(名称, 毫秒)]，按完成顺序
+        self.reported = False
+
+    def enable(self):
+        self.enabled = True
+
+    def phase(self, name):
+        """with startup.phase("display"): ..."""
+        return _Phase(self, name)
+
+    def add(self, name, ms):
+        self.phases.append((name, ms))
+
+    def first_frame(self):
+        """第一帧推送到屏幕后调用一次；开启时打印报告"""
+        if self.reported:
+            return
+        self.reported = True
+        if self.enabled:
+            print(self.report())
+
+    def report(self):
+        total = (time.perf_counter() - self.origin) * 1000
+        width = max([len(name) for name, _ in self.phases] + [len("other")])
+        lines = [f"Startup: {total:.1f} ms to first frame"]
+        for name, ms in self.phases:
+            lines.append(f"  {name:<{width}}  {ms:8.1f} ms  {ms / total:6.1%}")
+        # 只统计顶层阶段；嵌套阶段 (名字带缩进) 已包含在父阶段里
+        other = total - sum(ms for name, ms in self.phases if not name.startswith(' '))
+        lines.append(f"  {'other':<{width}}  {other:8.1f} ms  {other / total:6.1%}")
+        return "\n".join(lines)
+
+class _Phase:
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+# 全局计时器：尽早导入，origin 即为进程开始计时的时刻
+startup = StartupTimer()
@@ -0,0 +1,132 @@
+# src/telemetry.py
+import os
+import json
+import time
+import uuid
+import threading
+from collections import deque
+from settings import *
+
+def percentile(sorted_values, p):
+    """已排序序列的第 p 百分位 (最近秩法)"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class FrameStats:
+    """收集一关内每帧的耗时 (毫秒)，结束时给出分位数"""
+    def __init__(self):
+        self.samples = []
+
+    def add(self, ms):
+        self.samples.append(ms)
+
+    def summary(self):
+        values = sorted(self.samples)
+        return {
+            "frames": len(values),
+            "p50_ms": round(percentile(values, 50), 3),
+            "p90_ms": round(percentile(values, 90), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+            "max_ms": round(values[-1], 3) if values else 0.0,
+        }
+
+class Telemetry:
+    """
+    [遥测]
+    游戏循环里的 record() 只是往内存队列里追加一条字典，从不碰磁盘；
+    后台线程攒够 batch_size 条或每隔 flush_interval 秒，把队列整批写成 JSON lines。
+    """
+    def __init__(self, directory=TELEMETRY_DIR, enabled=TELEMETRY_ENABLED,
+                 batch_size=TELEMETRY_BATCH_SIZE, flush_interval=TELEMETRY_FLUSH_INTERVAL):
+        self.enabled = enabled
+        self.session = uuid.uuid4().hex[:12]
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.path = os.path.join(directory, f"session_{time.strftime('%Y%m%d_%H%M%S')}_{self.session}.jsonl")
+        self.dropped = 0
+
+        self._queue = deque()           # append / popleft 是线程安全的，不用加锁
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+        if self.enabled:
+            self._thread = threading.Thread(target=self._writer, name="telemetry", daemon=True)
+            self._thread.start()
+
+    def record(self, event, **fields):
+        """记录一条事件 (游戏循环中调用，不阻塞)"""
+        if not self.enabled or self._closed:
+            return
+        fields["event"] = event
+        fields["session"] = self.session
+        fields["time"] = round(time.time(), 3)
+        self._queue.append(fields)
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+
+    def close(self):
+        """停止后台线程并写出剩余事件 (退出游戏时调用)"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._wake.set()
+            self._thread.join(timeout=2.0)
+        if self.dropped:
+            print(f"Telemetry: {self.dropped} events dropped (write to {self.path} failed)")
+
+    # =========================================================================
+    #  后台写盘
+    # =========================================================================
+    def _writer(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        batch = []
+        while self._queue:
+            batch.append(self._queue.popleft())
+        if not batch:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(item, ensure_ascii=False) + "\n" for item in batch)
+        except OSError:
+            # 写盘失败只丢弃这一批，不影响游戏
+            self.dropped += len(batch)
+
+if __name__ == "__main__":
+    # 汇总遥测日志：python telemetry.py [文件...]，默认读 TELEMETRY_DIR 下全部文件
+    import sys
+    paths = sys.argv[1:]
+    if not paths and os.path.isdir(TELEMETRY_DIR):
+        paths = [os.path.join(TELEMETRY_DIR, name) for name in sorted(os.listdir(TELEMETRY_DIR))]
+    ends = []
+    dropped = 0
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for e in map(json.loads, f):
+                if e["event"] == "level_end":
+                    ends.append(e)
+                elif e["event"] == "session_end":
+                    dropped += e.get("dropped", 0)
+
+    for level in sorted({e["level"] for e in ends}):
+        runs = [e for e in ends if e["level"] == level]
+        wins = [e for e in runs if e["result"] == "level_complete"]
+        causes = {}
+        for e in runs:
+            if e.get("cause"):
+                causes[e["cause"]] = causes.get(e["cause"], 0) + 1
+        p99 = max(e["p99_ms"] for e in runs)
+        door = f"{min(e['ticks_ms'] for e in wins) / 1000:.1f}s" if wins else "-"
+        print(f"level {level}: attempts {len(runs)}, cleared {len(wins)}, deaths {causes}, "
+              f"best time to door {door}, worst p99 {p99:.2f}ms")
+    if dropped:
+        print(f"{dropped} events were dropped by failed writes (reported at session end)")
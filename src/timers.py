@@ -0,0 +1,58 @@
+# src/timers.py
+import heapq
+"""
+[定时器队列]
+茧孵化、陷阱冷却、刺的预警/停留都是“到某个时刻做一件事”。
+以前每个实体每帧都读一次时钟比较时间戳；现在登记到这里的最小堆里，
+Level 每帧只看堆顶：没有到期的定时器时几乎不做任何事，开销与事件数成正比而不是与实体数成正比。
+时间取自模拟时钟 (SimClock)，回放结果不受影响。
+"""
+
+class Timer:
+    __slots__ = ('due', 'callback', 'args', 'cancelled')
+
+    def __init__(self, due, callback, args):
+        self.due = due
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """取消 (惰性删除：留在堆里，到期时跳过)"""
+        self.cancelled = True
+
+class TimerQueue:
+    def __init__(self, clock):
+        self.clock = clock
+        self._heap = []     # (到期时间, 登记序号, Timer)；同一时刻到期的按登记顺序触发
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def now(self):
+        return self.clock.get_ticks()
+
+    def call_at(self, due, callback, *args):
+        """模拟时间到达 due (毫秒) 后调用 callback(*args)，返回可取消的 Timer"""
+        timer = Timer(due, callback, args)
+        heapq.heappush(self._heap, (due, self._seq, timer))
+        self._seq += 1
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.now() + delay, callback, *args)
+
+    def run_due(self):
+        """触发所有已到期的定时器；回调里新登记且已到期的也在本次触发"""
+        heap = self._heap
+        now = self.now()
+        while heap and heap[0][0] <= now:
+            timer = heapq.heappop(heap)[2]
+            if not timer.cancelled:
+                timer.callback(*timer.args)
+
+    def clear(self):
+        for _, _, timer in self._heap:
+            timer.cancelled = True
+        self._heap.clear()
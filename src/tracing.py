@@ -0,0 +1,125 @@
+# src/tracing.py
+import os
+import json
+import time
+import threading
+from array import array
+from settings import *
+"""
+[性能追踪]
+可选开启 (python main.py --trace)。各阶段的耗时区间写进预先分配好的环形缓冲区，
+只保留最近 TRACE_BUFFER_SIZE 条；退出时或按 F9 导出成 Chrome trace-event JSON，
+可以直接拖进 chrome://tracing 或 https://ui.perfetto.dev 查看时间线。
+未开启时 span() 返回同一个空对象，几乎没有开销。
+"""
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'cat', 'start')
+
+    def __init__(self, tracer, name, cat):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.add(self.name, self.cat, self.start, time.perf_counter_ns())
+        return False
+
+class Tracer:
+    def __init__(self, size=TRACE_BUFFER_SIZE):
+        self.enabled = False
+        self.size = size
+        self.count = 0      # 总共记录过多少条 (超过 size 后旧的被覆盖)
+        self.origin = time.perf_counter_ns()
+
+        # 环形缓冲区：名字/分类存字符串引用，时间存在定长数组里，运行中不再分配
+        self.names = [None] * size
+        self.cats = [None] * size
+        self.starts = array('q', bytes(8 * size))   # 纳秒
+        self.durs = array('q', bytes(8 * size))     # 纳秒
+        self.tids = array('q', bytes(8 * size))
+
+    def enable(self):
+        self.enabled = True
+        self.origin = time.perf_counter_ns()
+
+    def span(self, name, cat='game'):
+        """with tracer.span("Level.run"): ..."""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, cat)
+
+    def add(self, name, cat, start_ns, end_ns):
+        i = self.count % self.size
+        self.names[i] = name
+        self.cats[i] = cat
+        self.starts[i] = start_ns - self.origin
+        self.durs[i] = end_ns - start_ns
+        self.tids[i] = threading.get_ident()
+        self.count += 1
+
+    def traced(self, name, cat='game'):
+        """装饰器版本的 span"""
+        def decorate(func):
+            def wrapper(*args, **kwargs):
+                with self.span(name, cat):
+                    return func(*args, **kwargs)
+            wrapper.__name__ = func.__name__
+            wrapper.__doc__ = func.__doc__
+            return wrapper
+        return decorate
+
+    # =========================================================================
+    #  导出
+    # =========================================================================
+    def events(self):
+        """按时间顺序列出缓冲区中的区间 (Chrome trace-event 的 'X' 完整事件)"""
+        n = min(self.count, self.size)
+        first = self.count - n
+        pid = os.getpid()
+        tid_map = {}
+        result = []
+        for k in range(first, self.count):
+            i = k % self.size
+            tid = tid_map.setdefault(self.tids[i], len(tid_map) + 1)
+            result.append({
+                "name": self.names[i],
+                "cat": self.cats[i],
+                "ph": "X",
+                "ts": self.starts[i] / 1000,     # 微秒
+                "dur": self.durs[i] / 1000,
+                "pid": pid,
+                "tid": tid,
+            })
+        return result
+
+    def export(self, directory=TRACE_DIR):
+        """写出 trace 文件，返回路径"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"trace_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        data = {
+            "traceEvents": self.events(),
+            "displayTimeUnit": "ms",
+            "otherData": {"recorded": self.count, "dropped": max(0, self.count - self.size)},
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        return path
+
+# 全局追踪器：各模块 from tracing import tracer
+tracer = Tracer()
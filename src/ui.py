@@ -8,8 +8,11 @@ class UI:
         self.font_title = pygame.font.Font(None, FONT_SIZE_TITLE)
         self.font_sub = pygame.font.Font(None, FONT_SIZE_SUB)
     
-    def show_level_start(self, level_index):
-        """绘制关卡开始前的提示画面"""
+    def show_level_start(self, level_index, progress=1.0):
+        """
+        绘制关卡开始前的提示画面
+        :param progress: 关卡构建进度 (0~1)，未建完时显示进度条代替开始提示
+        """
         
         # 1. 遮罩层
         overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -29,11 +32,24 @@ class UI:
         title_rect = title_surf.get_rect(center=(box_rect.centerx, box_rect.centery - 30))
         self.display_surface.blit(title_surf, title_rect)
 
-        # 4. 提示文字: Press ENTER
-        sub_surf = self.font_sub.render("Press ENTER to Start", True, COLOR_TEXT_SUB)
+        # 4. 提示文字: Press ENTER (关卡还没建完时显示加载进度)
+        if progress < 1.0:
+            sub_text = f"Loading... {int(progress * 100)}%"
+        else:
+            sub_text = "Press ENTER to Start"
+        sub_surf = self.font_sub.render(sub_text, True, COLOR_TEXT_SUB)
         sub_rect = sub_surf.get_rect(center=(box_rect.centerx, box_rect.centery + 10))
         self.display_surface.blit(sub_surf, sub_rect)
 
+        # 5. 进度条
+        if progress < 1.0:
+            bar_rect = pygame.Rect(0, 0, UI_BOX_WIDTH - 40, UI_PROGRESS_HEIGHT)
+            bar_rect.center = (box_rect.centerx, box_rect.centery + 32)
+            fill_rect = bar_rect.copy()
+            fill_rect.width = int(bar_rect.width * progress)
+            pygame.draw.rect(self.display_surface, UI_PROGRESS_COLOR, fill_rect)
+            pygame.draw.rect(self.display_surface, COLOR_TEXT_SUB, bar_rect, 1)
+
     def show_game_over(self):
         """绘制游戏结束画面"""
         